@@ -0,0 +1,45 @@
+"""Create the sensor_data_ts hypertable
+
+The schema the backend created with `Base.metadata.create_all` before migrations
+were introduced. Every statement is IF NOT EXISTS, so databases created that
+way are adopted in place.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = settings.TIMESERIES_TABLE_NAME
+
+
+def upgrade() -> None:
+    op.create_table(
+        TABLE,
+        sa.Column("sensor_name", sa.String(), primary_key=True),
+        sa.Column("timestamp", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("real_value", sa.Float(), nullable=True),
+        sa.Column("predicted_value", sa.Float(), nullable=True),
+        sa.UniqueConstraint("sensor_name", "timestamp", name="uq_sensor_timestamp"),
+        if_not_exists=True,
+    )
+    op.create_index(f"ix_{TABLE}_sensor_name", TABLE, ["sensor_name"], if_not_exists=True)
+    op.create_index(f"ix_{TABLE}_timestamp", TABLE, ["timestamp"], if_not_exists=True)
+    op.execute(
+        f"SELECT create_hypertable('{TABLE}', 'timestamp', if_not_exists => TRUE, "
+        f"chunk_time_interval => INTERVAL '7 days')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table(TABLE)
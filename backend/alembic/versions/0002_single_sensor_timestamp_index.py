@@ -0,0 +1,51 @@
+"""Keep a single (sensor_name, timestamp DESC) index on sensor_data_ts
+
+The table had five overlapping B-trees, all maintained on every insert and on
+every chunk: the primary key (sensor_name, timestamp), the identical
+uq_sensor_timestamp constraint, one index per column from `index=True`, and
+TimescaleDB's default (timestamp DESC) index. Every query filters by sensor and
+time range (or by sensors and a start time), so one unique index on
+(sensor_name, timestamp DESC) serves all of them. It is also the ON CONFLICT
+arbiter of the upserts. Its effect on ingest rate and size has not been measured
+yet (benchmarks/db_schema.py).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = settings.TIMESERIES_TABLE_NAME
+INDEX = f"ix_{TABLE}_sensor_name_timestamp"
+
+
+def upgrade() -> None:
+    # Dropping the primary key keeps the columns nullable otherwise
+    op.alter_column(TABLE, "sensor_name", nullable=False)
+    op.alter_column(TABLE, "timestamp", nullable=False)
+    # Create the replacement first, so an arbiter for ON CONFLICT always exists
+    op.create_index(INDEX, TABLE, ["sensor_name", sa.text("timestamp DESC")], unique=True, if_not_exists=True)
+    op.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS uq_sensor_timestamp")
+    op.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS {TABLE}_pkey")
+    op.execute(f"DROP INDEX IF EXISTS ix_{TABLE}_sensor_name")
+    op.execute(f"DROP INDEX IF EXISTS ix_{TABLE}_timestamp")
+    op.execute(f"DROP INDEX IF EXISTS {TABLE}_timestamp_idx")
+
+
+def downgrade() -> None:
+    op.create_primary_key(f"{TABLE}_pkey", TABLE, ["sensor_name", "timestamp"])
+    op.create_unique_constraint("uq_sensor_timestamp", TABLE, ["sensor_name", "timestamp"])
+    op.create_index(f"ix_{TABLE}_sensor_name", TABLE, ["sensor_name"])
+    op.create_index(f"ix_{TABLE}_timestamp", TABLE, ["timestamp"])
+    op.create_index(f"{TABLE}_timestamp_idx", TABLE, [sa.text("timestamp DESC")])
+    op.drop_index(INDEX, table_name=TABLE)
@@ -0,0 +1,53 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.live_updates import format_sse_event, live_update_hub
+
+router = APIRouter()
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+    summary="Subscribe to new real and predicted minutes of a set of sensors (Server-Sent Events)",
+)
+async def stream_sensor_updates(
+    request: Request,
+    sensorNames: List[str] = Query(..., example=["ActivePower", "ReactivePower"]),
+):
+    """
+    Streams a `points` event with the new minutes of a sensor every time the gateway
+    stores real or predicted values for it, e.g.
+    `{"sensorName": "ActivePower", "data": [{"timestamp": "...", "real_value": 1.0}]}`.
+    Accepts repeated or comma-separated `sensorNames`. A comment line is sent when
+    there was no event for LIVE_UPDATES_KEEPALIVE_SECONDS to keep proxies from
+    closing the connection.
+    """
+    sensor_names = list(dict.fromkeys(
+        name.strip() for value in sensorNames for name in value.split(",") if name.strip()
+    ))
+    unknown = [name for name in sensor_names if name not in settings.SENSOR_NAMES]
+    if not sensor_names:
+        raise HTTPException(status_code=400, detail="At least one sensor name is required")
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown sensors: {', '.join(unknown)}")
+
+    subscription = live_update_hub.subscribe(sensor_names)
+
+    async def event_stream():
+        try:
+            yield format_sse_event("subscribed", {"sensorNames": sensor_names})
+            while not await request.is_disconnected():
+                event = await subscription.next_event(settings.LIVE_UPDATES_KEEPALIVE_SECONDS)
+                yield event if event is not None else ": keepalive\n\n"
+        finally:
+            live_update_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
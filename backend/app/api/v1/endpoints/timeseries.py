@@ -1,28 +1,34 @@
-from fastapi import APIRouter, HTTPException, Query, Depends, Path
-from datetime import datetime, timedelta, timezone
-import httpx
+from fastapi import APIRouter, HTTPException, Query, Depends, Path, Request, Response
+from fastapi.responses import JSONResponse
+from datetime import datetime, timezone
+from typing import Optional
 import asyncio
-from typing import List, Dict, Set
+import httpx
 
-from sqlalchemy.ext.asyncio import AsyncSession
+import numpy as np
 
-from app.api.v1.schemas.timeseries_schemas import (
-    CombinedSensorDataResponse,
-    CombinedDataPoint,
-    DataPoint as SourceDataPoint, # From external APIs
-)
+from app.api.v1.schemas.timeseries_schemas import CombinedSensorDataResponse
 from app.services.digital_twin_client import (
     DigitalTwinAPIClient, get_digital_twin_api_client,
     DigitalTwinAPIError # Catch specific errors
 )
+from app.services.ingest_queue import ingest_queue
+from app.services.resilience import Deadline
 from app.services.prediction_model_client import (
     PredictionModelAPIClient, get_prediction_model_api_client,
     PredictionAPIError # Catch specific errors
 )
-from app.db.session import get_async_db
+from app.core.config import settings
+from app.core.metrics import record_count, span
+from app.core.response_cache import (
+    CachedResponse, cache_control, etag_matches, not_modified_response,
+    response_cache, validator_headers, write_generations,
+)
+from app.core.series import MinuteSeries, epoch_minute
+from app.core.wire_format import SERIES_NPZ_MEDIA_TYPE, accepts_series_npz
+from app.db.session import db_connection
 from app.crud.crud_sensor_data import (
     get_sensor_data_from_db, 
-    upsert_sensor_data_points_db,
     truncate_to_minute
 )
 
@@ -33,25 +39,37 @@ async def get_http_client():
     async with httpx.AsyncClient() as client:
         yield client
 
-def generate_expected_timestamps(start_dt: datetime, end_dt: datetime) -> Set[datetime]:
-    expected_ts = set()
-    current_ts = truncate_to_minute(start_dt)
-    final_ts = truncate_to_minute(end_dt)
-    while current_ts <= final_ts:
-        expected_ts.add(current_ts)
-        current_ts += timedelta(minutes=1)
-    return expected_ts
+PARTIAL_HEADER = "X-Partial-Data"
+
+def build_combined_response(
+    sensor_name: str, combined: MinuteSeries, message: str, encoding: str, partial: bool = False,
+) -> Response:
+    """
+    Serializes the merged real/predicted series straight from its arrays, as the npz
+    encoding ("npz") or as CombinedSensorDataResponse JSON ("json"). Partial answers
+    are flagged in the JSON body and, for both encodings, with PARTIAL_HEADER.
+    """
+    headers = {PARTIAL_HEADER: "true"} if partial else None
+    if encoding == "npz":
+        return Response(content=combined.to_npz(), media_type=SERIES_NPZ_MEDIA_TYPE, headers=headers)
+    return JSONResponse({
+        "sensorName": sensor_name,
+        "data": combined.to_json_rows(["predicted_value", "real_value"]),
+        "message": message,
+        "partial": partial,
+    }, headers=headers)
 
 @router.get(
     "/{sensor_name}",
     response_model=CombinedSensorDataResponse,
+    responses={200: {"content": {SERIES_NPZ_MEDIA_TYPE: {}}}},
     summary="Get combined real and predicted time-series data for a sensor from DB and APIs",
 )
 async def get_combined_sensor_data_with_db_endpoint(
+    request: Request,
     sensor_name: str = Path(..., example="ActivePower"),
     start_date: datetime = Query(..., example="2025-02-17T01:00:00Z"),
     end_date: datetime = Query(..., example="2025-02-17T02:00:00Z"),
-    db: AsyncSession = Depends(get_async_db),
     dt_client: DigitalTwinAPIClient = Depends(get_digital_twin_api_client),
     pred_client: PredictionModelAPIClient = Depends(get_prediction_model_api_client),
     http_client: httpx.AsyncClient = Depends(get_http_client),
@@ -62,108 +80,114 @@ async def get_combined_sensor_data_with_db_endpoint(
     # Truncate input dates for consistency
     start_date_trunc = truncate_to_minute(start_date)
     end_date_trunc = truncate_to_minute(end_date)
+    # All downstream calls of this request share one time budget
+    deadline = Deadline(settings.REQUEST_BUDGET_SECONDS)
+
+    # Ranges that ended before the current minute no longer change, so their
+    # encoded responses are served from the response cache
+    encoding = "npz" if accepts_series_npz(request.headers.get("accept")) else "json"
+    if_none_match = request.headers.get("if-none-match")
+    current_minute = truncate_to_minute(datetime.now(timezone.utc))
+    historical = end_date_trunc < current_minute
+    start_minute, end_minute = epoch_minute(start_date_trunc), epoch_minute(end_date_trunc)
+    cache_key = (sensor_name, start_minute, end_minute, encoding)
+
+    # The validator only depends on write generations, so revalidation is answered before any I/O
+    def current_etag() -> str:
+        return write_generations.etag(
+            sensor_name, start_minute, end_minute, encoding, None if historical else epoch_minute(current_minute)
+        )
+
+    etag = current_etag()
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag, historical)
+    if historical:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return Response(
+                content=cached.body, media_type=cached.media_type,
+                headers=validator_headers(etag, historical),
+            )
 
-    # 1. Get existing data from DB
-    db_data_list = await get_sensor_data_from_db(db, sensor_name, start_date_trunc, end_date_trunc)
-    
-    # Convert DB data to a map for easy lookup and modification
-    # timestamp -> CombinedDataPoint
-    merged_data_map: Dict[datetime, CombinedDataPoint] = {
-        dp.timestamp: dp for dp in db_data_list
-    }
+    # 1. Get existing data from DB, one column per expected minute (NaN where missing).
+    # A pooled connection is only held around DB calls, never while waiting on the APIs.
+    async with db_connection() as conn:
+        combined = await get_sensor_data_from_db(conn, sensor_name, start_date_trunc, end_date_trunc)
 
     # 2. Determine what's missing
-    expected_timestamps = generate_expected_timestamps(start_date_trunc, end_date_trunc)
-    
-    needs_real_fetch = False
-    needs_predicted_fetch = False
-
-    for ts in expected_timestamps:
-        if ts not in merged_data_map:
-            needs_real_fetch = True
-            needs_predicted_fetch = True
-            continue # No data for this timestamp at all
-        
-        # Check if real_value is missing
-        if merged_data_map[ts].real_value is None:
-            needs_real_fetch = True
-        
-        # Check if predicted_value is missing
-        if merged_data_map[ts].predicted_value is None:
-            needs_predicted_fetch = True
-            
-        if needs_real_fetch and needs_predicted_fetch: # Optimization
-            break 
-
-    api_error_messages = []
+    needs_real_fetch = bool(np.isnan(combined.row("real_value")).any())
+    needs_predicted_fetch = bool(np.isnan(combined.row("predicted_value")).any())
 
     # 3. Fetch from DigitalTwinAPI if necessary
-    if needs_real_fetch:
+    async def fetch_real() -> Optional[str]:
         try:
             print(f"Fetching real data for {sensor_name} from API...")
-            real_api_response = await dt_client.get_sensor_data(
-                sensor_name, start_date_trunc, end_date_trunc, http_client
+            real_series = await dt_client.get_sensor_data(
+                sensor_name, start_date_trunc, end_date_trunc, http_client, deadline
             )
-            if real_api_response and real_api_response.data:
-                await upsert_sensor_data_points_db(db, sensor_name, real_api_response.data, "real")
-                # Update merged_data_map with new real data
-                for dp in real_api_response.data:
-                    ts_minute = truncate_to_minute(dp.timestamp)
-                    if ts_minute not in merged_data_map:
-                        merged_data_map[ts_minute] = CombinedDataPoint(timestamp=ts_minute)
-                    merged_data_map[ts_minute].real_value = dp.value
-            # No commit here, handled by get_async_db dependency manager
+            with span("merge"):
+                combined.assign("real_value", real_series)
+            # Queued for a batched write-behind flush; the response doesn't depend on it
+            await ingest_queue.submit(sensor_name, "real", real_series)
         except DigitalTwinAPIError as e:
             msg = f"Failed to fetch or store real data from DigitalTwinAPI: {e.message}"
             print(msg)
-            api_error_messages.append(msg)
+            return msg
         except Exception as e: # Catch other unexpected errors during fetch/upsert
             msg = f"Unexpected error processing real data: {str(e)}"
             print(msg)
-            api_error_messages.append(msg)
-
+            return msg
+        return None
 
     # 4. Fetch from PredictionModelAPI if necessary
-    if needs_predicted_fetch:
+    async def fetch_predicted() -> Optional[str]:
         try:
             print(f"Fetching predicted data for {sensor_name} from API...")
-            predicted_api_response = await pred_client.get_predicted_data(
-                sensor_name, start_date_trunc, end_date_trunc, http_client
+            predicted_series = await pred_client.get_predicted_data(
+                sensor_name, start_date_trunc, end_date_trunc, http_client, deadline
             )
-            if predicted_api_response and predicted_api_response.data:
-                await upsert_sensor_data_points_db(db, sensor_name, predicted_api_response.data, "predicted")
-                # Update merged_data_map with new predicted data
-                for dp in predicted_api_response.data:
-                    ts_minute = truncate_to_minute(dp.timestamp)
-                    if ts_minute not in merged_data_map:
-                        merged_data_map[ts_minute] = CombinedDataPoint(timestamp=ts_minute)
-                    merged_data_map[ts_minute].predicted_value = dp.value
+            with span("merge"):
+                combined.assign("predicted_value", predicted_series)
+            await ingest_queue.submit(sensor_name, "predicted", predicted_series)
         except PredictionAPIError as e:
             msg = f"Failed to fetch or store predicted data from PredictionModelAPI: {e.message}"
             print(msg)
-            api_error_messages.append(msg)
+            return msg
         except Exception as e:
             msg = f"Unexpected error processing predicted data: {str(e)}"
             print(msg)
-            api_error_messages.append(msg)
+            return msg
+        return None
+
+    # Both run concurrently within the request budget, so a slow rollout does not
+    # hold back real values; what misses the deadline is left out and flagged
+    fetches = []
+    if needs_real_fetch:
+        fetches.append(fetch_real())
+    if needs_predicted_fetch:
+        fetches.append(fetch_predicted())
+    api_error_messages = [msg for msg in await asyncio.gather(*fetches) if msg]
     
-    # 5. Construct final response from merged_data_map, ensuring all expected timestamps are present
-    final_data_points: List[CombinedDataPoint] = []
-    for ts in sorted(list(expected_timestamps)): # Ensure sorted output
-        if ts in merged_data_map:
-            final_data_points.append(merged_data_map[ts])
-        else:
-            # This case should ideally be covered if merged_data_map is updated correctly
-            # after API fetches. If a timestamp is expected but not in map, it means
-            # it wasn't in DB and wasn't fetched (or fetch failed and wasn't added).
-            final_data_points.append(CombinedDataPoint(timestamp=ts, real_value=None, predicted_value=None))
+    # 5. Build the response; every expected minute is a column, missing values stay null
+    record_count("points_returned", len(combined))
             
     response_message = "Data fetched successfully."
     if api_error_messages:
         response_message += " Some API errors occurred: " + "; ".join(api_error_messages)
 
-    return CombinedSensorDataResponse(
-        sensorName=sensor_name,
-        data=final_data_points,
-        message=response_message
-    )
+    # Only complete answers get the validator and are cacheable; failed downstream calls
+    # are retried next time. A write during this request makes the answer's version unclear.
+    validated = not api_error_messages and current_etag() == etag
+    cacheable = historical and validated
+
+    with span("serialize"):
+        response = build_combined_response(
+            sensor_name, combined, response_message, encoding, partial=bool(api_error_messages)
+        )
+    if cacheable:
+        response_cache.put(cache_key, CachedResponse(response.body, response.media_type, combined))
+    if validated:
+        response.headers.update(validator_headers(etag, cacheable))
+    else:
+        response.headers["Cache-Control"] = cache_control(False)
+    return response
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Union, Optional
+from typing import Dict, List, Union, Optional
 from pydantic import BaseModel, Field
 
 class DataPoint(BaseModel):
@@ -21,6 +21,12 @@ class PredictionDataResponse(BaseModel):
     data: List[DataPoint] # List of DataPoint with predicted values
     message: Optional[str] = "Predicted data fetched successfully"
 
+class BatchPredictionDataResponse(BaseModel):
+    predictions: List[PredictionDataResponse]
+
+class PredictionContextResponse(BaseModel):
+    lastKnownTimestamps: Dict[str, datetime] # Newest observation in each sensor's forecast context
+
 # Schemas for the combined output
 class CombinedDataPoint(BaseModel):
     timestamp: datetime
@@ -30,4 +36,7 @@ class CombinedDataPoint(BaseModel):
 class CombinedSensorDataResponse(BaseModel):
     sensorName: str
     data: List[CombinedDataPoint]
-    message: str = "Data fetched successfully"
\ No newline at end of file
+    message: str = "Data fetched successfully"
+    # True when a downstream service failed or missed the request budget, so only
+    # the values available in the DB (and from the services that answered) are included
+    partial: bool = False
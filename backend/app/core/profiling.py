@@ -0,0 +1,112 @@
+"""
+Opt-in request profiling.
+
+`ProfilingMiddleware` runs selected requests under a profiler and writes the
+result to a local directory. A request is profiled when it carries the
+`X-Profile: 1` header and header triggering is enabled, or when it is picked by
+the sample rate. The middleware is only installed when one of the two is
+configured, so a disabled profiler costs nothing per request.
+
+pyinstrument is used when it is installed (statistical, follows awaits across
+tasks, writes HTML); otherwise the standard library cProfile writes a `.prof`
+file for `snakeviz`/`pstats`. cProfile sees everything the event loop runs
+while the request is in flight, so concurrent requests show up in its output.
+"""
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+from app.core.metrics import current_trace_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_FILE_HEADER = "X-Profile-File"
+# Trace IDs and paths come from the client; only these characters reach a file name
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9_-]")
+_MAX_FILENAME_PART = 64
+
+try:
+    from pyinstrument import Profiler as _PyinstrumentProfiler
+except ImportError:
+    _PyinstrumentProfiler = None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, header_enabled: bool = False, sample_rate: float = 0.0, output_dir: str = "profiles"):
+        self.app = app
+        self.header_enabled = header_enabled
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        # Only one cProfile profiler can be active per interpreter
+        self._cprofile_lock = threading.Lock()
+
+    def _wants_profile(self, scope) -> bool:
+        if self.header_enabled:
+            for name, value in scope.get("headers") or []:
+                if name == PROFILE_HEADER.lower().encode():
+                    if value.strip() in (b"1", b"true"):
+                        return True
+                    break
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @staticmethod
+    def _filename_part(value: str) -> str:
+        return _UNSAFE_FILENAME_CHARS.sub("_", value)[:_MAX_FILENAME_PART]
+
+    def _profile_path(self, scope, extension: str) -> str:
+        slug = self._filename_part(scope["path"].strip("/")) or "root"
+        trace_id = self._filename_part(current_trace_id() or "") or uuid.uuid4().hex
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{trace_id}.{extension}"
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, name)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if _PyinstrumentProfiler is not None:
+            path = self._profile_path(scope, "html")
+            profiler = _PyinstrumentProfiler(async_mode="enabled")
+            profiler.start()
+            try:
+                await self.app(scope, receive, self._send_with_profile_file(send, path))
+            finally:
+                profiler.stop()
+                with open(path, "w") as f:
+                    f.write(profiler.output_html())
+            logger.info(f"Saved profile of {scope['path']} to {path}")
+            return
+
+        if not self._cprofile_lock.acquire(blocking=False):
+            # Another request is being profiled; serve this one normally
+            await self.app(scope, receive, send)
+            return
+        path = self._profile_path(scope, "prof")
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, self._send_with_profile_file(send, path))
+            finally:
+                profiler.disable()
+                profiler.dump_stats(path)
+        finally:
+            self._cprofile_lock.release()
+        logger.info(f"Saved profile of {scope['path']} to {path}")
+
+    @staticmethod
+    def _send_with_profile_file(send, path: str):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_FILE_HEADER.lower().encode(), os.path.basename(path).encode())
+                ]
+            await send(message)
+        return send_wrapper
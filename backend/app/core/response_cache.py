@@ -0,0 +1,195 @@
+"""
+Read-through cache and conditional-request support for combined series responses.
+
+Complete combined responses carry an `ETag` that is derived from a version
+token rather than from the content: the sensor, range and encoding plus the
+write generations of the days the range covers (bumped by every write to that
+sensor and day) and, for ranges that are not yet historical, the current
+minute. The token is known before anything is read, so a client revalidating
+with `If-None-Match` gets a 304 without any DB query or downstream call.
+Tokens include a random per-process id, so a worker never accepts a token it
+did not issue.
+
+Responses for fully historical ranges (ending before the current minute, all
+downstream calls successful) no longer change, so their encoded bytes are
+additionally kept in a bounded in-process LRU: a repeat request is answered
+from memory without a DB query or serialization.
+
+Every entry keeps the merged series it was encoded from. A write to the
+sensor drops an overlapping entry only if a written value differs from the
+value the entry serves. The write-behind flush of the very values a response
+was built from therefore keeps that response cached. The cache is per process; with several workers each holds its
+own copy, which is safe because a historical range is only written once,
+when it is first filled from the downstream services.
+"""
+import hashlib
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from fastapi import Response
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+from app.core.metrics import METRICS_NAMESPACE
+from app.core.series import MinuteSeries
+
+CACHE_REQUESTS = Counter(
+    "response_cache_requests_total", "Combined response cache lookups by result.",
+    ["result"], namespace=METRICS_NAMESPACE,
+)
+CACHE_BYTES = Gauge(
+    "response_cache_bytes", "Bytes of response bodies held in the response cache.",
+    namespace=METRICS_NAMESPACE,
+)
+
+# (sensor name, start minute, end minute, encoding)
+CacheKey = Tuple[str, int, int, str]
+
+GENERATION_BUCKET_MINUTES = 24 * 60
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    media_type: str
+    # The merged series the body was encoded from, to tell whether a write changes it
+    series: MinuteSeries
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body) + self.series.values.nbytes
+
+
+class WriteGenerations:
+    """
+    Per-process version counters of (sensor, day), bumped whenever values of
+    that sensor and day are written. A range's version token combines the
+    counters of the days it covers, so writes only change the tokens of the
+    ranges they touch.
+    """
+
+    def __init__(self, bucket_minutes: int = GENERATION_BUCKET_MINUTES):
+        self.bucket_minutes = bucket_minutes
+        self.process_id = uuid.uuid4().hex
+        self._counter = 0
+        self._generations: Dict[Tuple[str, int], int] = {}
+
+    def bump(self, sensor_name: str, minutes: Iterable[int]):
+        self._counter += 1
+        for bucket in {minute // self.bucket_minutes for minute in minutes}:
+            self._generations[(sensor_name, bucket)] = self._counter
+
+    def etag(
+        self, sensor_name: str, start_minute: int, end_minute: int, encoding: str, current_minute: Optional[int],
+    ) -> str:
+        """
+        Strong validator for a combined response, computed without reading the data.
+
+        Args:
+            current_minute (Optional[int]): The current minute for ranges that still
+                fill in as time passes; None for historical ranges.
+        """
+        generations = ",".join(
+            str(self._generations.get((sensor_name, bucket), 0))
+            for bucket in range(start_minute // self.bucket_minutes, end_minute // self.bucket_minutes + 1)
+        )
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(
+            f"{self.process_id}|{sensor_name}|{start_minute}|{end_minute}|{encoding}|{current_minute}|{generations}".encode()
+        )
+        return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an `If-None-Match` header against `etag`, as required for GET."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def cache_control(historical: bool) -> str:
+    if historical:
+        return f"public, max-age={settings.RESPONSE_CACHE_HISTORICAL_MAX_AGE_SECONDS}"
+    # Recent and future ranges still fill in, so clients must revalidate every time
+    return "no-cache"
+
+
+def validator_headers(etag: str, historical: bool) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control(historical), "Vary": "Accept"}
+
+
+def not_modified_response(etag: str, historical: bool) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, historical))
+
+
+class ResponseCache:
+    """LRU of encoded response bodies, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[CacheKey, CachedResponse]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            CACHE_REQUESTS.labels("miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        CACHE_REQUESTS.labels("hit").inc()
+        return entry
+
+    def put(self, key: CacheKey, entry: CachedResponse):
+        size = entry.nbytes
+        if size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = entry
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+        CACHE_BYTES.set(self.total_bytes)
+
+    def invalidate(self, sensor_name: str, column: str, minutes: np.ndarray, values: np.ndarray):
+        """
+        Drops the entries of `sensor_name` that serve a different value than was
+        written for one of `minutes` in `column` ("real_value" or "predicted_value").
+        """
+        minutes = np.asarray(minutes, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        start_minute, end_minute = int(minutes.min()), int(minutes.max())
+        stale = []
+        for key, entry in self._entries.items():
+            if key[0] != sensor_name or key[1] > end_minute or key[2] < start_minute:
+                continue
+            offsets = minutes - entry.series.start_minute
+            inside = (offsets >= 0) & (offsets < len(entry.series))
+            # NaN (a gap the entry served as null) never equals a written value
+            if not np.array_equal(entry.series.row(column)[offsets[inside]], values[inside]):
+                stale.append(key)
+        for key in stale:
+            self._remove(key)
+        CACHE_BYTES.set(self.total_bytes)
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+        CACHE_BYTES.set(0)
+
+    def _remove(self, key: CacheKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.nbytes
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+write_generations = WriteGenerations()
@@ -0,0 +1,160 @@
+"""
+Compact representation of regular 1-minute time series.
+
+All series in this system live on the UTC minute grid, so instead of one
+`datetime` per point a `MinuteSeries` stores the epoch minute of the first
+column, the step and a (series, minutes) float64 matrix with NaN for missing
+values: 8 bytes per value instead of a pydantic object per point. Merging two
+series is a masked array assignment over their overlapping columns.
+"""
+import math
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.core.wire_format import decode_series_npz, encode_series_npz
+
+
+def epoch_minute(dt: datetime) -> int:
+    """Whole Unix epoch minutes of `dt`; naive datetimes are treated as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return math.floor(dt.timestamp() / 60.0)
+
+
+def epoch_minute_to_datetime(minute: int) -> datetime:
+    return datetime.fromtimestamp(minute * 60, tz=timezone.utc)
+
+
+class MinuteSeries:
+    """
+    One or more named series sharing a regular minute grid.
+
+    Attributes:
+        names (List[str]): Name of each row of `values`.
+        start_minute (int): Unix epoch minute of the first column.
+        step_minutes (int): Minutes between consecutive columns.
+        values (np.ndarray): float64 array of shape (len(names), n), NaN where missing.
+    """
+
+    __slots__ = ("names", "start_minute", "step_minutes", "values")
+
+    def __init__(self, names: Sequence[str], start_minute: int, values: np.ndarray, step_minutes: int = 1):
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[np.newaxis, :]
+        if values.shape[0] != len(names):
+            raise ValueError(f"Expected {len(names)} rows of values, got {values.shape[0]}.")
+        self.names = list(names)
+        self.start_minute = int(start_minute)
+        self.step_minutes = int(step_minutes)
+        self.values = values
+
+    @classmethod
+    def empty(cls, names: Sequence[str], start: datetime, end: datetime) -> "MinuteSeries":
+        """All-NaN series covering every whole minute from `start` to `end`, inclusive."""
+        start_minute = epoch_minute(start)
+        count = max(epoch_minute(end) - start_minute + 1, 0)
+        return cls(names, start_minute, np.full((len(names), count), np.nan))
+
+    @classmethod
+    def from_points(cls, names: Sequence[str], points_per_series: Sequence[Sequence]) -> "MinuteSeries":
+        """
+        Puts `{timestamp, value}` points (one sequence per name) on a shared minute grid
+        spanning all of them, e.g. for services that answered with JSON.
+        """
+        minutes = [[epoch_minute(dp.timestamp) for dp in points] for points in points_per_series]
+        all_minutes = [m for series_minutes in minutes for m in series_minutes]
+        if not all_minutes:
+            return cls(names, 0, np.empty((len(names), 0)))
+
+        start_minute = min(all_minutes)
+        values = np.full((len(names), max(all_minutes) - start_minute + 1), np.nan)
+        for row, (series_minutes, points) in enumerate(zip(minutes, points_per_series)):
+            for minute, dp in zip(series_minutes, points):
+                if dp.value is not None:
+                    values[row, minute - start_minute] = float(dp.value)
+        return cls(names, start_minute, values)
+
+    @classmethod
+    def from_npz(cls, payload: bytes) -> "MinuteSeries":
+        """Decodes a payload in the npz encoding of `app.core.wire_format`."""
+        encoded = decode_series_npz(payload)
+        return cls(encoded.names, encoded.start_minute, encoded.values, encoded.step_minutes)
+
+    def to_npz(self) -> bytes:
+        """Encodes the series in the npz encoding of `app.core.wire_format`."""
+        return encode_series_npz(self.names, self.start_minute, self.step_minutes, self.values)
+
+    def __len__(self) -> int:
+        return self.values.shape[1]
+
+    def __repr__(self) -> str:
+        return f"MinuteSeries(names={self.names}, start={epoch_minute_to_datetime(self.start_minute)}, length={len(self)})"
+
+    @property
+    def end_minute(self) -> int:
+        """Epoch minute of the last column (inclusive)."""
+        return self.start_minute + (len(self) - 1) * self.step_minutes
+
+    def row(self, name: str) -> np.ndarray:
+        return self.values[self.names.index(name)]
+
+    def select(self, name: str) -> "MinuteSeries":
+        """Single-row view of one named series."""
+        return MinuteSeries([name], self.start_minute, self.values[self.names.index(name)], self.step_minutes)
+
+    def minutes(self) -> np.ndarray:
+        return self.start_minute + np.arange(len(self), dtype=np.int64) * self.step_minutes
+
+    def iso_timestamps(self) -> np.ndarray:
+        """Column timestamps as ISO 8601 UTC strings ("2025-02-17T01:00:00Z")."""
+        as_datetime64 = self.minutes().astype("datetime64[m]")
+        return np.char.add(np.datetime_as_string(as_datetime64, unit="s"), "Z")
+
+    def count_present(self, name: Optional[str] = None) -> int:
+        values = self.values if name is None else self.row(name)
+        return int(np.count_nonzero(~np.isnan(values)))
+
+    def assign(self, name: str, source: "MinuteSeries", source_name: Optional[str] = None) -> int:
+        """
+        Overwrites row `name` with the non-NaN values of `source` where the two grids overlap.
+
+        Args:
+            name (str): Row of this series to update.
+            source (MinuteSeries): Series to copy values from; must use the same step.
+            source_name (Optional[str]): Row of `source`; defaults to its only/first row.
+
+        Returns:
+            int: Number of values copied.
+        """
+        if source.step_minutes != self.step_minutes:
+            raise ValueError("Cannot merge series with different steps.")
+        source_values = source.row(source_name) if source_name else source.values[0]
+        offset = source.start_minute - self.start_minute
+        if offset % self.step_minutes:
+            raise ValueError("Cannot merge series on shifted grids.")
+        offset //= self.step_minutes
+
+        target_from, target_to = max(offset, 0), min(offset + len(source), len(self))
+        if target_from >= target_to:
+            return 0
+        target = self.row(name)[target_from:target_to]
+        source_slice = source_values[target_from - offset:target_to - offset]
+        present = ~np.isnan(source_slice)
+        target[present] = source_slice[present]
+        return int(np.count_nonzero(present))
+
+    def to_json_rows(self, fields: Sequence[str]) -> List[dict]:
+        """One dict per column with `timestamp` and the given rows (None where NaN)."""
+        columns = []
+        for field in fields:
+            column = self.row(field).astype(object)
+            column[np.isnan(self.row(field))] = None
+            columns.append(column.tolist())
+        timestamps = self.iso_timestamps().tolist()
+        return [
+            dict(zip(("timestamp", *fields), row))
+            for row in zip(timestamps, *columns)
+        ]
@@ -1,11 +1,14 @@
-from sqlalchemy import select, func
-from sqlalchemy.dialects.postgresql import insert as pg_insert # Ensure this is imported
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
+import asyncpg
+import numpy as np
+
+from app.core.metrics import record_count, span
+from app.core.response_cache import response_cache, write_generations
+from app.core.series import MinuteSeries
 from app.db.models import SensorDataTS
-from app.api.v1.schemas.timeseries_schemas import CombinedDataPoint, DataPoint as SourceDataPoint
+from app.services.live_updates import live_update_hub
 
 def truncate_to_minute(dt: datetime) -> datetime:
     if dt.tzinfo is None:
@@ -14,120 +17,159 @@ def truncate_to_minute(dt: datetime) -> datetime:
         dt = dt.astimezone(timezone.utc)
     return dt.replace(second=0, microsecond=0)
 
+COMBINED_FIELDS = ["real_value", "predicted_value"]
+
+# The hot queries are issued on raw asyncpg connections (see app.db.session.db_connection).
+# Their SQL text is constant, so asyncpg prepares each once per connection and only the
+# parameters travel on later calls. Timestamps are exchanged as epoch minutes and values
+# as arrays, so neither side builds a datetime or a VALUES row per point.
+_TABLE = SensorDataTS.__tablename__
+
+SELECT_SERIES_SQL = f"""
+    SELECT floor(extract(epoch FROM timestamp) / 60)::bigint AS minute, real_value, predicted_value
+    FROM {_TABLE}
+    WHERE sensor_name = $1 AND timestamp >= $2 AND timestamp <= $3
+"""
+
+SELECT_LATEST_PREDICTED_SQL = f"""
+    SELECT sensor_name, max(timestamp)
+    FROM {_TABLE}
+    WHERE sensor_name = any($1::text[]) AND timestamp >= $2 AND predicted_value IS NOT NULL
+    GROUP BY sensor_name
+"""
+
+# Only the column of the given source is written, so an existing value of the other
+# source for the same (sensor_name, timestamp) is kept
+UPSERT_SERIES_SQL = {
+    column: f"""
+    INSERT INTO {_TABLE} (sensor_name, timestamp, {column})
+    SELECT $1, to_timestamp(points.minute * 60), points.value
+    FROM unnest($2::bigint[], $3::float8[]) AS points(minute, value)
+    ON CONFLICT (sensor_name, timestamp) DO UPDATE SET {column} = EXCLUDED.{column}
+"""
+    for column in COMBINED_FIELDS
+}
+
+# Same for points of several sensors at once, e.g. batches coalesced by the ingest queue
+UPSERT_BATCH_SQL = {
+    column: f"""
+    INSERT INTO {_TABLE} (sensor_name, timestamp, {column})
+    SELECT points.sensor_name, to_timestamp(points.minute * 60), points.value
+    FROM unnest($1::text[], $2::bigint[], $3::float8[]) AS points(sensor_name, minute, value)
+    ON CONFLICT (sensor_name, timestamp) DO UPDATE SET {column} = EXCLUDED.{column}
+"""
+    for column in COMBINED_FIELDS
+}
+
 async def get_sensor_data_from_db(
-    db: AsyncSession,
+    conn: asyncpg.Connection,
     sensor_name: str,
     start_date: datetime,
     end_date: datetime,
-) -> List[CombinedDataPoint]:
-    
+) -> MinuteSeries:
+    """
+    Reads a sensor's stored values as a MinuteSeries with one column per minute of
+    [start_date, end_date] and rows COMBINED_FIELDS; minutes without a row are NaN.
+    """
     start_date_trunc = truncate_to_minute(start_date)
     end_date_trunc = truncate_to_minute(end_date)
 
-    stmt = (
-        select(SensorDataTS)
-        .where(
-            SensorDataTS.sensor_name == sensor_name,
-            SensorDataTS.timestamp >= start_date_trunc,
-            SensorDataTS.timestamp <= end_date_trunc,
-        )
-        .order_by(SensorDataTS.timestamp)
-    )
-    result = await db.execute(stmt)
-    db_records = result.scalars().all()
-    
-    return [
-        CombinedDataPoint(
-            timestamp=record.timestamp,
-            real_value=record.real_value,
-            predicted_value=record.predicted_value,
-        )
-        for record in db_records
-    ]
-
-async def upsert_sensor_data_points_db(
-    db: AsyncSession,
+    with span("db_read"):
+        db_rows = await conn.fetch(SELECT_SERIES_SQL, sensor_name, start_date_trunc, end_date_trunc)
+    record_count("db_rows_read", len(db_rows))
+
+    series = MinuteSeries.empty(COMBINED_FIELDS, start_date_trunc, end_date_trunc)
+    if db_rows:
+        # None becomes NaN when converted to float64
+        rows = np.array([tuple(row) for row in db_rows], dtype=np.float64)
+        offsets = rows[:, 0].astype(np.int64) - series.start_minute
+        series.values[:, offsets] = rows[:, 1:].T
+    return series
+
+async def get_latest_predicted_timestamps(
+    conn: asyncpg.Connection,
+    sensor_names: List[str],
+    since: datetime,
+) -> Dict[str, datetime]:
+    """Returns, per sensor, the newest timestamp at or after `since` that has a predicted value."""
+    rows = await conn.fetch(SELECT_LATEST_PREDICTED_SQL, list(sensor_names), truncate_to_minute(since))
+    return {sensor_name: latest for sensor_name, latest in rows}
+
+def build_sensor_data_upsert_args(
     sensor_name: str,
-    api_data_points: List[SourceDataPoint], 
+    series: MinuteSeries,
     value_type: str, # "real" or "predicted"
-):
-    if not api_data_points:
-        return
-
-    points_to_upsert = []
-    for dp in api_data_points:
-        point_data = {
-            "sensor_name": sensor_name,
-            "timestamp": truncate_to_minute(dp.timestamp),
-        }
-        if value_type == "real":
-            point_data["real_value"] = dp.value
-            # For COALESCE to work as intended, don't set predicted_value if it's not from this source
-        elif value_type == "predicted":
-            point_data["predicted_value"] = dp.value
-            # Don't set real_value
-        points_to_upsert.append(point_data)
-
-    if not points_to_upsert:
-        return
-
-    stmt = pg_insert(SensorDataTS).values(points_to_upsert)
-    
-    # This logic ensures that we only update the field we have new data for.
-    # If inserting real data, predicted_value in DB should remain untouched if it exists.
-    # If inserting predicted data, real_value in DB should remain untouched.
-    update_values = {}
-    if value_type == "real":
-        update_values[SensorDataTS.real_value.name] = stmt.excluded.real_value
-        # To preserve existing predicted_value if not explicitly overwritten by a future predicted data upsert:
-        #update_values[SensorDataTS.predicted_value.name] = func.coalesce(stmt.excluded.predicted_value, SensorDataTS.predicted_value)
-
-    elif value_type == "predicted":
-        update_values[SensorDataTS.predicted_value.name] = stmt.excluded.predicted_value
-        # To preserve existing real_value:
-        #update_values[SensorDataTS.real_value.name] = func.coalesce(stmt.excluded.real_value, SensorDataTS.real_value)
-
-
-    # A more general upsert that updates provided fields and preserves others:
-    # This assumes `points_to_upsert` contains dicts where keys not present mean "do not update this field".
-    # However, standard SQL INSERT will treat missing fields as NULL.
-    # The COALESCE strategy is generally better for partial updates.
-
-    # Corrected on_conflict_do_update:
-    # If inserting real data, update real_value, keep existing predicted_value.
-    # If inserting predicted data, update predicted_value, keep existing real_value.
-    
-    set_clause = {}
-    if value_type == "real":
-        set_clause['real_value'] = stmt.excluded.real_value
-        # If predicted_value was also part of EXCLUDED (i.e., points_to_upsert had it),
-        # and it was NULL, this would nullify existing. So, be careful.
-        # The COALESCE approach is safer if points_to_upsert only contains the relevant value type.
-        #set_clause['predicted_value'] = func.coalesce(SensorDataTS.predicted_value, stmt.excluded.predicted_value) # Keep existing if new is null
-        func.coalesce(SensorDataTS.predicted_value, stmt.excluded.predicted_value) # Keep existing if new is null
-    elif value_type == "predicted":
-        set_clause['predicted_value'] = stmt.excluded.predicted_value
-        #set_clause['real_value'] = func.coalesce(SensorDataTS.real_value, stmt.excluded.real_value)
-        func.coalesce(SensorDataTS.real_value, stmt.excluded.real_value)
-
-
-    # Final refined upsert logic for clarity and correctness:
-    # When upserting "real" values, we only want to affect real_value.
-    # When upserting "predicted" values, we only want to affect predicted_value.
-    final_set_clause = {}
-    if value_type == "real":
-        final_set_clause[SensorDataTS.real_value.name] = stmt.excluded.real_value
-    elif value_type == "predicted":
-        final_set_clause[SensorDataTS.predicted_value.name] = stmt.excluded.predicted_value
-    
-    # This ensures that only the specified value_type column is updated from EXCLUDED,
-    # other columns are not touched by the UPDATE part of ON CONFLICT.
-    # If the row doesn't exist, it's inserted with one value and NULL for the other.
-    # If it exists, only the specified value is updated.
-
-    stmt = stmt.on_conflict_do_update(
-        index_elements=[SensorDataTS.sensor_name, SensorDataTS.timestamp],
-        set_=final_set_clause
+) -> Optional[Tuple[str, str, List[int], List[float]]]:
+    """
+    Builds the upsert query and its parameters for a single-row minute series,
+    or None if there is nothing to write. NaN values are skipped.
+    """
+    column = "real_value" if value_type == "real" else "predicted_value"
+    values = series.values[0]
+    present = np.flatnonzero(~np.isnan(values))
+    if not len(present):
+        return None
+    return (
+        UPSERT_SERIES_SQL[column],
+        sensor_name,
+        series.minutes()[present].tolist(),
+        values[present].tolist(),
     )
 
-    await db.execute(stmt)
+async def upsert_sensor_series_db(
+    conn: asyncpg.Connection,
+    sensor_name: str,
+    series: MinuteSeries,
+    value_type: str, # "real" or "predicted"
+) -> int:
+    """Upserts the non-NaN values of a single-row minute series and returns how many were written."""
+    args = build_sensor_data_upsert_args(sensor_name, series, value_type)
+    if args is None:
+        return 0
+
+    with span("db_upsert"):
+        await conn.execute(*args)
+    written = len(args[2])
+    record_count("db_rows_upserted", written)
+    _after_write(sensor_name, value_type, args[2], args[3])
+    return written
+
+async def upsert_sensor_batches_db(
+    conn: asyncpg.Connection,
+    value_type: str, # "real" or "predicted"
+    batches: List[Tuple[str, np.ndarray, np.ndarray]],
+) -> int:
+    """
+    Upserts the points of several sensors with a single statement.
+
+    Args:
+        conn (asyncpg.Connection): Connection to write on.
+        value_type (str): "real" or "predicted"; selects the column written.
+        batches (List[Tuple[str, np.ndarray, np.ndarray]]): (sensor name, epoch minutes,
+            values) per sensor; each sensor's minutes must be unique and values non-NaN.
+
+    Returns:
+        int: Number of points written.
+    """
+    column = "real_value" if value_type == "real" else "predicted_value"
+    batches = [(name, np.asarray(m), np.asarray(v)) for name, m, v in batches if len(m)]
+    if not batches:
+        return 0
+
+    sensor_names = [name for name, minutes, _ in batches for _ in range(len(minutes))]
+    minutes = np.concatenate([m for _, m, _ in batches]).tolist()
+    values = np.concatenate([v for _, _, v in batches]).tolist()
+    with span("db_upsert"):
+        await conn.execute(UPSERT_BATCH_SQL[column], sensor_names, minutes, values)
+    record_count("db_rows_upserted", len(minutes))
+
+    for sensor_name, sensor_minutes, sensor_values in batches:
+        _after_write(sensor_name, value_type, sensor_minutes.tolist(), sensor_values.tolist())
+    return len(minutes)
+
+def _after_write(sensor_name: str, value_type: str, minutes: List[int], values: List[float]):
+    """Keeps derived state in sync with a write: response validators, cached responses and live subscribers."""
+    write_generations.bump(sensor_name, minutes)
+    column = "real_value" if value_type == "real" else "predicted_value"
+    response_cache.invalidate(sensor_name, column, minutes, values)
+    live_update_hub.publish(sensor_name, value_type, minutes, values)
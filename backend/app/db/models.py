@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Float, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, Float, Index
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict, Any, Optional
@@ -11,14 +11,21 @@ from app.core.config import settings
 class SensorDataTS(Base):
     __tablename__ = settings.TIMESERIES_TABLE_NAME
 
-    sensor_name = Column(String, primary_key=True, index=True)
-    timestamp = Column(DateTime(timezone=True), primary_key=True, index=True)
+    sensor_name = Column(String, nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
     real_value = Column(Float, nullable=True)
     predicted_value = Column(Float, nullable=True)
 
+    # The schema is managed by the Alembic revisions in backend/alembic. The single
+    # unique (sensor_name, timestamp DESC) index serves every query and is the ON
+    # CONFLICT arbiter of the upserts; there is no separate primary key constraint.
     __table_args__ = (
-        UniqueConstraint('sensor_name', 'timestamp', name='uq_sensor_timestamp'),
+        Index(
+            f"ix_{settings.TIMESERIES_TABLE_NAME}_sensor_name_timestamp",
+            sensor_name, timestamp.desc(), unique=True,
+        ),
     )
+    __mapper_args__ = {"primary_key": [sensor_name, timestamp]}
 
     @classmethod
     async def bulk_upsert(cls, session: AsyncSession, data_points: List[Dict[str, Any]]):
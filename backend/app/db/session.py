@@ -1,11 +1,49 @@
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+import asyncpg
+from alembic import command
+from alembic.config import Config
+from prometheus_client import Gauge, Histogram
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import text
 
 from app.core.config import settings
+from app.core.metrics import METRICS_NAMESPACE, span
+
+async_engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False, # Set echo=True for SQL logging
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={
+        # asyncpg's own cache of prepared statements used by raw connections
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        # SQLAlchemy's per-connection cache of prepared statements for ORM/Core queries
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    },
+)
 
-async_engine = create_async_engine(settings.DATABASE_URL, echo=False) # Set echo=True for SQL logging
+POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting to check out a DB connection.",
+    namespace=METRICS_NAMESPACE,
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+Gauge(
+    "db_pool_checked_out", "DB connections currently checked out of the pool.",
+    namespace=METRICS_NAMESPACE,
+).set_function(lambda: async_engine.pool.checkedout())
+Gauge(
+    "db_pool_size", "DB connections currently held by the pool (idle and checked out).",
+    namespace=METRICS_NAMESPACE,
+).set_function(lambda: async_engine.pool.checkedin() + async_engine.pool.checkedout())
 
 AsyncSessionFactory = sessionmaker(
     bind=async_engine, class_=AsyncSession, expire_on_commit=False
@@ -13,6 +51,8 @@ AsyncSessionFactory = sessionmaker(
 
 Base = declarative_base()
 
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
 async def get_async_db() -> AsyncSession:
     async with AsyncSessionFactory() as session:
         try:
@@ -24,49 +64,40 @@ async def get_async_db() -> AsyncSession:
         finally:
             await session.close()
 
+@asynccontextmanager
+async def db_connection() -> AsyncIterator[asyncpg.Connection]:
+    """
+    Checks a raw asyncpg connection out of the engine's pool, for the high-frequency
+    read and bulk-upsert queries that don't need an ORM session.
+
+    Statements run in autocommit mode and are prepared once per connection through
+    asyncpg's statement cache. Hold the connection only around DB calls, not while
+    waiting on other services, so the pool isn't starved by slow downstream requests.
+    """
+    conn = async_engine.connect()
+    started = time.perf_counter()
+    with span("db_pool_wait"):
+        await conn.start()
+    POOL_WAIT.observe(time.perf_counter() - started)
+    try:
+        raw_connection = await conn.get_raw_connection()
+        yield raw_connection.driver_connection
+    finally:
+        await conn.close()
+
+def run_migrations(connection):
+    """Upgrades the schema to the latest Alembic revision on an open sync connection."""
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
 async def init_db():
     async with async_engine.connect() as conn:
         # Create extension if not exists (requires superuser or specific grants)
         await conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb CASCADE;"))
         await conn.commit() # Commit extension creation
 
+    # Create or upgrade the timeseries hypertable (see backend/alembic/versions)
     async with async_engine.begin() as conn:
-        # Create all tables defined by Base's subclasses
-        await conn.run_sync(Base.metadata.create_all)
-    
-    # Create hypertable after the table is created by SQLAlchemy
-    async with AsyncSessionFactory() as session:
-        try:
-            # Check if it's already a hypertable
-            # This check is a bit simplified; a more robust check might query TimescaleDB's metadata
-            check_hyper_sql = text(f"""
-                SELECT EXISTS (
-                    SELECT 1
-                    FROM timescaledb_information.hypertables
-                    WHERE hypertable_name = '{settings.TIMESERIES_TABLE_NAME}'
-                );
-            """)
-            result = await session.execute(check_hyper_sql)
-            is_hypertable = result.scalar_one_or_none()
-
-            if not is_hypertable:
-                create_hyper_sql = text(
-                    f"SELECT create_hypertable("
-                    f"'{settings.TIMESERIES_TABLE_NAME}', "
-                    f"'timestamp', "
-                    f"if_not_exists => TRUE, "
-                    f"chunk_time_interval => INTERVAL '7 days'" # Adjust as needed
-                    f");"
-                )
-                await session.execute(create_hyper_sql)
-                await session.commit()
-                print(f"Hypertable '{settings.TIMESERIES_TABLE_NAME}' created or already exists.")
-            else:
-                print(f"Hypertable '{settings.TIMESERIES_TABLE_NAME}' already exists.")
-
-        except SQLAlchemyError as e:
-            await session.rollback()
-            print(f"Error during hypertable creation for {settings.TIMESERIES_TABLE_NAME}: {e}")
-        except Exception as e: # Catch other potential errors like connection issues
-            print(f"An unexpected error occurred during init_db: {e}")
-
+        await conn.run_sync(run_migrations)
+    print(f"Schema of '{settings.TIMESERIES_TABLE_NAME}' is at the latest revision.")
@@ -1,9 +1,19 @@
+import logging
+
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from app.api.v1.endpoints import live as live_v1_router
 from app.api.v1.endpoints import timeseries as timeseries_v1_router
 from app.core.config import settings
+from app.core.metrics import RequestMetricsMiddleware, metrics_endpoint
+from app.core.profiling import ProfilingMiddleware
 from app.db.session import init_db # Import init_db
+from app.services.forecast_scheduler import forecast_scheduler
+from app.services.ingest_queue import ingest_queue
+
+# Configure basic logging
+logging.basicConfig(level=logging.INFO)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -11,9 +21,16 @@ async def lifespan(app: FastAPI):
     print("Application startup...")
     await init_db() # Initialize database, create table and hypertable
     print("Database initialized.")
+    if settings.INGEST_WRITE_BEHIND_ENABLED:
+        ingest_queue.start()
+    if settings.FORECAST_PRECOMPUTE_ENABLED:
+        forecast_scheduler.start()
     yield
     # Shutdown
     print("Application shutdown...")
+    await forecast_scheduler.stop()
+    # Write out everything still queued before the process exits
+    await ingest_queue.stop()
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -29,6 +46,15 @@ app.add_middleware(
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
 )
+if settings.PROFILING_HEADER_ENABLED or settings.PROFILING_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        header_enabled=settings.PROFILING_HEADER_ENABLED,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        output_dir=settings.PROFILING_OUTPUT_DIR,
+    )
+# Trace IDs, per-request timing log lines and Prometheus histograms
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(
     timeseries_v1_router.router,
@@ -36,6 +62,14 @@ app.include_router(
     tags=["Time-Series Data v1"],
 )
 
+app.include_router(
+    live_v1_router.router,
+    prefix="/api/v1/live",
+    tags=["Live Updates v1"],
+)
+
+app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+
 @app.get("/", tags=["Root"])
 async def read_root():
     return {
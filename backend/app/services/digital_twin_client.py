@@ -1,10 +1,16 @@
+from functools import lru_cache
+
 import httpx
 from datetime import datetime, timezone
 from typing import Optional
 from pydantic import ValidationError
 
 from app.core.config import settings
+from app.core.metrics import span, trace_headers
+from app.core.series import MinuteSeries
+from app.core.wire_format import SERIES_ACCEPT_HEADER, is_series_npz
 from app.api.v1.schemas.timeseries_schemas import SensorDataResponse
+from app.services.resilience import Deadline, DownstreamUnavailableError, ResilientCaller
 
 # Custom Exceptions for the client
 class DigitalTwinAPIError(Exception):
@@ -43,14 +49,28 @@ class DigitalTwinAPIDataValidationError(DigitalTwinAPIError):
             f"Data validation error from DigitalTwinAPI response: {validation_error}"
         )
 
+class DigitalTwinAPIUnavailableError(DigitalTwinAPIError):
+    """Raised when the call was skipped (open circuit) or ran out of request budget."""
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Errors that count against the service: connection problems and 5xx answers."""
+    if isinstance(error, DigitalTwinAPIConnectionError):
+        return True
+    return isinstance(error, DigitalTwinAPIError) and (error.status_code or 0) >= 500
+
+
 class DigitalTwinAPIClient:
     def __init__(
         self,
         base_url: str = settings.DIGITAL_TWIN_API_BASE_URL,
         endpoint: str = settings.DIGITAL_TWIN_API_ENDPOINT,
+        timeout_seconds: float = settings.DIGITAL_TWIN_API_TIMEOUT_SECONDS,
     ):
         self.base_url = base_url
         self.endpoint = endpoint
+        # Circuit breaker, deadline and hedging for all calls of this client
+        self.resilience = ResilientCaller("digital_twin", timeout_seconds)
 
     def _format_datetime_for_api(self, dt: datetime) -> str:
         """Ensures datetime is UTC and formats to ISO 8601 with 'Z'."""
@@ -66,7 +86,34 @@ class DigitalTwinAPIClient:
         start_date: datetime,
         end_date: datetime,
         http_client: httpx.AsyncClient, # Pass managed httpx client
-    ) -> SensorDataResponse:
+        deadline: Optional[Deadline] = None,
+    ) -> MinuteSeries:
+        """
+        Fetches one sensor's real values as a single-row minute series. The binary
+        encoding is requested; a JSON answer is converted to the same arrays.
+
+        Raises:
+            DigitalTwinAPIUnavailableError: The circuit is open or `deadline` passed.
+        """
+        try:
+            return await self.resilience.call(
+                lambda attempt, timeout: self._fetch_sensor_data(
+                    sensor_name, start_date, end_date, http_client, timeout
+                ),
+                _is_retryable,
+                deadline,
+            )
+        except DownstreamUnavailableError as e:
+            raise DigitalTwinAPIUnavailableError(f"DigitalTwinAPI unavailable: {e}") from e
+
+    async def _fetch_sensor_data(
+        self,
+        sensor_name: str,
+        start_date: datetime,
+        end_date: datetime,
+        http_client: httpx.AsyncClient,
+        timeout: float,
+    ) -> MinuteSeries:
         params = {
             "sensorName": sensor_name,
             "startDate": self._format_datetime_for_api(start_date),
@@ -75,11 +122,19 @@ class DigitalTwinAPIClient:
         url = f"{self.base_url}{self.endpoint}"
 
         try:
-            response = await http_client.get(url, params=params, timeout=900.0)
+            with span("digital_twin_http"):
+                response = await http_client.get(
+                    url,
+                    params=params,
+                    headers={"Accept": SERIES_ACCEPT_HEADER, **trace_headers()},
+                    timeout=timeout,
+                )
             response.raise_for_status()  # Raises HTTPStatusError for 4xx/5xx
-            
-            response_json = response.json()
-            return SensorDataResponse(**response_json)
+
+            if is_series_npz(response.headers.get("content-type")):
+                return MinuteSeries.from_npz(response.content)
+            sensor_data = SensorDataResponse(**response.json())
+            return MinuteSeries.from_points([sensor_data.sensorName], [sensor_data.data])
         
         except httpx.HTTPStatusError as e:
             raise DigitalTwinAPIHttpError(response=e.response) from e
@@ -92,6 +147,8 @@ class DigitalTwinAPIClient:
                 f"An unexpected error occurred while fetching data: {str(e)}"
             ) from e
 
-# Factory function for dependency injection
-def get_digital_twin_api_client():
+# Factory function for dependency injection; shared so the circuit state and
+# latency history cover all requests
+@lru_cache(maxsize=1)
+def get_digital_twin_api_client() -> DigitalTwinAPIClient:
     return DigitalTwinAPIClient()
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from app.core.config import settings
+from app.core.series import epoch_minute_to_datetime
+from app.crud.crud_sensor_data import (
+    get_latest_predicted_timestamps,
+    upsert_sensor_series_db,
+    truncate_to_minute,
+)
+from app.db.session import db_connection
+from app.services.prediction_model_client import (
+    PredictionModelAPIClient, PredictionAPIError, get_prediction_model_api_client,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastPrecomputeScheduler:
+    """
+    Keeps the next `horizon_minutes` of predicted values materialized in the
+    timeseries table for every sensor, so dashboard reads of upcoming minutes
+    are served from the DB instead of triggering a rollout on the request path.
+
+    Every run only requests the minutes past what is already materialized,
+    sensors with the same missing range are batched into one ml-inference call,
+    and the results are bulk-upserted into the predicted_value column.
+
+    Forecasts roll forward from ml-inference's newest known observation, so this
+    depends on a live context source there (CONTEXT_POLL_URL). Sensors whose
+    context is more than `max_context_lag_minutes` old are skipped and logged as
+    an error; otherwise every run would roll forward from the end of the seed data.
+    """
+
+    def __init__(
+        self,
+        sensor_names: List[str] = settings.SENSOR_NAMES,
+        horizon_minutes: int = settings.FORECAST_HORIZON_MINUTES,
+        interval_seconds: float = settings.FORECAST_PRECOMPUTE_INTERVAL_SECONDS,
+        batch_size: int = settings.FORECAST_PRECOMPUTE_BATCH_SIZE,
+        max_context_lag_minutes: int = settings.FORECAST_MAX_CONTEXT_LAG_MINUTES,
+        pred_client: Optional[PredictionModelAPIClient] = None,
+    ):
+        self.sensor_names = list(sensor_names)
+        self.horizon = timedelta(minutes=horizon_minutes)
+        self.interval_seconds = interval_seconds
+        self.batch_size = max(1, batch_size)
+        self.max_context_lag = timedelta(minutes=max_context_lag_minutes)
+        self.pred_client = pred_client or get_prediction_model_api_client()
+        # sensor name -> last timestamp with a materialized prediction
+        self.materialized_until: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_forever(self):
+        logger.info("Forecast precompute started for %d sensors, horizon %s.", len(self.sensor_names), self.horizon)
+        async with httpx.AsyncClient() as http_client:
+            await self._load_materialized_state()
+            while True:
+                try:
+                    await self.run_once(http_client)
+                except Exception as e: # Keep the scheduler alive on unexpected errors
+                    logger.exception("Forecast precompute run failed: %s", e)
+                await asyncio.sleep(self.interval_seconds)
+
+    async def _load_materialized_state(self):
+        """Resumes from predictions already stored in the DB, e.g. after a restart."""
+        now = truncate_to_minute(datetime.now(timezone.utc))
+        try:
+            async with db_connection() as conn:
+                self.materialized_until.update(
+                    await get_latest_predicted_timestamps(conn, self.sensor_names, now)
+                )
+        except Exception as e:
+            logger.error("Forecast precompute: could not read materialized predictions: %s", e)
+
+    async def _live_sensors(self, now: datetime, http_client: httpx.AsyncClient) -> List[str]:
+        """The sensors whose forecast context in ml-inference is recent enough to roll forward from."""
+        try:
+            context = await self.pred_client.get_context_timestamps(self.sensor_names, http_client)
+        except PredictionAPIError as e:
+            logger.error("Forecast precompute: could not read the forecast context, skipping this run: %s", e.message)
+            return []
+
+        oldest_live = now - self.max_context_lag
+        live, stale = [], []
+        for sensor_name in self.sensor_names:
+            last_known = context.get(sensor_name)
+            if last_known is not None and last_known.astimezone(timezone.utc) >= oldest_live:
+                live.append(sensor_name)
+            else:
+                stale.append(f"{sensor_name} ({last_known.isoformat() if last_known else 'no context'})")
+        if stale:
+            logger.error(
+                "Forecast precompute: skipping %d sensors whose ml-inference context is older than %s, "
+                "so their forecasts would roll forward from stale data. Set CONTEXT_POLL_URL on ml-inference "
+                "or push observations to it. Last known: %s",
+                len(stale), self.max_context_lag, ", ".join(stale),
+            )
+        return live
+
+    def _pending_ranges(self, now: datetime, sensor_names: List[str]) -> Dict[datetime, List[str]]:
+        """Groups sensors by the first minute they still need a prediction for."""
+        horizon_end = now + self.horizon
+        pending: Dict[datetime, List[str]] = {}
+        for sensor_name in sensor_names:
+            start = now
+            materialized = self.materialized_until.get(sensor_name)
+            if materialized is not None and materialized >= now:
+                start = materialized + timedelta(minutes=1)
+            if start < horizon_end:
+                pending.setdefault(start, []).append(sensor_name)
+        return pending
+
+    async def run_once(self, http_client: httpx.AsyncClient):
+        """Materializes the missing part of every sensor's forecast horizon."""
+        now = truncate_to_minute(datetime.now(timezone.utc))
+        horizon_end = now + self.horizon
+
+        live_sensors = await self._live_sensors(now, http_client)
+        for start, sensor_names in self._pending_ranges(now, live_sensors).items():
+            for i in range(0, len(sensor_names), self.batch_size):
+                batch = sensor_names[i:i + self.batch_size]
+                try:
+                    series = await self.pred_client.get_predicted_data_batch(
+                        batch, start, horizon_end, http_client
+                    )
+                except PredictionAPIError as e:
+                    logger.error("Forecast precompute: prediction request failed for %s: %s", batch, e.message)
+                    continue
+
+                async with db_connection() as conn:
+                    for sensor_name in series.names:
+                        sensor_series = series.select(sensor_name)
+                        present = np.flatnonzero(~np.isnan(sensor_series.values[0]))
+                        if not len(present):
+                            logger.warning("Forecast precompute: no predictions for %s", sensor_name)
+                            continue
+                        await upsert_sensor_series_db(conn, sensor_name, sensor_series, "predicted")
+                        self.materialized_until[sensor_name] = epoch_minute_to_datetime(
+                            int(sensor_series.minutes()[present[-1]])
+                        )
+
+
+forecast_scheduler = ForecastPrecomputeScheduler()
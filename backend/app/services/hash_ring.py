@@ -0,0 +1,72 @@
+import bisect
+import hashlib
+from typing import Dict, Iterable, List
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    """
+    Maps keys (sensor names) to nodes (inference base URLs) with consistent hashing.
+
+    Every node is placed on the ring at `virtual_nodes` pseudo-random points, and a
+    key belongs to the node owning the first point at or after the key's hash. The
+    walk continues clockwise for the failover order. Adding or removing a node only
+    moves the keys on its own arcs (about 1/N of them), so the other replicas keep
+    their models and caches warm.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), virtual_nodes: int = 160):
+        self.virtual_nodes = virtual_nodes
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add_node(node)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add_node(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.virtual_nodes):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove_node(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def preference_list(self, key: str) -> List[str]:
+        """All nodes in the order `key` should try them: its owner first, then the failovers."""
+        if not self._points:
+            return []
+        start = bisect.bisect(self._points, _hash(key))
+        ordered: List[str] = []
+        for offset in range(len(self._points)):
+            owner = self._owners[(start + offset) % len(self._points)]
+            if owner not in ordered:
+                ordered.append(owner)
+                if len(ordered) == len(self.nodes):
+                    break
+        return ordered
+
+    def node_for(self, key: str) -> str:
+        return self.preference_list(key)[0]
+
+    def assignments(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """Groups keys by owning node, e.g. to check how evenly sensors are spread."""
+        groups: Dict[str, List[str]] = {node: [] for node in self.nodes}
+        for key in keys:
+            groups[self.node_for(key)].append(key)
+        return groups
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.core.metrics import METRICS_NAMESPACE
+from app.core.series import MinuteSeries
+from app.crud.crud_sensor_data import upsert_sensor_batches_db
+from app.db.session import db_connection
+
+logger = logging.getLogger(__name__)
+
+INGEST_FLUSH_DURATION = Histogram(
+    "ingest_flush_duration_seconds", "Duration of write-behind flushes.",
+    namespace=METRICS_NAMESPACE,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+INGEST_QUEUE_POINTS = Gauge(
+    "ingest_queue_points", "Points waiting in the write-behind ingest queue.",
+    namespace=METRICS_NAMESPACE,
+)
+INGEST_POINTS = Counter(
+    "ingest_points_total", "Points passed to the ingest queue by outcome.",
+    ["outcome"], namespace=METRICS_NAMESPACE,
+)
+
+# (sensor name, "real" | "predicted")
+IngestKey = Tuple[str, str]
+# Pending writes of one key: (int64 epoch minutes, float64 values) in submission order
+PendingChunks = List[Tuple[np.ndarray, np.ndarray]]
+
+
+class IngestQueue:
+    """
+    Write-behind buffer for values fetched from the digital twin and ml-inference.
+
+    Requests hand their series to `submit` and answer from memory right away;
+    a background task flushes everything pending every `flush_interval_seconds`
+    (or sooner once `flush_points` are waiting), coalescing all requests and
+    sensors into one upsert statement per value type on a single connection.
+    Repeated minutes of the same sensor keep the most recently submitted value.
+
+    Memory is bounded by `max_points`: when the buffer is full, `submit` waits
+    for a flush (back-pressure on the producing requests) for up to
+    `submit_timeout_seconds` and then writes its points inline instead.
+    While the queue is not running, `submit` always writes inline. A failed
+    inline write is reported and counted, never raised: the caller already has
+    the values and answers with them either way.
+    """
+
+    def __init__(
+        self,
+        flush_interval_seconds: float = settings.INGEST_FLUSH_INTERVAL_SECONDS,
+        flush_points: int = settings.INGEST_FLUSH_POINTS,
+        max_points: int = settings.INGEST_QUEUE_MAX_POINTS,
+        submit_timeout_seconds: float = settings.INGEST_SUBMIT_TIMEOUT_SECONDS,
+    ):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_points = flush_points
+        self.max_points = max_points
+        self.submit_timeout_seconds = submit_timeout_seconds
+        self.pending: Dict[IngestKey, PendingChunks] = {}
+        self.pending_points = 0
+        self._space_available = asyncio.Event()
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stops the flush loop and writes out everything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def submit(self, sensor_name: str, value_type: str, series: MinuteSeries) -> int:
+        """
+        Queues the non-NaN values of a single-row minute series for writing.
+
+        Args:
+            sensor_name (str): Sensor the series belongs to.
+            value_type (str): "real" or "predicted".
+            series (MinuteSeries): Values to write; NaN values are skipped.
+
+        Returns:
+            int: Number of points accepted (queued or written inline); 0 if the
+            inline write failed.
+        """
+        values = series.values[0]
+        present = np.flatnonzero(~np.isnan(values))
+        if not len(present):
+            return 0
+        chunk = (series.minutes()[present], values[present])
+
+        if self.running and len(present) <= self.max_points:
+            deadline = time.monotonic() + self.submit_timeout_seconds
+            while self.pending_points + len(present) > self.max_points:
+                self._flush_requested.set()
+                self._space_available.clear()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._space_available.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if self.pending_points + len(present) <= self.max_points:
+                self.pending.setdefault((sensor_name, value_type), []).append(chunk)
+                self.pending_points += len(present)
+                INGEST_QUEUE_POINTS.set(self.pending_points)
+                INGEST_POINTS.labels("queued").inc(len(present))
+                if self.pending_points >= self.flush_points:
+                    self._flush_requested.set()
+                return len(present)
+
+        # Not running, or still full after waiting: write this request's points itself
+        try:
+            async with db_connection() as conn:
+                written = await upsert_sensor_batches_db(conn, value_type, [(sensor_name, *chunk)])
+        except Exception as e:
+            logger.error("Inline write of %d %s points for %s failed: %s", len(present), value_type, sensor_name, e)
+            INGEST_POINTS.labels("failed").inc(len(present))
+            return 0
+        INGEST_POINTS.labels("inline").inc(written)
+        return written
+
+    async def flush(self) -> int:
+        """Writes everything pending; returns the number of points written."""
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, {}
+        pending_points, self.pending_points = self.pending_points, 0
+        INGEST_QUEUE_POINTS.set(0)
+        self._space_available.set()
+
+        batches_by_type: Dict[str, List[Tuple[str, np.ndarray, np.ndarray]]] = {}
+        for (sensor_name, value_type), chunks in pending.items():
+            batches_by_type.setdefault(value_type, []).append((sensor_name, *coalesce_chunks(chunks)))
+
+        started = time.perf_counter()
+        written = 0
+        try:
+            async with db_connection() as conn:
+                for value_type, batches in batches_by_type.items():
+                    written += await upsert_sensor_batches_db(conn, value_type, batches)
+        except asyncio.CancelledError:
+            # Stopped mid-flush: keep the batch for the final flush in stop()
+            self._requeue(pending, pending_points)
+            raise
+        except Exception as e:
+            logger.error("Ingest flush of %d points failed, requeueing them: %s", pending_points, e)
+            self._requeue(pending, pending_points)
+            return 0
+        finally:
+            INGEST_FLUSH_DURATION.observe(time.perf_counter() - started)
+        INGEST_POINTS.labels("flushed").inc(written)
+        return written
+
+    def _requeue(self, pending: Dict[IngestKey, PendingChunks], pending_points: int):
+        """Puts a failed batch back in front of newer submissions, if the budget allows."""
+        if self.pending_points + pending_points > self.max_points:
+            logger.error("Ingest queue full, dropping %d points of the failed flush.", pending_points)
+            INGEST_POINTS.labels("dropped").inc(pending_points)
+            return
+        for key, chunks in self.pending.items():
+            pending.setdefault(key, []).extend(chunks)
+        self.pending = pending
+        self.pending_points += pending_points
+        INGEST_QUEUE_POINTS.set(self.pending_points)
+
+    async def _run_forever(self):
+        logger.info(
+            "Ingest queue started: flush every %ss or %d points, budget %d points.",
+            self.flush_interval_seconds, self.flush_points, self.max_points,
+        )
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e: # Keep the flush loop alive on unexpected errors
+                logger.exception("Ingest flush failed: %s", e)
+
+
+def coalesce_chunks(chunks: PendingChunks) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenates pending chunks of one key, keeping the last submitted value per minute."""
+    if len(chunks) == 1:
+        return chunks[0]
+    minutes = np.concatenate([m for m, _ in chunks])
+    values = np.concatenate([v for _, v in chunks])
+    # np.unique returns the first occurrence, so search the reversed arrays
+    _, last_index = np.unique(minutes[::-1], return_index=True)
+    keep = len(minutes) - 1 - last_index
+    return minutes[keep], values[keep]
+
+
+ingest_queue = IngestQueue()
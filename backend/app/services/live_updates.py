@@ -0,0 +1,136 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Set
+
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+from app.core.metrics import METRICS_NAMESPACE
+from app.core.series import epoch_minute, epoch_minute_to_datetime
+
+LIVE_SUBSCRIBERS = Gauge(
+    "live_update_subscribers", "Open live update subscriptions.",
+    namespace=METRICS_NAMESPACE,
+)
+LIVE_EVENTS = Counter(
+    "live_update_events_total", "Live update events by outcome.",
+    ["outcome"], namespace=METRICS_NAMESPACE,
+)
+
+
+class Subscription:
+    """
+    One client's view of the live feed: a bounded queue of encoded events for a
+    set of sensors. A slow consumer loses its oldest events instead of making
+    the queue (or the publisher) grow or wait.
+    """
+
+    def __init__(self, sensor_names: Sequence[str], queue_size: int):
+        self.sensor_names = list(sensor_names)
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, event: str):
+        if self.queue.full():
+            self.queue.get_nowait()
+            LIVE_EVENTS.labels("dropped").inc()
+        self.queue.put_nowait(event)
+
+    async def next_event(self, timeout: float) -> Optional[str]:
+        """Waits up to `timeout` seconds for the next event; None if there was none."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class SensorBroadcaster:
+    """
+    Fans out new minutes of one sensor to its subscribers.
+
+    Only minutes after the newest one already sent for the same value type are
+    forwarded, starting at the minute the broadcaster was created, so backfills
+    of historical ranges and repeated upserts of known minutes are not pushed.
+    Each event is encoded once and shared by all subscribers.
+    """
+
+    def __init__(self, sensor_name: str):
+        self.sensor_name = sensor_name
+        self.subscribers: Set[Subscription] = set()
+        first_minute = epoch_minute(datetime.now(timezone.utc))
+        # value type ("real"/"predicted") -> newest epoch minute sent
+        self.sent_until: Dict[str, int] = {"real": first_minute - 1, "predicted": first_minute - 1}
+
+    def publish(self, value_type: str, minutes: Sequence[int], values: Sequence[float]):
+        sent_until = self.sent_until[value_type]
+        new_points = [(m, v) for m, v in zip(minutes, values) if m > sent_until]
+        if not new_points:
+            return
+        self.sent_until[value_type] = max(m for m, _ in new_points)
+
+        field = f"{value_type}_value"
+        event = format_sse_event("points", {
+            "sensorName": self.sensor_name,
+            "data": [
+                {"timestamp": epoch_minute_to_datetime(m).isoformat().replace("+00:00", "Z"), field: v}
+                for m, v in new_points
+            ],
+        })
+        for subscription in self.subscribers:
+            subscription.push(event)
+        LIVE_EVENTS.labels("published").inc()
+
+
+class LiveUpdateHub:
+    """
+    In-process pub/sub between the ingest path and live subscriptions, with one
+    broadcaster per sensor that has subscribers. `publish` is called for every
+    write to the timeseries table, so clients receive new real and predicted
+    minutes as this process stores them instead of polling growing ranges.
+    With several workers, each hub only sees the writes of its own process.
+    """
+
+    def __init__(self, queue_size: int = settings.LIVE_UPDATES_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.broadcasters: Dict[str, SensorBroadcaster] = {}
+
+    def subscribe(self, sensor_names: List[str]) -> Subscription:
+        subscription = Subscription(sensor_names, self.queue_size)
+        for sensor_name in subscription.sensor_names:
+            broadcaster = self.broadcasters.get(sensor_name)
+            if broadcaster is None:
+                broadcaster = self.broadcasters[sensor_name] = SensorBroadcaster(sensor_name)
+            broadcaster.subscribers.add(subscription)
+        LIVE_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for sensor_name in subscription.sensor_names:
+            broadcaster = self.broadcasters.get(sensor_name)
+            if broadcaster is None:
+                continue
+            broadcaster.subscribers.discard(subscription)
+            if not broadcaster.subscribers:
+                del self.broadcasters[sensor_name]
+        LIVE_SUBSCRIBERS.dec()
+
+    def publish(self, sensor_name: str, value_type: str, minutes: Sequence[int], values: Sequence[float]):
+        """
+        Forwards newly written points to the sensor's subscribers, if it has any.
+
+        Args:
+            sensor_name (str): Sensor the points belong to.
+            value_type (str): "real" or "predicted".
+            minutes (Sequence[int]): Unix epoch minutes of the points.
+            values (Sequence[float]): Value of each point.
+        """
+        broadcaster = self.broadcasters.get(sensor_name)
+        if broadcaster is not None:
+            broadcaster.publish(value_type, minutes, values)
+
+
+def format_sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+live_update_hub = LiveUpdateHub()
@@ -1,10 +1,30 @@
+import asyncio
+import time
+from functools import lru_cache
+
 import httpx
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Dict, List, Optional, Set
 from pydantic import ValidationError
 
+from prometheus_client import Counter
+
 from app.core.config import settings
-from app.api.v1.schemas.timeseries_schemas import PredictionDataResponse # Use the new schema
+from app.core.metrics import METRICS_NAMESPACE, span, trace_headers
+from app.core.series import MinuteSeries
+from app.core.wire_format import SERIES_ACCEPT_HEADER, is_series_npz
+from app.api.v1.schemas.timeseries_schemas import (
+    PredictionDataResponse, # Use the new schema
+    BatchPredictionDataResponse,
+    PredictionContextResponse,
+)
+from app.services.hash_ring import ConsistentHashRing
+from app.services.resilience import Deadline, DownstreamUnavailableError, ResilientCaller
+
+PREDICTION_FAILOVERS = Counter(
+    "prediction_replica_failures_total", "Failed ml-inference calls that moved sensors to another replica.",
+    ["replica"], namespace=METRICS_NAMESPACE,
+)
 
 # Re-using or adapting exception classes from digital_twin_client
 # For brevity, let's assume similar error classes or a shared error module
@@ -41,14 +61,77 @@ class PredictionAPIDataValidationError(PredictionAPIError):
         )
 
 
+class PredictionAPIUnavailableError(PredictionAPIError):
+    """Raised when the call was skipped (open circuit) or ran out of request budget."""
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Errors another replica may not have: connection problems and 5xx answers."""
+    if isinstance(error, PredictionAPIConnectionError):
+        return True
+    return isinstance(error, PredictionAPIError) and (error.status_code or 0) >= 500
+
+
 class PredictionModelAPIClient:
+    """
+    Client for one or more ml-inference replicas.
+
+    Sensors are routed with a consistent hash ring over the replica base URLs, so
+    each replica only loads the models of its share of sensors and keeps their
+    state warm. A replica that fails with a connection error or a 5xx is skipped
+    for `failover_cooldown_seconds`; its sensors fail over to the next replica on
+    the ring meanwhile and return to it afterwards. Replicas can be added and
+    removed at runtime, which only moves the sensors of the affected arcs.
+
+    All calls also go through a circuit breaker and a timeout bounded by the
+    request's deadline. They are never hedged: a rollout is CPU-bound and costly,
+    so a second copy would only add load to replicas that are already slow.
+    """
+
     def __init__(
         self,
-        base_url: str = settings.PREDICTION_MODEL_API_BASE_URL,
+        base_urls: Optional[List[str]] = None,
         endpoint: str = settings.PREDICTION_MODEL_API_ENDPOINT,
+        batch_endpoint: str = settings.PREDICTION_MODEL_API_BATCH_ENDPOINT,
+        context_endpoint: str = settings.PREDICTION_MODEL_API_CONTEXT_ENDPOINT,
+        failover_cooldown_seconds: float = settings.PREDICTION_MODEL_API_FAILOVER_COOLDOWN_SECONDS,
+        timeout_seconds: float = settings.PREDICTION_MODEL_API_TIMEOUT_SECONDS,
+        batch_timeout_seconds: float = settings.PREDICTION_MODEL_API_BATCH_TIMEOUT_SECONDS,
     ):
-        self.base_url = base_url
+        self.ring = ConsistentHashRing(
+            base_urls or settings.PREDICTION_MODEL_API_BASE_URLS or [settings.PREDICTION_MODEL_API_BASE_URL]
+        )
         self.endpoint = endpoint
+        self.batch_endpoint = batch_endpoint
+        self.context_endpoint = context_endpoint
+        self.timeout_seconds = timeout_seconds
+        self.failover_cooldown_seconds = failover_cooldown_seconds
+        # base URL -> monotonic time until which it is skipped
+        self._down_until: Dict[str, float] = {}
+        self.batch_timeout_seconds = batch_timeout_seconds
+        self.resilience = ResilientCaller("ml_inference", timeout_seconds, hedge_enabled=False)
+
+    def add_replica(self, base_url: str):
+        self.ring.add_node(base_url)
+
+    def remove_replica(self, base_url: str):
+        self.ring.remove_node(base_url)
+        self._down_until.pop(base_url, None)
+
+    def replicas_for(self, sensor_name: str) -> List[str]:
+        """Replicas in the order they are tried for `sensor_name`; ones in cooldown go last."""
+        now = time.monotonic()
+        preference = self.ring.preference_list(sensor_name)
+        healthy = [url for url in preference if self._down_until.get(url, 0.0) <= now]
+        return healthy + [url for url in preference if url not in healthy]
+
+    def _mark_down(self, base_url: str, error: PredictionAPIError):
+        now = time.monotonic()
+        if len(self.ring) > 1 and self._down_until.get(base_url, 0.0) <= now:
+            print(f"PredictionModelAPI replica {base_url} failed, skipping it for "
+                  f"{self.failover_cooldown_seconds}s: {error.message}")
+        self._down_until[base_url] = now + self.failover_cooldown_seconds
+        PREDICTION_FAILOVERS.labels(base_url).inc()
 
     def _format_datetime_for_api(self, dt: datetime) -> str:
         if dt.tzinfo is None:
@@ -63,24 +146,86 @@ class PredictionModelAPIClient:
         start_date: datetime,
         end_date: datetime,
         http_client: httpx.AsyncClient,
-    ) -> PredictionDataResponse:
+        deadline: Optional[Deadline] = None,
+    ) -> MinuteSeries:
+        """
+        Fetches one sensor's predictions as a single-row minute series from the
+        sensor's replica, failing over along the ring. The binary encoding is
+        requested; a JSON answer is converted to the same arrays.
+
+        Raises:
+            PredictionAPIUnavailableError: The circuit is open or `deadline` passed.
+        """
+        try:
+            return await self.resilience.call(
+                lambda attempt, timeout: self._fetch_with_failover(
+                    sensor_name, start_date, end_date, http_client, timeout
+                ),
+                _is_retryable,
+                deadline,
+                hedge=False,
+            )
+        except DownstreamUnavailableError as e:
+            raise PredictionAPIUnavailableError(f"PredictionModelAPI unavailable: {e}") from e
+
+    async def _fetch_with_failover(
+        self,
+        sensor_name: str,
+        start_date: datetime,
+        end_date: datetime,
+        http_client: httpx.AsyncClient,
+        timeout: float,
+    ) -> MinuteSeries:
+        """Tries the sensor's replicas in ring order."""
+        last_error = None
+        for base_url in self.replicas_for(sensor_name):
+            try:
+                series = await self._fetch_predicted_data(
+                    base_url, sensor_name, start_date, end_date, http_client, timeout
+                )
+            except PredictionAPIError as e:
+                if not _is_retryable(e):
+                    raise
+                self._mark_down(base_url, e)
+                last_error = e
+                continue
+            self._down_until.pop(base_url, None)
+            return series
+        raise last_error
+
+    async def _fetch_predicted_data(
+        self,
+        base_url: str,
+        sensor_name: str,
+        start_date: datetime,
+        end_date: datetime,
+        http_client: httpx.AsyncClient,
+        timeout: float,
+    ) -> MinuteSeries:
         # Assuming prediction API uses similar query parameters
         params = {
             "sensorName": sensor_name,
             "startDate": self._format_datetime_for_api(start_date),
             "endDate": self._format_datetime_for_api(end_date),
         }
-        url = f"{self.base_url}{self.endpoint}"
+        url = f"{base_url}{self.endpoint}"
 
         try:
-            response = await http_client.get(url, params=params, timeout=900.0)
+            with span("prediction_http"):
+                response = await http_client.get(
+                    url,
+                    params=params,
+                    headers={"Accept": SERIES_ACCEPT_HEADER, **trace_headers()},
+                    timeout=timeout,
+                )
             response.raise_for_status()
-            
-            response_json = response.json()
-            # Ensure the response matches PredictionDataResponse
+
+            if is_series_npz(response.headers.get("content-type")):
+                return MinuteSeries.from_npz(response.content)
             # The external API might return a slightly different structure,
             # adapt PredictionDataResponse or parsing here if needed.
-            return PredictionDataResponse(**response_json)
+            prediction = PredictionDataResponse(**response.json())
+            return MinuteSeries.from_points([prediction.sensorName], [prediction.data])
         
         except httpx.HTTPStatusError as e:
             raise PredictionAPIHttpError(response=e.response) from e
@@ -93,5 +238,173 @@ class PredictionModelAPIClient:
                 f"An unexpected error occurred while fetching predicted data: {str(e)}"
             ) from e
 
-def get_prediction_model_api_client():
+    async def get_predicted_data_batch(
+        self,
+        sensor_names: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        http_client: httpx.AsyncClient,
+        deadline: Optional[Deadline] = None,
+    ) -> MinuteSeries:
+        """
+        Fetches predictions for several sensors over the same range, as one row per
+        sensor in `sensor_names` order; rows of failed sensors are NaN.
+
+        Sensors are grouped by replica and every group is sent as one concurrent
+        batch request. Sensors of a failed group are regrouped by their next replica
+        and retried until every replica has been tried.
+
+        Raises:
+            PredictionAPIUnavailableError: The circuit is open or the timeout passed.
+        """
+        try:
+            return await self.resilience.call(
+                lambda attempt, timeout: self._fetch_batch_with_failover(
+                    sensor_names, start_date, end_date, http_client, timeout
+                ),
+                _is_retryable,
+                deadline,
+                hedge=False,
+                timeout_seconds=self.batch_timeout_seconds,
+            )
+        except DownstreamUnavailableError as e:
+            raise PredictionAPIUnavailableError(f"PredictionModelAPI unavailable: {e}") from e
+
+    async def _fetch_batch_with_failover(
+        self,
+        sensor_names: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        http_client: httpx.AsyncClient,
+        timeout: float,
+    ) -> MinuteSeries:
+        result = MinuteSeries.empty(sensor_names, start_date, end_date)
+        tried: Dict[str, Set[str]] = {name: set() for name in sensor_names}
+        pending = list(sensor_names)
+        succeeded = False
+        last_error = None
+
+        while pending:
+            groups: Dict[str, List[str]] = {}
+            for name in pending:
+                base_url = next((url for url in self.replicas_for(name) if url not in tried[name]), None)
+                if base_url is not None:
+                    groups.setdefault(base_url, []).append(name)
+            if not groups:
+                break
+
+            outcomes = await asyncio.gather(*(
+                self._fetch_predicted_data_batch(base_url, names, start_date, end_date, http_client, timeout)
+                for base_url, names in groups.items()
+            ), return_exceptions=True)
+
+            pending = []
+            for (base_url, names), outcome in zip(groups.items(), outcomes):
+                if isinstance(outcome, MinuteSeries):
+                    self._down_until.pop(base_url, None)
+                    for name in names:
+                        result.assign(name, outcome, name)
+                    succeeded = True
+                    continue
+                if not isinstance(outcome, PredictionAPIError) or not _is_retryable(outcome):
+                    raise outcome
+                self._mark_down(base_url, outcome)
+                last_error = outcome
+                for name in names:
+                    tried[name].add(base_url)
+                pending.extend(names)
+
+        if not succeeded and last_error is not None:
+            raise last_error
+        return result
+
+    async def _fetch_predicted_data_batch(
+        self,
+        base_url: str,
+        sensor_names: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        http_client: httpx.AsyncClient,
+        timeout: float,
+    ) -> MinuteSeries:
+        payload = {
+            "sensorNames": sensor_names,
+            "startDate": self._format_datetime_for_api(start_date),
+            "endDate": self._format_datetime_for_api(end_date),
+        }
+        url = f"{base_url}{self.batch_endpoint}"
+
+        try:
+            with span("prediction_batch_http"):
+                response = await http_client.post(
+                    url,
+                    json=payload,
+                    headers={"Accept": SERIES_ACCEPT_HEADER, **trace_headers()},
+                    timeout=timeout,
+                )
+            response.raise_for_status()
+
+            if is_series_npz(response.headers.get("content-type")):
+                return MinuteSeries.from_npz(response.content)
+            batch = BatchPredictionDataResponse(**response.json())
+            by_name = {prediction.sensorName: prediction for prediction in batch.predictions}
+            for name in sensor_names:
+                if name in by_name and not by_name[name].data:
+                    print(f"PredictionModelAPI returned no data for {name}: {by_name[name].message}")
+            return MinuteSeries.from_points(
+                sensor_names, [by_name[name].data if name in by_name else [] for name in sensor_names]
+            )
+
+        except httpx.HTTPStatusError as e:
+            raise PredictionAPIHttpError(response=e.response) from e
+        except httpx.RequestError as e:
+            raise PredictionAPIConnectionError(original_exception=e) from e
+        except ValidationError as e:
+            raise PredictionAPIDataValidationError(validation_error=e) from e
+        except Exception as e:
+            raise PredictionAPIError(
+                f"An unexpected error occurred while fetching batch predicted data: {str(e)}"
+            ) from e
+
+    async def get_context_timestamps(
+        self,
+        sensor_names: List[str],
+        http_client: httpx.AsyncClient,
+    ) -> Dict[str, datetime]:
+        """
+        Returns the newest observation in each sensor's forecast context, as
+        known by the replica the sensor is routed to. Sensors the replica has no
+        context for are left out.
+
+        Raises:
+            PredictionAPIError: A replica could not be asked.
+        """
+        groups: Dict[str, List[str]] = {}
+        for name in sensor_names:
+            groups.setdefault(self.replicas_for(name)[0], []).append(name)
+
+        async def fetch(base_url: str) -> Dict[str, datetime]:
+            try:
+                response = await http_client.get(
+                    f"{base_url}{self.context_endpoint}", headers=trace_headers(), timeout=self.timeout_seconds
+                )
+                response.raise_for_status()
+                return PredictionContextResponse(**response.json()).lastKnownTimestamps
+            except httpx.HTTPStatusError as e:
+                raise PredictionAPIHttpError(response=e.response) from e
+            except httpx.RequestError as e:
+                raise PredictionAPIConnectionError(original_exception=e) from e
+            except ValidationError as e:
+                raise PredictionAPIDataValidationError(validation_error=e) from e
+
+        context: Dict[str, datetime] = {}
+        for (base_url, names), timestamps in zip(
+            groups.items(), await asyncio.gather(*(fetch(base_url) for base_url in groups))
+        ):
+            context.update({name: timestamps[name] for name in names if name in timestamps})
+        return context
+
+@lru_cache(maxsize=1)
+def get_prediction_model_api_client() -> PredictionModelAPIClient:
+    """Shared client, so routing and replica health are kept across requests."""
     return PredictionModelAPIClient()
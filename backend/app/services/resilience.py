@@ -0,0 +1,287 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+from app.core.metrics import METRICS_NAMESPACE
+
+T = TypeVar("T")
+
+CIRCUIT_STATE = Gauge(
+    "downstream_circuit_state", "Circuit breaker state per downstream service (0 closed, 1 half-open, 2 open).",
+    ["service"], namespace=METRICS_NAMESPACE,
+)
+CIRCUIT_REJECTIONS = Counter(
+    "downstream_circuit_rejections_total", "Calls failed fast because the circuit was open.",
+    ["service"], namespace=METRICS_NAMESPACE,
+)
+DEADLINE_EXCEEDED = Counter(
+    "downstream_deadline_exceeded_total", "Calls abandoned because the request budget ran out.",
+    ["service"], namespace=METRICS_NAMESPACE,
+)
+TIMEOUTS = Counter(
+    "downstream_timeouts_total", "Calls that did not answer within the service's own timeout.",
+    ["service"], namespace=METRICS_NAMESPACE,
+)
+HEDGES = Counter(
+    "downstream_hedges_total", "Hedged attempts sent, and how many of them answered first.",
+    ["service", "outcome"], namespace=METRICS_NAMESPACE,
+)
+
+
+class DownstreamUnavailableError(Exception):
+    """A call was not made or not finished in time; the caller should degrade gracefully."""
+
+
+class CircuitOpenError(DownstreamUnavailableError):
+    pass
+
+
+class DeadlineExceededError(DownstreamUnavailableError):
+    """The service did not answer within its own timeout; counts against its circuit."""
+
+
+class BudgetExhaustedError(DownstreamUnavailableError):
+    """The request's budget ran out first; says nothing about the service's health."""
+
+
+class Deadline:
+    """Point in time by which a request must be answered, shared by all its downstream calls."""
+
+    def __init__(self, budget_seconds: float):
+        self.expires_at = time.monotonic() + budget_seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+class LatencyTracker:
+    """Sliding window of recent successful call durations."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q-quantile of the window, or None until `min_samples` calls were seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. After `failure_threshold` consecutive failures the
+    circuit opens and calls fail fast for `reset_timeout_seconds`; then a single
+    probe call is let through (half-open), which closes the circuit on success and
+    opens it again on failure.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, service: str, failure_threshold: int, reset_timeout_seconds: float):
+        self.service = service
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        CIRCUIT_STATE.labels(service).set(0)
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_seconds:
+            self._set_state(self.HALF_OPEN)
+        return self._state
+
+    def _set_state(self, state: str):
+        self._state = state
+        CIRCUIT_STATE.labels(self.service).set(self._STATE_VALUES[state])
+
+    def allow(self):
+        """Raises CircuitOpenError unless a call may be made now."""
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probe_in_flight):
+            CIRCUIT_REJECTIONS.labels(self.service).inc()
+            raise CircuitOpenError(f"{self.service} circuit is open after {self.failures} consecutive failures")
+        if state == self.HALF_OPEN:
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        if self._state != self.CLOSED:
+            print(f"{self.service} circuit closed.")
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self.failures >= self.failure_threshold):
+            print(f"{self.service} circuit opened for {self.reset_timeout_seconds}s after {self.failures} failures.")
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release(self):
+        """Ends a call that neither succeeded nor failed, e.g. one cancelled by the client."""
+        self._probe_in_flight = False
+
+
+class ResilientCaller:
+    """
+    Guards the calls to one downstream service with a circuit breaker, a per-call
+    timeout bounded by the request's remaining budget, and hedging: when an attempt
+    has not answered after the recent p-quantile latency (`hedge_quantile`), a second
+    attempt is started and the first answer wins. A failed first attempt starts the
+    second one right away. Hedging only kicks in once enough calls were observed.
+
+    Only the service's own timeout, connection errors and 5xx count against the
+    circuit. A call cut short because the request's budget ran out says nothing
+    about the service (e.g. a long rollout behind a short dashboard budget), so it
+    raises BudgetExhaustedError and leaves the breaker as it was.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        timeout_seconds: float,
+        hedge_enabled: bool = settings.DOWNSTREAM_HEDGE_ENABLED,
+        hedge_quantile: float = settings.DOWNSTREAM_HEDGE_QUANTILE,
+        hedge_min_delay_seconds: float = settings.DOWNSTREAM_HEDGE_MIN_DELAY_SECONDS,
+        failure_threshold: int = settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout_seconds: float = settings.CIRCUIT_BREAKER_RESET_SECONDS,
+    ):
+        self.service = service
+        self.timeout_seconds = timeout_seconds
+        self.hedge_enabled = hedge_enabled
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay_seconds = hedge_min_delay_seconds
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(service, failure_threshold, reset_timeout_seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge_enabled:
+            return None
+        delay = self.latency.quantile(self.hedge_quantile)
+        return None if delay is None else max(delay, self.hedge_min_delay_seconds)
+
+    async def call(
+        self,
+        attempt: Callable[[int, float], Awaitable[T]],
+        is_failure: Callable[[BaseException], bool],
+        deadline: Optional[Deadline] = None,
+        hedge: bool = True,
+        timeout_seconds: Optional[float] = None,
+    ) -> T:
+        """
+        Runs `attempt` under the breaker, the deadline and (optionally) hedging.
+
+        Args:
+            attempt: Called with the attempt index (0 first, 1 hedge) and its timeout in
+                seconds; e.g. the hedge can go to another replica.
+            is_failure: Whether an exception counts against the downstream service
+                (connection errors, 5xx) or is the caller's problem (4xx, bad data).
+            deadline (Optional[Deadline]): Request budget; `timeout_seconds` caps every call.
+            hedge (bool): Allow a hedged second attempt.
+            timeout_seconds (Optional[float]): Cap for this call instead of `timeout_seconds`.
+
+        Raises:
+            CircuitOpenError: The circuit is open; no call was made.
+            DeadlineExceededError: No answer within the service's timeout.
+            BudgetExhaustedError: The request's deadline passed before an answer.
+        """
+        timeout = timeout_seconds or self.timeout_seconds
+        # Whether the request's deadline, not the service's timeout, bounds this call
+        budget_bound = deadline is not None and deadline.remaining() < timeout
+        if budget_bound:
+            timeout = deadline.remaining()
+        if timeout <= 0:
+            DEADLINE_EXCEEDED.labels(self.service).inc()
+            raise BudgetExhaustedError(f"No request budget left to call {self.service}")
+        self.breaker.allow()
+
+        try:
+            result = await asyncio.wait_for(self._hedged(attempt, is_failure, timeout, hedge), timeout)
+        except asyncio.TimeoutError:
+            if budget_bound:
+                self._budget_exhausted()
+                raise BudgetExhaustedError(f"Request budget ran out after {timeout:.2f}s calling {self.service}") from None
+            self.breaker.record_failure()
+            TIMEOUTS.labels(self.service).inc()
+            raise DeadlineExceededError(f"{self.service} did not answer within {timeout:.2f}s") from None
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if budget_bound and deadline.expired():
+                # e.g. the HTTP client's own timeout, which fires together with the deadline
+                self._budget_exhausted()
+                raise BudgetExhaustedError(f"Request budget ran out calling {self.service}: {e}") from e
+            if is_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _budget_exhausted(self):
+        self.breaker.release()
+        DEADLINE_EXCEEDED.labels(self.service).inc()
+
+    async def _timed(self, attempt: Callable[[int, float], Awaitable[T]], index: int, timeout: float) -> T:
+        started = time.monotonic()
+        result = await attempt(index, timeout)
+        self.latency.observe(time.monotonic() - started)
+        return result
+
+    async def _hedged(
+        self,
+        attempt: Callable[[int, float], Awaitable[T]],
+        is_failure: Callable[[BaseException], bool],
+        timeout: float,
+        hedge: bool,
+    ) -> T:
+        hedge = hedge and self.hedge_enabled
+        delay = self.hedge_delay() if hedge else None
+        started = time.monotonic()
+        first = asyncio.ensure_future(self._timed(attempt, 0, timeout))
+        pending = {first}
+        hedged = None
+        try:
+            while True:
+                wait = delay if hedged is None else None
+                done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                failed = None
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedged:
+                            HEDGES.labels(self.service, "won").inc()
+                        return task.result()
+                    failed = task.exception()
+                if failed is not None and not is_failure(failed):
+                    raise failed
+                remaining = timeout - (time.monotonic() - started)
+                if hedge and hedged is None and remaining > 0:
+                    # The hedge delay passed or the first attempt failed: start the second one
+                    hedged = asyncio.ensure_future(self._timed(attempt, 1, remaining))
+                    pending.add(hedged)
+                    HEDGES.labels(self.service, "sent").inc()
+                    continue
+                if not pending:
+                    raise failed
+        finally:
+            for task in pending:
+                task.cancel()
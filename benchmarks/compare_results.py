@@ -0,0 +1,52 @@
+"""
+Compares two benchmark result files (e2e or micro) and prints the relative change
+of every shared metric.
+
+    python compare_results.py results/e2e-abc123-....json results/e2e-def456-....json
+"""
+import json
+import sys
+from typing import Dict
+
+
+def _rows(report: dict) -> Dict[str, Dict[str, float]]:
+    """Flattens a report into {row label: {metric: value}}."""
+    rows = {}
+    for result in report["results"]:
+        label = "/".join(str(result[key]) for key in ("scenario", "phase", "name", "params") if key in result)
+        metrics = {}
+        for key, value in result.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metrics[key] = value
+            elif key.endswith("_ms") and isinstance(value, dict):
+                metrics.update({f"{key}.{k}": v for k, v in value.items()})
+        rows[label] = metrics
+    return rows
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        return 1
+    with open(sys.argv[1]) as f:
+        before = json.load(f)
+    with open(sys.argv[2]) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta'].get('git_revision')}  after: {after['meta'].get('git_revision')}")
+    before_rows, after_rows = _rows(before), _rows(after)
+    for label in before_rows:
+        if label not in after_rows:
+            continue
+        print(f"\n{label}")
+        for metric, old in before_rows[label].items():
+            new = after_rows[label].get(metric)
+            if new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"  {metric:<28} {old:>12.3f} -> {new:>12.3f}  {change}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Routing check for the gateway's ml-inference client across several replicas.
+
+Starts `--replicas` copies of the inference stub on consecutive ports, then uses
+the backend's PredictionModelAPIClient against all of them and reports:
+
+- `routed`: how the sensors are spread over the replicas, and that every sensor
+  was served only by the replica the hash ring assigns it to
+- `failover`: the same requests after stopping the first replica; all must still
+  succeed, with that replica's sensors served by their next replica on the ring
+- `rebalance`: the share of sensors (and of 10000 synthetic keys) that move when
+  one replica is added, compared with the ideal 1/(N+1)
+
+Runs in the backend's environment, since it imports the client:
+
+    cd backend && uv run python ../benchmarks/inference_routing.py --replicas 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(REPO_ROOT, "benchmarks")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "backend"))
+
+from app.core.config import settings  # noqa: E402
+from app.services.hash_ring import ConsistentHashRing  # noqa: E402
+from app.services.prediction_model_client import PredictionModelAPIClient  # noqa: E402
+
+START = datetime(2025, 1, 13, tzinfo=timezone.utc)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def start_replicas(ports: List[int]) -> Dict[str, subprocess.Popen]:
+    processes = {}
+    for port in ports:
+        log = open(os.path.join(RESULTS_DIR, f"stub-inference-{port}.log"), "w")
+        processes[f"http://127.0.0.1:{port}"] = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "stub_inference:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BENCH_DIR, stdout=log, stderr=subprocess.STDOUT,
+        )
+    return processes
+
+
+def stop_replica(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def wait_until_ready(http_client: httpx.AsyncClient, base_urls: List[str], timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    for base_url in base_urls:
+        while True:
+            try:
+                if (await http_client.get(f"{base_url}/stats")).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Stub replica {base_url} did not become ready")
+            await asyncio.sleep(0.2)
+
+
+async def served_counts(http_client: httpx.AsyncClient, base_urls: List[str]) -> Dict[str, Dict[str, int]]:
+    counts = {}
+    for base_url in base_urls:
+        try:
+            counts[base_url] = (await http_client.get(f"{base_url}/stats")).json()["served"]
+        except httpx.HTTPError:
+            counts[base_url] = {}
+    return counts
+
+
+async def run_requests(client: PredictionModelAPIClient, http_client: httpx.AsyncClient, sensors: List[str], minutes: int) -> dict:
+    """One single-sensor request per sensor, then one batch request for all of them."""
+    end = START + timedelta(minutes=minutes - 1)
+    started = time.perf_counter()
+    singles = await asyncio.gather(*(
+        client.get_predicted_data(sensor, START, end, http_client) for sensor in sensors
+    ))
+    batch = await client.get_predicted_data_batch(sensors, START, end, http_client)
+    return {
+        "seconds": time.perf_counter() - started,
+        "single_points": sum(series.count_present() for series in singles),
+        "batch_points": batch.count_present(),
+        "expected_points": len(sensors) * minutes,
+    }
+
+
+def served_by(counts: Dict[str, Dict[str, int]], before: Dict[str, Dict[str, int]]) -> Dict[str, List[str]]:
+    """Sensor -> replicas that served it since `before`."""
+    result: Dict[str, List[str]] = {}
+    for base_url, served in counts.items():
+        for sensor, count in served.items():
+            if count > before.get(base_url, {}).get(sensor, 0):
+                result.setdefault(sensor, []).append(base_url)
+    return result
+
+
+def moved_share(keys: List[str], before: ConsistentHashRing, after: ConsistentHashRing) -> float:
+    return sum(before.node_for(key) != after.node_for(key) for key in keys) / len(keys)
+
+
+async def run_check(args) -> dict:
+    sensors = list(settings.SENSOR_NAMES)
+    ports = [args.base_port + i for i in range(args.replicas)]
+    processes = start_replicas(ports)
+    base_urls = list(processes)
+    results = []
+    try:
+        async with httpx.AsyncClient() as http_client:
+            await wait_until_ready(http_client, base_urls)
+            client = PredictionModelAPIClient(base_urls=base_urls, failover_cooldown_seconds=60.0)
+            assignments = client.ring.assignments(sensors)
+            print("Sensors per replica: " + ", ".join(f"{url}={len(names)}" for url, names in assignments.items()))
+
+            before = await served_counts(http_client, base_urls)
+            routed = await run_requests(client, http_client, sensors, args.minutes)
+            serving = served_by(await served_counts(http_client, base_urls), before)
+            misrouted = [s for s in sensors if serving.get(s) != [client.ring.node_for(s)]]
+            results.append({
+                "phase": "routed", **routed, "misrouted_sensors": misrouted,
+                "sensors_per_replica": {url: len(names) for url, names in assignments.items()},
+            })
+            print(f"routed     {routed['seconds']:.3f}s  misrouted={len(misrouted)}")
+
+            stopped = base_urls[0]
+            stop_replica(processes.pop(stopped))
+            before = await served_counts(http_client, base_urls)
+            failover = await run_requests(client, http_client, sensors, args.minutes)
+            serving = served_by(await served_counts(http_client, base_urls), before)
+            moved = assignments[stopped]
+            wrong_failover = [s for s in moved if serving.get(s) != [client.ring.preference_list(s)[1]]]
+            results.append({
+                "phase": "failover", **failover, "stopped_replica": stopped,
+                "moved_sensors": len(moved), "wrong_failover_sensors": wrong_failover,
+            })
+            print(f"failover   {failover['seconds']:.3f}s  points={failover['batch_points']}/"
+                  f"{failover['expected_points']}  moved={len(moved)} wrong={len(wrong_failover)}")
+    finally:
+        for process in processes.values():
+            stop_replica(process)
+
+    grown = ConsistentHashRing(base_urls + [f"http://127.0.0.1:{args.base_port + args.replicas}"])
+    ring = ConsistentHashRing(base_urls)
+    keys = [f"sensor-{i}" for i in range(10000)]
+    rebalance = {
+        "phase": "rebalance",
+        "moved_sensor_share": moved_share(sensors, ring, grown),
+        "moved_key_share": moved_share(keys, ring, grown),
+        "ideal_share": 1.0 / (args.replicas + 1),
+    }
+    results.append(rebalance)
+    print(f"rebalance  sensors moved={rebalance['moved_sensor_share']:.2%}  keys moved="
+          f"{rebalance['moved_key_share']:.2%}  ideal={rebalance['ideal_share']:.2%}")
+
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "replicas": args.replicas,
+            "sensors": len(sensors),
+            "minutes": args.minutes,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=8103, help="Port of the first stub replica")
+    parser.add_argument("--minutes", type=int, default=60, help="Minutes predicted per sensor and request")
+    parser.add_argument("--output", help="Result file (default: results/inference-routing-<rev>-<time>.json)")
+    args = parser.parse_args()
+    if args.replicas < 2:
+        parser.error("--replicas must be at least 2 to check failover")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    report = asyncio.run(run_check(args))
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"inference-routing-{report['meta']['git_revision']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Micro-benchmarks for merging minute series, JSON row building and upsert parameter building."""
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from harness import MicroBenchmark, add_service_to_path
+
+add_service_to_path("backend")
+
+from app.core.series import MinuteSeries, epoch_minute  # noqa: E402
+from app.crud.crud_sensor_data import COMBINED_FIELDS, build_sensor_data_upsert_args  # noqa: E402
+
+RANGE_MINUTES = [60, 24 * 60, 7 * 24 * 60]
+SENSOR_COUNTS = [1, 8]
+START = datetime(2025, 1, 20, tzinfo=timezone.utc)
+
+
+def merge_combined(end: datetime, source: MinuteSeries) -> MinuteSeries:
+    combined = MinuteSeries.empty(COMBINED_FIELDS, START, end)
+    combined.assign("real_value", source)
+    combined.assign("predicted_value", source)
+    return combined
+
+
+def main():
+    bench = MicroBenchmark("backend", repeat=3)
+    for minutes in RANGE_MINUTES:
+        end = START + timedelta(minutes=minutes)
+        source = MinuteSeries(["Sensor"], epoch_minute(START), np.arange(minutes + 1, dtype=np.float64))
+        bench.measure(
+            "MinuteSeries.assign",
+            lambda end=end, source=source: merge_combined(end, source),
+            {"range_minutes": minutes},
+            per={"point": minutes + 1},
+        )
+        combined = merge_combined(end, source)
+        bench.measure(
+            "MinuteSeries.to_json_rows",
+            lambda combined=combined: combined.to_json_rows(["predicted_value", "real_value"]),
+            {"range_minutes": minutes},
+            per={"point": minutes + 1},
+        )
+
+    for minutes in RANGE_MINUTES:
+        series = MinuteSeries(["Sensor"], epoch_minute(START), np.arange(minutes + 1, dtype=np.float64))
+        for sensors in SENSOR_COUNTS:
+            # Upserts are issued per sensor, so N sensors means N statements
+            bench.measure(
+                "build_sensor_data_upsert_args",
+                lambda series=series, sensors=sensors: [
+                    build_sensor_data_upsert_args(f"Sensor{i}", series, "real")
+                    for i in range(sensors)
+                ],
+                {"range_minutes": minutes, "sensors": sensors},
+                per={"point": len(series) * sensors},
+            )
+    bench.save()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
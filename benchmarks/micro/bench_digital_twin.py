@@ -0,0 +1,74 @@
+"""Micro-benchmarks for SensorDataRepo._load_data, SensorDataRepo.__init__ and get_sensor_value."""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from harness import MicroBenchmark, add_service_to_path
+
+add_service_to_path("digital-twin")
+from app.services.sensor_data_repo import SensorDataRepo  # noqa: E402
+
+RANGE_MINUTES = [60, 24 * 60, 7 * 24 * 60, 28 * 24 * 60]
+SENSOR_COUNTS = [1, 8, 40]
+# Matches the span of data/dataset.csv (2025-01-13 .. 2025-02-16)
+DATASET_DAYS = 35
+
+
+def write_synthetic_dataset(path: str, sensors: int, days: int = DATASET_DAYS):
+    index = pd.date_range("2025-01-13T00:00:00Z", periods=days * 24 * 60, freq="min")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        rng.normal(size=(len(index), sensors)),
+        index=index,
+        columns=[f"Sensor{i}" for i in range(sensors)],
+    )
+    df.index.name = "Datetime"
+    df.to_csv(path, date_format="%Y-%m-%dT%H:%M:%SZ")
+
+
+def main():
+    bench = MicroBenchmark("digital-twin", repeat=3)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_paths = {}
+        for sensors in SENSOR_COUNTS:
+            csv_paths[sensors] = os.path.join(tmp, f"dataset_{sensors}.csv")
+            write_synthetic_dataset(csv_paths[sensors], sensors)
+            loaded = SensorDataRepo(csv_paths[sensors])
+            # Reading and parsing the CSV only, comparable with results from before the replay arrays
+            bench.measure(
+                "SensorDataRepo._load_data",
+                lambda loaded=loaded, path=csv_paths[sensors]: loaded._load_data(path),
+                {"sensors": sensors, "days": DATASET_DAYS},
+            )
+            # Whole startup: _load_data plus building the WeekReplayEngine
+            bench.measure(
+                "SensorDataRepo.__init__",
+                lambda path=csv_paths[sensors]: SensorDataRepo(path),
+                {"sensors": sensors, "days": DATASET_DAYS},
+            )
+
+        repo = SensorDataRepo(csv_paths[max(SENSOR_COUNTS)])
+        in_range_start = datetime(2025, 1, 20, tzinfo=timezone.utc)
+        mapped_start = datetime(2026, 3, 2, tzinfo=timezone.utc)  # outside the dataset, mapped to the default week
+        for minutes in RANGE_MINUTES:
+            for sensors in SENSOR_COUNTS:
+                names = [f"Sensor{i}" for i in range(sensors)]
+                for label, start in (("in_range", in_range_start), ("mapped", mapped_start)):
+                    end = start + timedelta(minutes=minutes)
+                    bench.measure(
+                        "SensorDataRepo.get_sensor_value",
+                        lambda names=names, start=start, end=end: [
+                            repo.get_sensor_value(name, start, end) for name in names
+                        ],
+                        {"range_minutes": minutes, "sensors": sensors, "window": label},
+                        per={"point": (minutes + 1) * sensors},
+                    )
+    bench.save()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
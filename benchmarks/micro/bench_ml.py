@@ -0,0 +1,31 @@
+"""Micro-benchmarks for create_sequences in ml/train_models.py."""
+import sys
+
+import numpy as np
+
+from harness import MicroBenchmark, add_service_to_path
+
+add_service_to_path("ml")
+from train_models import SEQUENCE_LENGTH, create_sequences  # noqa: E402
+
+SERIES_MINUTES = [24 * 60, 7 * 24 * 60, 35 * 24 * 60]
+SENSOR_COUNTS = [1, 8]
+
+
+def main():
+    bench = MicroBenchmark("ml", repeat=3)
+    rng = np.random.default_rng(0)
+    for minutes in SERIES_MINUTES:
+        for sensors in SENSOR_COUNTS:
+            series = [rng.random((minutes, 1)) for _ in range(sensors)]
+            bench.measure(
+                "create_sequences",
+                lambda series=series: [create_sequences(data, SEQUENCE_LENGTH) for data in series],
+                {"range_minutes": minutes, "sensors": sensors},
+                per={"sequence": (minutes - SEQUENCE_LENGTH) * sensors},
+            )
+    bench.save()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
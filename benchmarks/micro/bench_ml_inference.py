@@ -0,0 +1,92 @@
+"""
+Micro-benchmarks for the per-step cost of the ml-inference rollout.
+
+Uses ../model/ActivePower.keras when it is available (pass another path as
+first argument), otherwise a randomly initialised model with the same
+architecture as ml/train_models.py (LSTM(50, relu) -> Dense(25, relu) -> Dense(1)).
+Synthetic models with a direct multi-step head (Dense(K), `--horizon K` in
+train_models.py) show how the rollout cost falls with fewer forward passes.
+"""
+import os
+import sys
+
+import numpy as np
+
+from harness import REPO_ROOT, MicroBenchmark, add_service_to_path
+
+add_service_to_path("ml-inference")
+from app.services.numpy_lstm import DenseLayer, LSTMLayer, NumpyLSTMModel  # noqa: E402
+
+SEQUENCE_LENGTH = 24
+STEPS = [60, 24 * 60]
+SENSOR_COUNTS = [1, 8]
+HORIZONS = [15, 60]
+
+
+def synthetic_model(units: int = 50, hidden: int = 25, outputs: int = 1) -> NumpyLSTMModel:
+    rng = np.random.default_rng(0)
+    return NumpyLSTMModel([
+        LSTMLayer(
+            {"units": units, "activation": "relu", "recurrent_activation": "sigmoid"},
+            [rng.normal(scale=0.3, size=(1, 4 * units)), rng.normal(scale=0.1, size=(units, 4 * units)),
+             np.zeros(4 * units)],
+        ),
+        DenseLayer({"activation": "relu"}, [rng.normal(scale=0.2, size=(units, hidden)), np.zeros(hidden)]),
+        DenseLayer({"activation": "linear"}, [rng.normal(scale=0.2, size=(hidden, outputs)), np.zeros(outputs)]),
+    ])
+
+
+def load_model(model_path: str) -> NumpyLSTMModel:
+    try:
+        return NumpyLSTMModel.from_keras_file(model_path)
+    except Exception as e:
+        print(f"Using a synthetic model, could not load {model_path}: {e}")
+        return synthetic_model()
+
+
+def main():
+    model_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(REPO_ROOT, "model", "ActivePower.keras")
+    model = load_model(model_path)
+    bench = MicroBenchmark("ml-inference", repeat=3)
+    rng = np.random.default_rng(1)
+
+    for steps in STEPS:
+        for sensors in SENSOR_COUNTS:
+            # Sensors have separate models, so each one is its own rollout
+            seeds = rng.random((sensors, SEQUENCE_LENGTH))
+            bench.measure(
+                "NumpyLSTMModel.rollout",
+                lambda seeds=seeds, steps=steps: [model.rollout(seed, steps) for seed in seeds],
+                {"steps": steps, "sensors": sensors},
+                per={"step": steps * sensors},
+            )
+
+    for horizon in HORIZONS:
+        direct_model = synthetic_model(outputs=horizon)
+        seed = rng.random(SEQUENCE_LENGTH)
+        for steps in STEPS:
+            bench.measure(
+                "NumpyLSTMModel.rollout (direct multi-step head)",
+                lambda steps=steps: direct_model.rollout(seed, steps),
+                {"steps": steps, "sensors": 1, "horizon": horizon},
+                per={"step": steps},
+            )
+
+    try:
+        from keras import models
+        keras_model = models.load_model(model_path)
+    except Exception as e:
+        print(f"Skipping the Keras baseline: {e}")
+    else:
+        seed = rng.random((1, SEQUENCE_LENGTH, 1)).astype(np.float32)
+        bench.measure(
+            "keras Model.predict (one step)",
+            lambda: keras_model.predict(seed, verbose=0),
+            {"steps": 1, "sensors": 1},
+            per={"step": 1},
+        )
+    bench.save()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Minimal timeit-based micro-benchmark harness shared by the per-service suites.
+
+Each service has its own environment and its own top-level `app` package, so
+every suite runs inside that service's environment, e.g.
+
+    cd digital-twin && uv run python ../benchmarks/micro/bench_digital_twin.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def add_service_to_path(service_dir: str):
+    """Makes `import app...` resolve to the given service."""
+    sys.path.insert(0, os.path.join(REPO_ROOT, service_dir))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+class MicroBenchmark:
+    """Collects timings for one service and writes them as JSON."""
+
+    def __init__(self, suite: str, repeat: int = 5):
+        self.suite = suite
+        self.repeat = repeat
+        self.results: List[dict] = []
+
+    def measure(self, name: str, fn: Callable[[], object], params: Dict, per: Dict[str, int] = None):
+        """
+        Times `fn` with timeit (autoranged to at least 0.2 s per sample, `repeat` samples).
+
+        Args:
+            per: Optional {unit: count} to also report time per unit, e.g. {"step": 1440}.
+        """
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        samples = [t / number * 1000.0 for t in timer.repeat(repeat=self.repeat, number=number)]
+        result = {
+            "name": name,
+            "params": ",".join(f"{k}={v}" for k, v in params.items()),
+            "calls_per_sample": number,
+            "time_ms": {
+                "min": min(samples),
+                "median": statistics.median(samples),
+                "mean": statistics.fmean(samples),
+            },
+        }
+        for unit, count in (per or {}).items():
+            result[f"per_{unit}_us"] = min(samples) * 1000.0 / count
+        self.results.append(result)
+        print(f"{name:<36} {result['params']:<32} min={result['time_ms']['min']:10.3f} ms"
+              + "".join(f"  per_{unit}={result[f'per_{unit}_us']:.2f} us" for unit in (per or {})))
+
+    def save(self, output: str = None) -> str:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        revision = git_revision()
+        output = output or os.path.join(
+            RESULTS_DIR, f"micro-{self.suite}-{revision}-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        with open(output, "w") as f:
+            json.dump({
+                "meta": {
+                    "suite": self.suite,
+                    "git_revision": revision,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "python": sys.version.split()[0],
+                },
+                "results": self.results,
+            }, f, indent=2)
+        print(f"Saved results to {output}")
+        return output
@@ -0,0 +1,15 @@
+#!/usr/bin/env bash
+
+set -e
+
+# 1. Check if uv is installed
+if ! command -v uv &> /dev/null; then
+    echo "uv is not installed. Please install it from https://github.com/astral-sh/uv"
+    exit 1
+fi
+
+# 2. Start the benchmark database
+docker compose up -d timescale-bench
+
+# 3. Run the load test, forwarding all arguments
+uv run python e2e_load.py "$@"
@@ -0,0 +1,24 @@
+#!/usr/bin/env bash
+
+set -e
+
+# 1. Check if uv is installed
+if ! command -v uv &> /dev/null; then
+    echo "uv is not installed. Please install it from https://github.com/astral-sh/uv"
+    exit 1
+fi
+
+BENCH_DIR="$(cd "$(dirname "$0")" && pwd)"
+cd "$BENCH_DIR/.."
+
+# 2. Run every suite inside its service's environment ("all" by default)
+SUITES=("${@:-digital-twin backend ml-inference ml}")
+for suite in ${SUITES[@]}; do
+    case "$suite" in
+        digital-twin) (cd digital-twin && uv run python "$BENCH_DIR/micro/bench_digital_twin.py") ;;
+        backend)      (cd backend && uv run python "$BENCH_DIR/micro/bench_backend.py") ;;
+        ml-inference) (cd ml-inference && uv run python "$BENCH_DIR/micro/bench_ml_inference.py") ;;
+        ml)           (cd ml && uv run python "$BENCH_DIR/micro/bench_ml.py") ;;
+        *) echo "Unknown suite: $suite"; exit 1 ;;
+    esac
+done
@@ -0,0 +1,90 @@
+"""
+Stand-in for the ml-inference service used by the end-to-end benchmark.
+
+Implements the same prediction endpoints with deterministic values and an
+optional artificial latency per predicted minute, so gateway and DB behaviour
+can be measured without GPUs or the model artifacts.
+
+    STUB_LATENCY_MS_PER_POINT=0.5 uvicorn stub_inference:app --port 8003
+"""
+import asyncio
+import math
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi import FastAPI, Query
+from pydantic import BaseModel
+
+LATENCY_MS_PER_POINT = float(os.getenv("STUB_LATENCY_MS_PER_POINT", "0"))
+
+
+class DataPoint(BaseModel):
+    timestamp: datetime
+    value: float
+
+
+class PredictionResponse(BaseModel):
+    sensorName: str
+    data: List[DataPoint]
+    message: str = "Prediction successful"
+
+
+class BatchPredictionRequest(BaseModel):
+    sensorNames: List[str]
+    startDate: datetime
+    endDate: datetime
+
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[PredictionResponse]
+
+
+app = FastAPI(title="Stub ML Inference API")
+
+# sensor name -> predictions served, so routing across several stub replicas can be checked
+served = Counter()
+
+
+def _utc_minute(dt: datetime) -> datetime:
+    dt = dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+    return dt.replace(second=0, microsecond=0)
+
+
+async def _predict(sensor_name: str, start: datetime, end: datetime) -> PredictionResponse:
+    served[sensor_name] += 1
+    start, end = _utc_minute(start), _utc_minute(end)
+    minutes = int((end - start) / timedelta(minutes=1)) + 1
+    if LATENCY_MS_PER_POINT:
+        await asyncio.sleep(minutes * LATENCY_MS_PER_POINT / 1000.0)
+    phase = sum(map(ord, sensor_name)) % 60
+    data = [
+        DataPoint(
+            timestamp=start + timedelta(minutes=i),
+            value=100.0 + 10.0 * math.sin((start.minute + i + phase) / 60.0 * 2 * math.pi),
+        )
+        for i in range(minutes)
+    ]
+    return PredictionResponse(sensorName=sensor_name, data=data)
+
+
+@app.get("/api/v1/sensor/predict", response_model=PredictionResponse)
+async def predict(
+    sensorName: str = Query(...),
+    startDate: datetime = Query(...),
+    endDate: datetime = Query(...),
+):
+    return await _predict(sensorName, startDate, endDate)
+
+
+@app.post("/api/v1/sensor/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest):
+    return BatchPredictionResponse(predictions=[
+        await _predict(name, request.startDate, request.endDate) for name in request.sensorNames
+    ])
+
+
+@app.get("/stats")
+async def stats():
+    return {"served": served}
@@ -1,24 +1,74 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from datetime import datetime, timezone
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
 from app.api.v1 import schemas
+from app.core.metrics import record_count, span
+from app.core.wire_format import SERIES_NPZ_MEDIA_TYPE, accepts_series_npz, encode_series_npz
+from app.services.replay_clock import ReplayClock, format_replay_event
+from app.services.replay_engine import epoch_minute_to_datetime
 from app.services.sensor_data_repo import SensorDataRepo
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-CSV_PATH = "../data/dataset.csv"
+CSV_PATH = os.getenv("DATASET_PATH", "../data/dataset.csv")
+# Map the dataset arrays from one shared memory segment per host instead of loading a
+# copy per worker, for `uvicorn --workers N` (POSIX only)
+SHARED_MEMORY_ENABLED = os.getenv("SHARED_MEMORY_ENABLED", "false").lower() in ("1", "true")
+
+# Replay mode: publish every minute of all sensors on a clock (REPLAY_SPEED x real time,
+# starting at REPLAY_START or now) to subscribers of the /stream endpoint
+REPLAY_ENABLED = os.getenv("REPLAY_ENABLED", "false").lower() in ("1", "true")
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1"))
+REPLAY_START = os.getenv("REPLAY_START")
+REPLAY_QUEUE_SIZE = int(os.getenv("REPLAY_QUEUE_SIZE", "10000"))
+REPLAY_KEEPALIVE_SECONDS = 15.0
+
+
+def series_npz_response(names: List[str], minutes: np.ndarray, values: np.ndarray) -> Response:
+    """Encodes (k, n) values on the consecutive epoch minutes `minutes` as an npz response."""
+    start_minute = int(minutes[0]) if len(minutes) else 0
+    return Response(
+        content=encode_series_npz(names, start_minute, 1, values),
+        media_type=SERIES_NPZ_MEDIA_TYPE,
+    )
+
 
-@router.get("/api/v1/sensor/data", response_model=schemas.SensorDataResponse)
+@lru_cache(maxsize=1)
+def get_sensor_data_repo() -> SensorDataRepo:
+    """Loads the dataset and builds its replay arrays once per process (once per host when shared)."""
+    return SensorDataRepo(CSV_PATH, shared_memory=SHARED_MEMORY_ENABLED)
+
+
+@lru_cache(maxsize=1)
+def get_replay_clock() -> ReplayClock:
+    start = datetime.fromisoformat(REPLAY_START.replace("Z", "+00:00")) if REPLAY_START else None
+    return ReplayClock(get_sensor_data_repo(), speed=REPLAY_SPEED, start=start, queue_size=REPLAY_QUEUE_SIZE)
+
+
+@router.get(
+    "/api/v1/sensor/data",
+    response_model=schemas.SensorDataResponse,
+    responses={200: {"content": {SERIES_NPZ_MEDIA_TYPE: {}}}},
+)
 async def get_sensor_data(
+    request: Request,
     sensorName: str = Query(..., example="ActivePower"),
     startDate: datetime = Query(..., example="2025-02-17T01:00:00Z"),
     endDate: datetime = Query(..., example="2025-02-17T02:00:00Z"),
 ):
     """
     Fetches time-series data for a specific sensor between two dates.
-    Data is returned at a 1-minute interval.
+    Data is returned at a 1-minute interval. Send `Accept: application/x-npz`
+    for the binary encoding described in `app.core.wire_format`.
     """
     if startDate >= endDate:
         raise HTTPException(
@@ -31,8 +81,114 @@ async def get_sensor_data(
     if endDate.tzinfo is None:
         endDate = endDate.replace(tzinfo=timezone.utc)
 
-    retriever = SensorDataRepo(CSV_PATH)
+    with span("data_load"):
+        retriever = get_sensor_data_repo()
+
+    if accepts_series_npz(request.headers.get("accept")):
+        with span("data_slice"):
+            minutes, values = retriever.get_sensor_columns([sensorName], startDate, endDate)
+        record_count("points_returned", values.size)
+        return series_npz_response([sensorName], minutes, values)
 
-    data_points = retriever.get_sensor_value(sensorName, startDate, endDate)
+    with span("data_slice"):
+        data_points = retriever.get_sensor_value(sensorName, startDate, endDate)
+    record_count("points_returned", len(data_points))
 
     return schemas.SensorDataResponse(sensorName=sensorName, data=data_points)
+
+
+@router.get(
+    "/columns",
+    response_model=schemas.ColumnarSensorDataResponse,
+    responses={200: {"content": {SERIES_NPZ_MEDIA_TYPE: {}}}},
+)
+async def get_sensor_data_columns(
+    request: Request,
+    sensorNames: List[str] = Query(..., example=["ActivePower", "ReactivePower"]),
+    startDate: datetime = Query(..., example="2025-02-17T01:00:00Z"),
+    endDate: datetime = Query(..., example="2025-02-17T02:00:00Z"),
+):
+    """
+    Fetches several sensors between two dates in one call, as one timestamps
+    column plus one value column per sensor, at a 1-minute interval.
+
+    `sensorNames` may be repeated or comma-separated. Send
+    `Accept: application/x-npz` to receive the binary encoding described in
+    `app.core.wire_format` instead of JSON.
+    """
+    if startDate >= endDate:
+        raise HTTPException(
+            status_code=400, detail="startDate must be before endDate"
+        )
+
+    if startDate.tzinfo is None:
+        startDate = startDate.replace(tzinfo=timezone.utc)
+    if endDate.tzinfo is None:
+        endDate = endDate.replace(tzinfo=timezone.utc)
+
+    sensor_names = [name for names in sensorNames for name in names.split(",") if name]
+
+    with span("data_load"):
+        retriever = get_sensor_data_repo()
+
+    with span("data_slice"):
+        try:
+            minutes, values = retriever.get_sensor_columns(sensor_names, startDate, endDate)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    record_count("points_returned", values.size)
+
+    if accepts_series_npz(request.headers.get("accept")):
+        return series_npz_response(sensor_names, minutes, values)
+
+    # JSON has no NaN, so missing values become null
+    json_values = values.astype(object)
+    json_values[np.isnan(values)] = None
+    return schemas.ColumnarSensorDataResponse(
+        sensorNames=sensor_names,
+        timestamps=[epoch_minute_to_datetime(minute) for minute in minutes.tolist()],
+        values={name: column.tolist() for name, column in zip(sensor_names, json_values)},
+    )
+
+
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_sensor_data(
+    request: Request,
+    sensorNames: Optional[List[str]] = Query(None, example=["ActivePower", "ReactivePower"]),
+):
+    """
+    Streams the replay clock as Server-Sent Events: one `minute` event per replayed
+    minute, `{"timestamp": ..., "values": {sensor: value or null}}`, for the given
+    sensors (repeated or comma-separated) or all of them. Requires REPLAY_ENABLED.
+    """
+    if not REPLAY_ENABLED:
+        raise HTTPException(status_code=503, detail="Replay mode is disabled; set REPLAY_ENABLED=true")
+
+    clock = get_replay_clock()
+    sensor_names = [name for names in sensorNames or [] for name in names.split(",") if name]
+    try:
+        subscription = clock.subscribe(sensor_names or None)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    sensor_names = sensor_names or clock.sensor_names
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                row = await subscription.next_row(REPLAY_KEEPALIVE_SECONDS)
+                if row is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_replay_event(sensor_names, row, subscription.columns)
+        finally:
+            clock.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
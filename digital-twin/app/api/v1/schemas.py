@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List, Union
+from typing import Dict, List, Optional, Union
 
 class DataPoint(BaseModel):
     timestamp: datetime
@@ -14,4 +14,11 @@ class SensorDataRequest(BaseModel):
 class SensorDataResponse(BaseModel):
     sensorName: str
     data: List[DataPoint]
-    message: str = "Data fetched successfully"
\ No newline at end of file
+    message: str = "Data fetched successfully"
+
+class ColumnarSensorDataResponse(BaseModel):
+    """Several sensors on one shared timestamp column; values are null where missing."""
+    sensorNames: List[str]
+    timestamps: List[datetime]
+    values: Dict[str, List[Optional[float]]]
+    message: str = "Data fetched successfully"
@@ -0,0 +1,62 @@
+"""
+Compact binary encoding for regular 1-minute series, spoken between the
+backend, the digital twin and ml-inference.
+
+A payload is an uncompressed NumPy `.npz` archive (a zip of `.npy` arrays):
+
+- `names`: unicode array of shape (k,), one name per series (row of `values`)
+- `start_minute`: int64 scalar, Unix epoch minutes of the first column
+- `step_minutes`: int64 scalar, spacing between columns
+- `values`: little-endian float64 array of shape (k, n), NaN where no value exists
+
+Timestamps are implied by `start_minute + i * step_minutes`, so a point costs
+8 bytes on the wire and decodes without any per-point parsing.
+
+Every service holds an identical copy of this module (see
+scripts/check_shared_copies.py); service-specific wrappers live elsewhere.
+"""
+import io
+from typing import List, NamedTuple
+
+import numpy as np
+
+SERIES_NPZ_MEDIA_TYPE = "application/x-npz"
+# Sent by the clients: binary preferred, JSON from services that don't support it
+SERIES_ACCEPT_HEADER = f"{SERIES_NPZ_MEDIA_TYPE}, application/json;q=0.5"
+
+
+class EncodedSeries(NamedTuple):
+    names: List[str]
+    start_minute: int
+    step_minutes: int
+    values: np.ndarray
+
+
+def accepts_series_npz(accept_header: str) -> bool:
+    return SERIES_NPZ_MEDIA_TYPE in (accept_header or "")
+
+
+def is_series_npz(content_type: str) -> bool:
+    return (content_type or "").startswith(SERIES_NPZ_MEDIA_TYPE)
+
+
+def encode_series_npz(names: List[str], start_minute: int, step_minutes: int, values: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        names=np.asarray(names, dtype=np.str_),
+        start_minute=np.int64(start_minute),
+        step_minutes=np.int64(step_minutes),
+        values=np.ascontiguousarray(values, dtype="<f8"),
+    )
+    return buffer.getvalue()
+
+
+def decode_series_npz(payload: bytes) -> EncodedSeries:
+    with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+        return EncodedSeries(
+            names=archive["names"].tolist(),
+            start_minute=int(archive["start_minute"]),
+            step_minutes=int(archive["step_minutes"]),
+            values=archive["values"],
+        )
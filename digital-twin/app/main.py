@@ -1,17 +1,46 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 import logging
+import os
 
 from app.api.v1.endpoints import sensor_data as sensor_data_router_v1
+from app.core.metrics import RequestMetricsMiddleware, metrics_endpoint
+from app.core.profiling import ProfilingMiddleware
 
 # Configure basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Opt-in request profiling (X-Profile: 1 header and/or a sampled fraction of requests)
+PROFILING_HEADER_ENABLED = os.getenv("PROFILING_HEADER_ENABLED", "false").lower() in ("1", "true")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if sensor_data_router_v1.REPLAY_ENABLED:
+        sensor_data_router_v1.get_replay_clock().start_clock()
+    yield
+    if sensor_data_router_v1.REPLAY_ENABLED:
+        await sensor_data_router_v1.get_replay_clock().stop_clock()
+
 app = FastAPI(
     title="Sensor Data API",
     description="Fetches time-series data",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
+if PROFILING_HEADER_ENABLED or PROFILING_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        header_enabled=PROFILING_HEADER_ENABLED,
+        sample_rate=PROFILING_SAMPLE_RATE,
+        output_dir=PROFILING_OUTPUT_DIR,
+    )
+# Trace IDs, per-request timing log lines and Prometheus histograms
+app.add_middleware(RequestMetricsMiddleware)
+app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
 
 app.include_router(
     sensor_data_router_v1.router,
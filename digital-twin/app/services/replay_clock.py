@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from app.core.metrics import METRICS_NAMESPACE
+from app.services.replay_engine import epoch_minute_to_datetime, to_epoch_minute
+from app.services.sensor_data_repo import SensorDataRepo
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MINUTES = Counter(
+    "replay_minutes_total", "Minutes emitted by the replay clock.",
+    namespace=METRICS_NAMESPACE,
+)
+REPLAY_SUBSCRIBERS = Gauge(
+    "replay_subscribers", "Open subscriptions to the replay feed.",
+    namespace=METRICS_NAMESPACE,
+)
+REPLAY_DROPPED = Counter(
+    "replay_dropped_minutes_total", "Minutes dropped because a subscriber fell behind.",
+    namespace=METRICS_NAMESPACE,
+)
+
+# One published item: (epoch minute, float64 values of all sensors in repo column order)
+ReplayRow = Tuple[int, np.ndarray]
+
+
+class ReplaySubscription:
+    """Bounded queue of replayed rows; a slow consumer loses its oldest rows."""
+
+    def __init__(self, columns: List[int], queue_size: int):
+        self.columns = columns
+        self.queue: "asyncio.Queue[ReplayRow]" = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, row: ReplayRow):
+        if self.queue.full():
+            self.queue.get_nowait()
+            REPLAY_DROPPED.inc()
+        self.queue.put_nowait(row)
+
+    async def next_row(self, timeout: float) -> Optional[ReplayRow]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ReplayClock:
+    """
+    Emits the dataset minute by minute on a clock, as if the sensors were live.
+
+    Replay time starts at `start` and advances `speed` replay minutes per
+    wall-clock minute (1.0 = real time, 60.0 = one replayed hour per minute).
+    Each minute's row of all sensors is read through the same rules as range
+    queries (recorded values inside the dataset, the default week elsewhere)
+    and published to every subscriber. When the loop falls behind, e.g. at
+    high speeds, all due minutes are read with one range query and published
+    in order, so the replayed rate holds even if ticks are coarser than a
+    replay minute.
+    """
+
+    # Lower bound on the sleep between ticks, so high speeds batch minutes instead of spinning
+    MIN_TICK_SECONDS = 0.01
+
+    def __init__(self, repo: SensorDataRepo, speed: float = 1.0, start: Optional[datetime] = None, queue_size: int = 10000):
+        if speed <= 0:
+            raise ValueError("Replay speed must be positive.")
+        self.repo = repo
+        self.speed = speed
+        self.start = start or datetime.now(timezone.utc)
+        self.queue_size = queue_size
+        self.sensor_names = list(repo.replay.sensor_names)
+        self.subscribers: Set[ReplaySubscription] = set()
+        self.next_minute = math.ceil(to_epoch_minute(self.start))
+        self._start_minute = self.next_minute
+        self._started_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start_clock(self):
+        if self._task is None:
+            self._started_at = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Replay clock started at {self.start.isoformat()} with speed {self.speed}x.")
+
+    async def stop_clock(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def subscribe(self, sensor_names: Optional[List[str]] = None) -> ReplaySubscription:
+        """
+        Args:
+            sensor_names (Optional[List[str]]): Sensors to receive; all sensors if None.
+
+        Raises:
+            ValueError: If a sensor is not in the dataset.
+        """
+        names = sensor_names or self.sensor_names
+        missing = [name for name in names if name not in self.repo.replay]
+        if missing:
+            raise ValueError(f"Sensor(s) {missing} not found in dataset columns.")
+        subscription = ReplaySubscription([self.repo.replay.sensor_index[name] for name in names], self.queue_size)
+        self.subscribers.add(subscription)
+        REPLAY_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: ReplaySubscription):
+        if subscription in self.subscribers:
+            self.subscribers.discard(subscription)
+            REPLAY_SUBSCRIBERS.dec()
+
+    def due_minute(self) -> int:
+        """Last replay minute whose time has come on the wall clock."""
+        elapsed_minutes = (time.monotonic() - self._started_at) * self.speed / 60.0
+        return self._start_minute + math.floor(elapsed_minutes)
+
+    def emit_due_minutes(self) -> int:
+        """Publishes every minute from `next_minute` up to the due minute; returns how many."""
+        last_minute = self.due_minute()
+        if last_minute < self.next_minute:
+            return 0
+        minutes, values = self.repo.replay.get_range(
+            self.sensor_names,
+            epoch_minute_to_datetime(self.next_minute),
+            epoch_minute_to_datetime(last_minute),
+        )
+        for minute, row in zip(minutes.tolist(), values):
+            for subscription in self.subscribers:
+                subscription.push((minute, row))
+        self.next_minute = last_minute + 1
+        REPLAY_MINUTES.inc(len(minutes))
+        return len(minutes)
+
+    async def _run(self):
+        seconds_per_minute = 60.0 / self.speed
+        while True:
+            try:
+                self.emit_due_minutes()
+            except Exception as e: # Keep the clock alive on unexpected errors
+                logger.error(f"Replay clock tick failed: {e}")
+            # `next_minute` is due once its offset from the start has elapsed on the wall clock
+            next_due = self._started_at + (self.next_minute - self._start_minute) * seconds_per_minute
+            await asyncio.sleep(max(next_due - time.monotonic(), self.MIN_TICK_SECONDS))
+
+
+def format_replay_event(sensor_names: List[str], row: ReplayRow, columns: List[int]) -> str:
+    """SSE `minute` event with the row's values for `columns` (null where missing)."""
+    minute, values = row
+    selected = values[columns].tolist()
+    data = {
+        "timestamp": epoch_minute_to_datetime(minute).isoformat().replace("+00:00", "Z"),
+        "values": {name: (None if math.isnan(v) else v) for name, v in zip(sensor_names, selected)},
+    }
+    return f"event: minute\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
@@ -0,0 +1,161 @@
+import math
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+MINUTES_PER_WEEK = 7 * 24 * 60
+
+
+def to_epoch_minute(dt: datetime) -> float:
+    """Minutes since the Unix epoch (fractional for sub-minute times); naive datetimes are treated as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp() / 60.0
+
+
+def epoch_minute_to_datetime(minute: int) -> datetime:
+    return datetime.fromtimestamp(minute * 60, tz=timezone.utc)
+
+
+class WeekReplayEngine:
+    """
+    Minute-resolution replay of the dataset as dense NumPy arrays.
+
+    The dataset is stored as one (minutes, sensors) array on a 1-minute grid
+    (missing minutes are NaN). The default week is a view of 10080 rows of it,
+    treated as a circular buffer: every minute outside the dataset maps to the
+    slot with the same weekday and time of day, i.e.
+    `(minute - week_start_minute) % MINUTES_PER_WEEK`. Ranges of any length are
+    served as a handful of contiguous slices, so multi-week and future ranges
+    wrap around the week instead of running off the end of the dataset.
+    """
+
+    def __init__(
+        self,
+        sensor_names: Sequence[str],
+        dataset_start_minute: int,
+        dataset_values: np.ndarray,
+        week_start_minute: int,
+    ):
+        self.sensor_names = list(sensor_names)
+        self.sensor_index = {name: i for i, name in enumerate(self.sensor_names)}
+        self.dataset_start_minute = dataset_start_minute
+        self.dataset_values = dataset_values
+        self.dataset_end_minute = dataset_start_minute + len(dataset_values) - 1  # inclusive
+        self.week_start_minute = week_start_minute
+
+        week_offset = week_start_minute - dataset_start_minute
+        if week_offset < 0 or week_offset + MINUTES_PER_WEEK > len(dataset_values):
+            raise ValueError("The default week must lie completely inside the dataset.")
+        self.week_values = dataset_values[week_offset:week_offset + MINUTES_PER_WEEK]
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: pd.DataFrame,
+        dataset_start: pd.Timestamp,
+        dataset_end: pd.Timestamp,
+        week_start: pd.Timestamp,
+    ) -> "WeekReplayEngine":
+        """
+        Builds the engine from a DataFrame with a UTC DatetimeIndex.
+
+        Args:
+            df (pd.DataFrame): Sensor columns indexed by timestamp.
+            dataset_start (pd.Timestamp): First minute of the dataset.
+            dataset_end (pd.Timestamp): Last instant of the dataset (inclusive).
+            week_start (pd.Timestamp): Monday 00:00 of the default week.
+
+        Returns:
+            WeekReplayEngine: Engine with every column converted to float64.
+        """
+        dataset_start_minute = math.ceil(to_epoch_minute(dataset_start.to_pydatetime()))
+        dataset_end_minute = math.floor(to_epoch_minute(dataset_end.to_pydatetime()))
+        grid = pd.date_range(
+            epoch_minute_to_datetime(dataset_start_minute),
+            periods=dataset_end_minute - dataset_start_minute + 1,
+            freq="min",
+        )
+        numeric = df.apply(pd.to_numeric, errors="coerce")
+        # Keep the last value if a minute occurs more than once
+        numeric = numeric[~numeric.index.duplicated(keep="last")].reindex(grid)
+        return cls(
+            sensor_names=list(df.columns),
+            dataset_start_minute=dataset_start_minute,
+            dataset_values=numeric.to_numpy(dtype=np.float64),
+            week_start_minute=int(to_epoch_minute(week_start.to_pydatetime())),
+        )
+
+    def to_shared_arrays(self) -> Tuple[Dict[str, np.ndarray], dict]:
+        """The engine's data as (arrays, metadata) for `app.core.shared_arrays`."""
+        return {"dataset_values": self.dataset_values}, {
+            "sensor_names": self.sensor_names,
+            "dataset_start_minute": self.dataset_start_minute,
+            "week_start_minute": self.week_start_minute,
+        }
+
+    @classmethod
+    def from_shared_arrays(cls, arrays: Dict[str, np.ndarray], meta: dict) -> "WeekReplayEngine":
+        """Rebuilds an engine around (read-only) arrays from `to_shared_arrays`, without copying them."""
+        return cls(
+            sensor_names=meta["sensor_names"],
+            dataset_start_minute=meta["dataset_start_minute"],
+            dataset_values=arrays["dataset_values"],
+            week_start_minute=meta["week_start_minute"],
+        )
+
+    def __contains__(self, sensor_name: str) -> bool:
+        return sensor_name in self.sensor_index
+
+    def week_slot(self, minute: int) -> int:
+        return (minute - self.week_start_minute) % MINUTES_PER_WEEK
+
+    def _segments(self, first_minute: int, count: int, from_dataset: bool) -> Iterator[Tuple[int, int, np.ndarray, int]]:
+        """Yields (output offset, length, source array, source offset) covering `count` minutes."""
+        position = 0
+        if from_dataset and self.dataset_start_minute <= first_minute <= self.dataset_end_minute:
+            length = min(count, self.dataset_end_minute - first_minute + 1)
+            yield 0, length, self.dataset_values, first_minute - self.dataset_start_minute
+            position = length
+
+        slot = self.week_slot(first_minute + position)
+        while position < count:
+            length = min(count - position, MINUTES_PER_WEEK - slot)
+            yield position, length, self.week_values, slot
+            position += length
+            slot = 0
+
+    def get_range(
+        self,
+        sensor_names: List[str],
+        start: datetime,
+        end: datetime,
+        from_dataset: bool = True,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns every whole minute in [start, end] and the sensors' values at those minutes.
+
+        Args:
+            sensor_names (List[str]): Sensors to return, in column order.
+            start (datetime): Range start (inclusive).
+            end (datetime): Range end (inclusive).
+            from_dataset (bool): Read minutes inside the dataset from the dataset itself.
+                Minutes after its end always continue in the circular default week.
+                When False, the whole range is replayed from the default week.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: int64 epoch minutes of shape (n,) and
+            float64 values of shape (n, len(sensor_names)); NaN where no value exists.
+        """
+        columns = [self.sensor_index[name] for name in sensor_names]
+        first_minute = math.ceil(to_epoch_minute(start))
+        last_minute = math.floor(to_epoch_minute(end))
+        count = max(last_minute - first_minute + 1, 0)
+
+        minutes = np.arange(first_minute, first_minute + count, dtype=np.int64)
+        values = np.empty((count, len(columns)), dtype=np.float64)
+        for position, length, source, offset in self._segments(first_minute, count, from_dataset):
+            values[position:position + length] = source[offset:offset + length, columns]
+        return minutes, values
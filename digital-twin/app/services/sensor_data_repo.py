@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime as dt_datetime, time, timedelta
-from typing import List, Union, TypeVar
+from datetime import datetime as dt_datetime
+from typing import List, Tuple, TypeVar
 from app.api.v1.schemas import DataPoint
+from app.core.shared_arrays import file_key, load_shared_arrays
+from app.services.replay_engine import WeekReplayEngine, epoch_minute_to_datetime
 
 # To handle pandas Timestamps in Pydantic model if needed, though we convert to datetime
 PandasTimestamp = TypeVar("PandasTimestamp")
@@ -20,23 +23,47 @@ class SensorDataRepo:
         "2025-02-10T00:00:00Z"
     )  # This is a Monday
 
-    def __init__(self, csv_path: str):
+    def __init__(self, csv_path: str, shared_memory: bool = False):
         """
         Initializes the retriever by loading and preparing the dataset.
 
         Args:
             csv_path (str): Path to the CSV dataset file.
+            shared_memory (bool): Keep the replay arrays in a shared memory segment
+                that all worker processes on the host map instead of loading their
+                own copy (see `app.core.shared_arrays`). `df` is not kept then.
         """
+        if shared_memory:
+            self.df = None
+            # Referenced for the process lifetime: the replay arrays are views into it
+            self.shared = load_shared_arrays(
+                "twin-dataset",
+                file_key(csv_path),
+                lambda: self._build_replay(self._load_data(csv_path), csv_path).to_shared_arrays(),
+            )
+            self.replay = WeekReplayEngine.from_shared_arrays(self.shared.arrays, self.shared.meta)
+            return
+
         self.df = self._load_data(csv_path)
-        if self.df.empty:
+        self.replay = self._build_replay(self.df, csv_path)
+
+    def _build_replay(self, df: pd.DataFrame, csv_path: str) -> WeekReplayEngine:
+        if df.empty:
             # Depending on requirements, could raise error or just warn
             print(f"Warning: DataFrame loaded from {csv_path} is empty.")
-        elif self.df.index.name != "Datetime":
+        elif df.index.name != "Datetime":
             # This check might be redundant if _load_data is robust
             raise ValueError(
                 "DataFrame index must be 'Datetime' after loading."
             )
 
+        return WeekReplayEngine.from_dataframe(
+            df,
+            self.DATASET_START_DATE,
+            self.DATASET_END_DATE,
+            self.DEFAULT_WEEK_START_DATE,
+        )
+
     def _load_data(self, csv_path: str) -> pd.DataFrame:
         """
         Loads data from the specified CSV file.
@@ -87,30 +114,42 @@ class SensorDataRepo:
             return ts.tz_localize("UTC")
         return ts.tz_convert("UTC")
 
-    def _map_dt_to_default_week(
-        self, dt_to_map: pd.Timestamp
-    ) -> pd.Timestamp:
-        """Maps a given Timestamp to the equivalent day and time in the default week."""
-        if dt_to_map.tzinfo is None or dt_to_map.tzinfo.utcoffset(dt_to_map) is None:
-             dt_to_map = dt_to_map.tz_localize("UTC") # Ensure tz-aware for weekday()
-        elif dt_to_map.tzname() != "UTC":
-             dt_to_map = dt_to_map.tz_convert("UTC")
-
-        day_of_week = dt_to_map.weekday()  # Monday=0, Sunday=6
-        time_of_day = dt_to_map.time()
-
-        # DEFAULT_WEEK_START_DATE is a Monday
-        target_date_in_default_week = (
-            self.DEFAULT_WEEK_START_DATE.date()
-            + pd.Timedelta(days=day_of_week)
-        )
+    def get_sensor_columns(
+        self, sensorNames: List[str], startDate: dt_datetime, endDate: dt_datetime
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retrieves several sensors over one time range as arrays, using the same
+        in-range / default-week rules as `get_sensor_value`.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: int64 epoch minutes of shape (n,) and
+            float64 values of shape (len(sensorNames), n), NaN where no value exists.
+
+        Raises:
+            ValueError: If a sensor is unknown or startDate is after endDate.
+        """
+        missing = [name for name in sensorNames if name not in self.replay]
+        if missing:
+            raise ValueError(
+                f"Sensor(s) {missing} not found in dataset columns: {self.replay.sensor_names}"
+            )
 
-        # Combine the target date with the original time
-        target_dt_naive = dt_datetime.combine(
-            target_date_in_default_week, time_of_day
+        original_start_ts = self._ensure_dt_is_utc_aware_pd_timestamp(startDate)
+        original_end_ts = self._ensure_dt_is_utc_aware_pd_timestamp(endDate)
+
+        if original_start_ts > original_end_ts:
+            raise ValueError("startDate cannot be after endDate.")
+
+        in_dataset = (
+            self.DATASET_START_DATE <= original_start_ts <= self.DATASET_END_DATE
         )
-        # Return as a UTC-aware pandas Timestamp
-        return pd.Timestamp(target_dt_naive, tz="UTC")
+        minutes, values = self.replay.get_range(
+            sensorNames,
+            original_start_ts.to_pydatetime(),
+            original_end_ts.to_pydatetime(),
+            from_dataset=in_dataset,
+        )
+        return minutes, values.T
 
     def get_sensor_value(
             self, sensorName: str, startDate: dt_datetime, endDate: dt_datetime
@@ -121,64 +160,17 @@ class SensorDataRepo:
             If startDate is within the dataset's valid range, data is fetched for the
             original [startDate, endDate]. Timestamps in DataPoints match this range.
     
-            If startDate is outside this range, startDate is mapped to the default
-            week (2025-02-10 to 2025-02-16), the original duration of the query is
-            preserved, and data is fetched for this mapped range. However, the
-            timestamps in the returned DataPoints are adjusted to reflect the
-            user's originally requested time range.
+            If startDate is outside this range, the values are replayed from the
+            default week (2025-02-10 to 2025-02-16) with the same weekday and time
+            of day, wrapping around the week for ranges of any length. Minutes
+            after the end of the dataset are replayed the same way, so long and
+            future ranges never run out of data. Timestamps in the returned
+            DataPoints always match the user's requested time range.
             """
-            if sensorName not in self.df.columns:
-                raise ValueError(
-                    f"Sensor '{sensorName}' not found in dataset columns: {self.df.columns.tolist()}"
-                )
-    
-            original_start_ts = self._ensure_dt_is_utc_aware_pd_timestamp(
-                startDate
-            )
-            original_end_ts = self._ensure_dt_is_utc_aware_pd_timestamp(endDate)
-    
-            if original_start_ts > original_end_ts:
-                raise ValueError("startDate cannot be after endDate.")
-    
-            actual_query_start: pd.Timestamp
-            actual_query_end: pd.Timestamp
-    
-            if (
-                self.DATASET_START_DATE <= original_start_ts <= self.DATASET_END_DATE
-            ):
-                actual_query_start = original_start_ts
-                actual_query_end = original_end_ts
-            else:
-                actual_query_start = self._map_dt_to_default_week(
-                    original_start_ts
-                )
-                duration = original_end_ts - original_start_ts
-                actual_query_end = actual_query_start + duration
-            
-            # This offset will be used to shift the timestamps of the fetched data
-            # back to the user's original requested timeframe.
-            # If the query was in-range, actual_query_start == original_start_ts,
-            # so timestamp_offset will be zero.
-            timestamp_offset = original_start_ts - actual_query_start
-    
-            try:
-                sensor_series = self.df.loc[
-                    actual_query_start:actual_query_end, sensorName
-                ]
-            except KeyError:
-                return [] # No data for the actual query range
-    
-            sensor_series = sensor_series.dropna()
-            data_points = []
-            for idx, val in sensor_series.items():
-                # idx is a pd.Timestamp from the DataFrame's index (from actual_query_start/end range)
-                # Apply the offset to shift this timestamp to the user's original requested scale.
-                output_timestamp_pd = idx + timestamp_offset
-                
-                data_points.append(
-                    DataPoint(
-                        timestamp=output_timestamp_pd.to_pydatetime(),
-                        value=val,
-                    )
-                )
-            return data_points
\ No newline at end of file
+            minutes, values = self.get_sensor_columns([sensorName], startDate, endDate)
+            sensor_values = values[0]
+            present = ~np.isnan(sensor_values)
+            return [
+                DataPoint(timestamp=epoch_minute_to_datetime(minute), value=value)
+                for minute, value in zip(minutes[present].tolist(), sensor_values[present].tolist())
+            ]
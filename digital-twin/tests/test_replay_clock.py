@@ -0,0 +1,92 @@
+"""
+Runs ReplayClock._run against a fake monotonic clock and checks when each
+replay minute is emitted.
+
+    cd digital-twin && python -m pytest tests
+"""
+import contextlib
+import unittest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from app.services import replay_clock
+from app.services.replay_clock import ReplayClock
+from app.services.replay_engine import to_epoch_minute
+
+START = datetime(2025, 1, 13, tzinfo=timezone.utc)
+START_MINUTE = int(to_epoch_minute(START))
+
+
+class StopLoop(Exception):
+    pass
+
+
+class FakeClock:
+    """Monotonic time that only moves when the loop sleeps."""
+
+    def __init__(self, stop_at: float, overshoot: float = 0.0):
+        self.now = 1000.0
+        self.stop_at = stop_at
+        # Extra seconds every sleep takes, like a loop that falls behind
+        self.overshoot = overshoot
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.now += seconds + self.overshoot
+        if self.now - 1000.0 > self.stop_at:
+            raise StopLoop()
+
+
+class FakeReplay:
+    """Records which minutes were read at which (fake) elapsed time."""
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.sensor_names = ["A"]
+        self.reads = []
+
+    def get_range(self, sensor_names, start, end):
+        minutes = np.arange(int(to_epoch_minute(start)), int(to_epoch_minute(end)) + 1, dtype=np.int64)
+        self.reads.append((self.clock.now - 1000.0, (minutes - START_MINUTE).tolist()))
+        return minutes, np.zeros((len(minutes), len(sensor_names)))
+
+
+def run_clock(speed: float, stop_at: float, overshoot: float = 0.0):
+    """Returns [(elapsed seconds, [replay minute offsets emitted])] of one run."""
+    clock = FakeClock(stop_at, overshoot)
+    replay = FakeReplay(clock)
+    clock_under_test = ReplayClock(SimpleNamespace(replay=replay), speed=speed, start=START)
+    with mock.patch.object(replay_clock.time, "monotonic", clock.monotonic), \
+            mock.patch.object(replay_clock.asyncio, "sleep", clock.sleep):
+        clock_under_test._started_at = clock.monotonic()
+        # The fake sleep never suspends, so one send runs the loop until StopLoop
+        with contextlib.suppress(StopLoop):
+            clock_under_test._run().send(None)
+    return replay.reads
+
+
+class ReplayClockTimingTest(unittest.TestCase):
+    def test_real_time_emits_one_minute_per_minute(self):
+        reads = run_clock(speed=1.0, stop_at=5 * 60)
+        self.assertEqual(reads, [(k * 60.0, [k]) for k in range(6)])
+
+    def test_speed_scales_the_interval(self):
+        reads = run_clock(speed=60.0, stop_at=5)
+        self.assertEqual(reads, [(float(k), [k]) for k in range(6)])
+
+    def test_late_ticks_catch_up_in_order(self):
+        # Every sleep overshoots by 1.5 replay minutes: due minutes are batched, none skipped
+        reads = run_clock(speed=1.0, stop_at=10 * 60, overshoot=90.0)
+        emitted = [minute for _, batch in reads for minute in batch]
+        self.assertEqual(emitted, list(range(len(emitted))))
+        for elapsed, batch in reads:
+            self.assertEqual(batch[-1], int(elapsed // 60))
+
+
+if __name__ == "__main__":
+    unittest.main()
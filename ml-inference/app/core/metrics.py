@@ -0,0 +1,128 @@
+"""
+Per-request timing instrumentation and Prometheus metrics.
+
+`RequestMetricsMiddleware` assigns every request a trace ID (taken from the
+incoming `X-Trace-Id` header or generated), times it, and logs one structured
+JSON line with the durations of all spans recorded while handling it. Code
+inside a request wraps expensive steps in `span(...)` and reports sizes with
+`record_count(...)`; both also feed Prometheus histograms served at /metrics.
+"""
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+
+METRICS_NAMESPACE = "factoryml_ml_inference"
+TRACE_ID_HEADER = "X-Trace-Id"
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DURATION = Histogram(
+    "request_duration_seconds", "HTTP request duration.",
+    ["method", "route", "status"], namespace=METRICS_NAMESPACE,
+)
+SPAN_DURATION = Histogram(
+    "span_duration_seconds", "Duration of instrumented steps inside requests.",
+    ["span"], namespace=METRICS_NAMESPACE,
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+COUNTS = Histogram(
+    "item_count", "Sizes of instrumented results, e.g. points returned.",
+    ["name"], namespace=METRICS_NAMESPACE,
+    buckets=(1, 10, 60, 100, 500, 1440, 5000, 10080, 50000, 100000),
+)
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_request_spans: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_spans", default=None)
+_request_counts: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_counts", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def trace_headers() -> Dict[str, str]:
+    """Headers that propagate the current trace ID to downstream services."""
+    trace_id = _trace_id.get()
+    return {TRACE_ID_HEADER: trace_id} if trace_id else {}
+
+
+@contextmanager
+def span(name: str):
+    """Times the enclosed block as `name`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        SPAN_DURATION.labels(name).observe(elapsed)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans[name] = spans.get(name, 0.0) + elapsed
+
+
+def record_count(name: str, value: int):
+    COUNTS.labels(name).observe(value)
+    counts = _request_counts.get()
+    if counts is not None:
+        counts[name] = counts.get(name, 0) + value
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware, so it adds no extra task or body buffering per request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or [])
+        trace_id = incoming.get(TRACE_ID_HEADER.lower().encode(), b"").decode() or uuid.uuid4().hex
+        trace_token = _trace_id.set(trace_id)
+        spans_token = _request_spans.set({})
+        counts_token = _request_counts.set({})
+        status_code = 500
+
+        async def send_with_trace_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (TRACE_ID_HEADER.lower().encode(), trace_id.encode())
+                ]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_DURATION.labels(scope["method"], route_path, str(status_code)).observe(elapsed)
+            if route_path != "/metrics":
+                logger.info(json.dumps({
+                    "trace_id": trace_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(elapsed * 1000.0, 3),
+                    "spans_ms": {k: round(v * 1000.0, 3) for k, v in _request_spans.get().items()},
+                    "counts": _request_counts.get(),
+                }))
+            _trace_id.reset(trace_token)
+            _request_spans.reset(spans_token)
+            _request_counts.reset(counts_token)
+
+
+async def metrics_endpoint() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,195 @@
+"""
+Read-only NumPy arrays shared by all worker processes of a service.
+
+With `uvicorn --workers N` every worker imports the app on its own, so data
+loaded at startup would exist N times. Instead, the first worker builds the
+arrays once and copies them into a POSIX shared memory segment; the others
+(and later restarts) map the same segment and wrap it in read-only arrays,
+so the data occupies physical memory only once per host.
+
+Segment layout: an 8-byte little-endian manifest length, the JSON manifest
+(array dtypes, shapes and offsets plus free-form metadata), then the array
+data, each array aligned to 64 bytes. The manifest length is written last, so
+a segment left behind by a worker that crashed while filling it reads as
+incomplete and is rebuilt.
+
+Segments are named after a key describing their source (e.g. file path, size
+and modification time), so a changed source gets a new segment; older
+segments of the same purpose are removed when a new one is published. They
+stay in /dev/shm while the service is stopped, which makes restarts fast;
+delete `/dev/shm/factoryml-*` to free them.
+
+digital-twin and ml-inference each hold an identical copy of this module;
+scripts/check_shared_copies.py fails when they drift apart.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+SEGMENT_PREFIX = "factoryml"
+SHM_DIR = "/dev/shm"
+_HEADER = struct.Struct("<Q")
+_ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    """Opens a segment without handing it to the resource tracker, which would unlink it when this process exits."""
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError: # Python < 3.13 has no `track` argument
+        segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+class SharedArrays:
+    """Named read-only arrays and JSON metadata stored in one shared memory segment."""
+
+    def __init__(self, segment: shared_memory.SharedMemory, arrays: Dict[str, np.ndarray], meta: dict, created: bool):
+        self.segment = segment
+        self.arrays = arrays
+        self.meta = meta
+        # Whether this process built the segment (False: attached to an existing one)
+        self.created = created
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.segment.size
+
+    @classmethod
+    def create(cls, name: str, arrays: Dict[str, np.ndarray], meta: dict) -> "SharedArrays":
+        """Publishes copies of `arrays` (and `meta`) under `name`; fails if it exists."""
+        layout = {}
+        offset = 0
+        for array_name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            layout[array_name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _align(offset + array.nbytes)
+        manifest = json.dumps({"arrays": layout, "meta": meta}).encode()
+        data_start = _align(_HEADER.size + len(manifest))
+
+        segment = _open_segment(name, create=True, size=max(data_start + offset, 1))
+        segment.buf[_HEADER.size:_HEADER.size + len(manifest)] = manifest
+        for array_name, array in arrays.items():
+            view = cls._view(segment, layout[array_name], data_start, writeable=True)
+            view[...] = array
+        _HEADER.pack_into(segment.buf, 0, len(manifest))
+        return cls._wrap(segment, created=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedArrays":
+        """
+        Maps an existing segment.
+
+        Raises:
+            FileNotFoundError: No complete segment with this name exists.
+        """
+        segment = _open_segment(name)
+        (manifest_length,) = _HEADER.unpack_from(segment.buf, 0)
+        if manifest_length == 0:
+            segment.close()
+            raise FileNotFoundError(f"Shared memory segment {name} is incomplete.")
+        return cls._wrap(segment, created=False)
+
+    @classmethod
+    def _wrap(cls, segment: shared_memory.SharedMemory, created: bool) -> "SharedArrays":
+        (manifest_length,) = _HEADER.unpack_from(segment.buf, 0)
+        manifest = json.loads(bytes(segment.buf[_HEADER.size:_HEADER.size + manifest_length]))
+        data_start = _align(_HEADER.size + manifest_length)
+        arrays = {
+            array_name: cls._view(segment, spec, data_start, writeable=False)
+            for array_name, spec in manifest["arrays"].items()
+        }
+        return cls(segment, arrays, manifest["meta"], created)
+
+    @staticmethod
+    def _view(segment: shared_memory.SharedMemory, spec: dict, data_start: int, writeable: bool) -> np.ndarray:
+        array = np.ndarray(
+            tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]),
+            buffer=segment.buf, offset=data_start + spec["offset"],
+        )
+        array.flags.writeable = writeable
+        return array
+
+
+def segment_name(purpose: str, key: str) -> str:
+    """Segment name for `purpose` (e.g. "twin-dataset") whose content is described by `key`."""
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    return f"{SEGMENT_PREFIX}-{purpose}-{digest}"
+
+
+def file_key(*paths: str) -> str:
+    """Describes files by path, size and modification time, so a changed file gets a new segment."""
+    parts = []
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def _remove_stale_segments(purpose: str):
+    if not os.path.isdir(SHM_DIR):
+        return
+    prefix = f"{SEGMENT_PREFIX}-{purpose}-"
+    for entry in os.listdir(SHM_DIR):
+        if entry.startswith(prefix):
+            try:
+                segment = _open_segment(entry)
+                segment.close()
+                segment.unlink()
+            except OSError:
+                pass
+
+
+def load_shared_arrays(
+    purpose: str,
+    key: str,
+    build: Callable[[], Tuple[Dict[str, np.ndarray], dict]],
+    lock_dir: Optional[str] = None,
+) -> SharedArrays:
+    """
+    Attaches to the segment for (`purpose`, `key`), building and publishing it first
+    if no process has yet. A file lock makes concurrent workers wait for the one
+    that builds, so the data is loaded once per host. Keep the result referenced
+    for as long as its arrays are used; they are views into its mapping.
+
+    Args:
+        purpose (str): Kind of data, part of the segment name.
+        key (str): Identity of the source data, e.g. from `file_key`.
+        build: Returns (arrays, JSON-serializable metadata); only called if needed.
+        lock_dir (Optional[str]): Directory for the lock file (default: the temp dir).
+
+    Returns:
+        SharedArrays: Read-only views into the segment.
+    """
+    name = segment_name(purpose, key)
+    lock_path = os.path.join(lock_dir or tempfile.gettempdir(), f"{SEGMENT_PREFIX}-{purpose}.lock")
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            try:
+                return SharedArrays.attach(name)
+            except FileNotFoundError:
+                pass
+            # Unlink segments built from older versions of the source, or left incomplete
+            # under this name; processes still mapping them keep their data
+            _remove_stale_segments(purpose)
+            arrays, meta = build()
+            return SharedArrays.create(name, arrays, meta)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,10 @@
+import math
+from datetime import datetime, timezone
+
+
+def epoch_minute(dt: datetime, exact: bool = False):
+    """Unix epoch minutes of `dt` (naive means UTC); whole minutes unless `exact`."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    minutes = dt.timestamp() / 60.0
+    return minutes if exact else math.floor(minutes)
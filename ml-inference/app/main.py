@@ -1,20 +1,57 @@
+import time
+_IMPORT_START = time.perf_counter()
+
 import os
-import pandas as pd
+import math
+import asyncio
+import logging
+from contextlib import contextmanager
 import numpy as np
-from keras import Model, models
 import joblib
-from sklearn.preprocessing import MinMaxScaler
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict
+from typing import TYPE_CHECKING, List, Dict, Tuple, Union
+
+from app.core.metrics import RequestMetricsMiddleware, metrics_endpoint, record_count, span
+from app.core.profiling import ProfilingMiddleware
+from app.core.shared_arrays import SharedArrays, file_key, load_shared_arrays
+from app.core.time_utils import epoch_minute
+from app.core.wire_format import SERIES_NPZ_MEDIA_TYPE, accepts_series_npz, encode_series_npz
+from app.services.context_buffer import SensorContextBuffers
+from app.services.context_poller import poll_context_source
+from app.services.numpy_lstm import NumpyLSTMModel
+from app.services.scaling import CompiledScalers
+from app.services.seed_artifact import SEED_ARTIFACT_FILENAME, load_seed_artifact
+
+if TYPE_CHECKING:
+    # Heavy frameworks are only imported when actually needed
+    import pandas as pd
+    from keras import Model
+
+# Request logs of the metrics and profiling middlewares go through logging
+logging.basicConfig(level=logging.INFO)
 
 # Configuration
 SEQUENCE_LENGTH = 24
 DATETIME_COLUMN = "Datetime"
 MODEL_BASE_DIR = "../model/"
 TEST_FILE_PATH = "../data/dataset.csv"
+SEED_ARTIFACT_PATH = os.path.join(MODEL_BASE_DIR, SEED_ARTIFACT_FILENAME)
+# Optional polling bridge keeping forecast context up to date, e.g.
+# http://127.0.0.1:8002/api/v1/sensor/data/api/v1/sensor/data (digital twin). Disabled when empty.
+CONTEXT_POLL_URL = os.getenv("CONTEXT_POLL_URL", "")
+CONTEXT_POLL_INTERVAL_SECONDS = float(os.getenv("CONTEXT_POLL_INTERVAL_SECONDS", "60"))
+# "numpy" runs the LSTM with the lightweight NumPy engine, "keras" uses the full Keras model
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "numpy").lower()
+# Opt-in request profiling (X-Profile: 1 header and/or a sampled fraction of requests)
+PROFILING_HEADER_ENABLED = os.getenv("PROFILING_HEADER_ENABLED", "false").lower() in ("1", "true")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+# Map each NumPy model's weights from one shared memory segment per host instead of
+# loading a copy per worker, for `uvicorn --workers N` (POSIX only, numpy backend only)
+SHARED_MEMORY_ENABLED = os.getenv("SHARED_MEMORY_ENABLED", "false").lower() in ("1", "true")
 
 AVAILABLE_SENSOR_COLUMNS = [
     'ActivePower', 'ReactivePower',
@@ -50,18 +87,65 @@ class PredictionResponse(BaseModel):
     data: List[DataPoint]
     message: str
 
+class BatchPredictionRequest(BaseModel):
+    sensorNames: List[str]
+    startDate: datetime
+    endDate: datetime
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[PredictionResponse]
+
+class ObservationBatch(BaseModel):
+    sensorName: str
+    data: List[DataPoint]
+
+class ObservationIngestResponse(BaseModel):
+    sensorName: str
+    accepted: int
+    lastKnownTimestamp: datetime
+
+class ContextStatusResponse(BaseModel):
+    lastKnownTimestamps: Dict[str, datetime]
+
 app = FastAPI(title="ML Inference API")
+if PROFILING_HEADER_ENABLED or PROFILING_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        header_enabled=PROFILING_HEADER_ENABLED,
+        sample_rate=PROFILING_SAMPLE_RATE,
+        output_dir=PROFILING_OUTPUT_DIR,
+    )
+# Trace IDs, per-request timing log lines and Prometheus histograms
+app.add_middleware(RequestMetricsMiddleware)
+app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
 
 # Global Caches and Pre-loaded Data
-loaded_models: Dict[str, Model] = {}
-loaded_scalers: Dict[str, MinMaxScaler] = {}
-df_test_full: pd.DataFrame = None
-last_known_timestamps: Dict[str, pd.Timestamp] = {}
-initial_scaled_sequences: Dict[str, list] = {}
+loaded_models: Dict[str, Union["Model", NumpyLSTMModel]] = {}
+# Shared memory segments backing the weights of loaded_models (SHARED_MEMORY_ENABLED)
+shared_model_segments: Dict[str, SharedArrays] = {}
+compiled_scalers: CompiledScalers = CompiledScalers([], [], [])
+# Newest SEQUENCE_LENGTH scaled values per sensor; seeded at startup, advanced by ingested observations
+context_buffers = SensorContextBuffers(SEQUENCE_LENGTH)
+context_poll_task: asyncio.Task = None
+
+# Seconds spent in each startup stage; model load accumulates as models are lazily loaded
+startup_profile: Dict[str, float] = {"imports": time.perf_counter() - _IMPORT_START}
+
+
+@contextmanager
+def profile_stage(stage: str):
+    """Adds the wall time of the enclosed block to `startup_profile[stage]`."""
+    stage_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_profile[stage] = startup_profile.get(stage, 0.0) + time.perf_counter() - stage_start
 
 
-def load_test_data(file_path: str, datetime_col: str) -> pd.DataFrame:
+def load_test_data(file_path: str, datetime_col: str) -> "pd.DataFrame":
     """Loads test data, parses datetime, sets index, and ensures UTC."""
+    import pandas as pd
+
     try:
         df = pd.read_csv(file_path)
         df[datetime_col] = pd.to_datetime(df[datetime_col])
@@ -80,33 +164,60 @@ def load_test_data(file_path: str, datetime_col: str) -> pd.DataFrame:
         print(f"FATAL: Error loading test data from {file_path}: {e}")
         raise
 
-@app.on_event("startup")
-async def startup_event():
-    """Load necessary data and prepare initial sequences on startup."""
-    global df_test_full, last_known_timestamps, initial_scaled_sequences
+def prepare_sequences_from_artifact(artifact_path: str):
+    """Fills scalers and initial sequences from the precomputed seed artifact."""
+    global compiled_scalers
+
+    with profile_stage("seed artifact load"):
+        seeds = load_seed_artifact(artifact_path)
+
+    sensor_names = [name for name in AVAILABLE_SENSOR_COLUMNS if name in seeds]
+    for sensor_name in AVAILABLE_SENSOR_COLUMNS:
+        if sensor_name not in seeds:
+            print(f"Warning: Sensor {sensor_name} not found in seed artifact. Skipping initial sequence preparation.")
 
-    print("Application startup: Loading test data and preparing initial sequences...")
-    df_test_full = load_test_data(TEST_FILE_PATH, DATETIME_COLUMN)
+    compiled_scalers = CompiledScalers(
+        sensor_names,
+        [seeds[name]["scale"] for name in sensor_names],
+        [seeds[name]["min"] for name in sensor_names],
+    )
+    if not sensor_names:
+        return
+    # Scale every sensor's seed in one vectorized call
+    raw_sequences = np.stack([seeds[name]["raw_sequence"] for name in sensor_names])
+    scaled_sequences = compiled_scalers.transform(sensor_names, raw_sequences)
+    for sensor_name, scaled_sequence in zip(sensor_names, scaled_sequences):
+        context_buffers.seed(sensor_name, scaled_sequence, seeds[sensor_name]["last_timestamp"])
+    print(f"Prepared initial sequences for {len(sensor_names)} sensors from {artifact_path}")
+
+
+def prepare_sequences_from_dataset():
+    """
+    Fills scalers and initial sequences from the full test CSV and joblib scalers.
+    Only the last SEQUENCE_LENGTH values per sensor are kept; the DataFrame is not.
+    """
+    global compiled_scalers
+
+    with profile_stage("data load"):
+        df_test_full = load_test_data(TEST_FILE_PATH, DATETIME_COLUMN)
     if df_test_full is None:
         # load_test_data now raises an error, so this check might be redundant
         # but good for safety.
         raise RuntimeError("Failed to load test data on startup.")
 
+    # Compile all joblib scalers into coefficient arrays once
+    with profile_stage("scaler load"):
+        compiled_scalers = CompiledScalers.from_joblib_dir(
+            MODEL_BASE_DIR,
+            [name for name in AVAILABLE_SENSOR_COLUMNS if name in df_test_full.columns],
+        )
+
     for sensor_name in AVAILABLE_SENSOR_COLUMNS:
         if sensor_name not in df_test_full.columns:
             print(f"Warning: Sensor {sensor_name} not found in test data. Skipping initial sequence preparation.")
             continue
-
-        # Load scaler for this sensor
-        scaler_path = os.path.join(MODEL_BASE_DIR, f"{sensor_name}_scaler.joblib")
-        if not os.path.exists(scaler_path):
-            print(f"Warning: Scaler for {sensor_name} not found at {scaler_path}. Cannot prepare initial sequence.")
-            continue
-        try:
-            scaler = joblib.load(scaler_path)
-            loaded_scalers[sensor_name] = scaler # Cache scaler
-        except Exception as e:
-            print(f"Warning: Failed to load scaler for {sensor_name}: {e}")
+        if sensor_name not in compiled_scalers:
+            print(f"Warning: No scaler for {sensor_name}. Cannot prepare initial sequence.")
             continue
 
         # Get the last SEQUENCE_LENGTH raw values from the test set
@@ -116,18 +227,45 @@ async def startup_event():
             continue
 
         last_known_raw_sequence = sensor_series.iloc[-SEQUENCE_LENGTH:].values
-        # Scale these values using the loaded scaler
-        scaled_sequence = scaler.transform(last_known_raw_sequence.reshape(-1, 1)).flatten().tolist()
+        # Scale these values using the compiled coefficients
+        scaled_sequence = compiled_scalers.transform(sensor_name, last_known_raw_sequence)
         
-        initial_scaled_sequences[sensor_name] = scaled_sequence
-        last_known_timestamps[sensor_name] = sensor_series.index[-1] # This is UTC
-        print(f"Prepared initial sequence for {sensor_name}. Last known timestamp: {last_known_timestamps[sensor_name]}")
+        context_buffers.seed(sensor_name, scaled_sequence, sensor_series.index[-1].to_pydatetime())
+        print(f"Prepared initial sequence for {sensor_name}. Last known timestamp: {context_buffers.last_timestamp(sensor_name)}")
+
 
-    print("Startup complete.")
+@app.on_event("startup")
+async def startup_event():
+    """Load necessary data and prepare initial sequences on startup."""
+    global context_poll_task
+
+    if SHARED_MEMORY_ENABLED and INFERENCE_BACKEND == "keras":
+        print("SHARED_MEMORY_ENABLED only applies to the numpy backend; every worker loads its own Keras models.")
+    print("Application startup: Preparing initial sequences...")
+    if os.path.exists(SEED_ARTIFACT_PATH):
+        prepare_sequences_from_artifact(SEED_ARTIFACT_PATH)
+    else:
+        print(f"Seed artifact {SEED_ARTIFACT_PATH} not found, falling back to {TEST_FILE_PATH}. "
+              f"Run `python -m app.services.seed_artifact` to create it.")
+        prepare_sequences_from_dataset()
+
+    print("Startup complete. Startup profile (seconds): " +
+          ", ".join(f"{stage}={seconds:.3f}" for stage, seconds in startup_profile.items()))
+
+    if CONTEXT_POLL_URL:
+        context_poll_task = asyncio.create_task(poll_context_source(
+            context_buffers, compiled_scalers, CONTEXT_POLL_URL, CONTEXT_POLL_INTERVAL_SECONDS
+        ))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if context_poll_task is not None:
+        context_poll_task.cancel()
 
 
 def get_model_and_scaler(sensor_name: str):
-    """Lazily loads model and retrieves scaler for a given sensor."""
+    """Lazily loads the model for a given sensor and returns it with the compiled scalers."""
     if sensor_name not in AVAILABLE_SENSOR_COLUMNS:
         raise HTTPException(status_code=404, detail=f"Sensor '{sensor_name}' is not supported or model data is unavailable.")
 
@@ -137,40 +275,117 @@ def get_model_and_scaler(sensor_name: str):
         if not os.path.exists(model_path):
             raise HTTPException(status_code=500, detail=f"Model file for sensor '{sensor_name}' not found.")
         try:
-            loaded_models[sensor_name] = models.load_model(model_path)
-            print(f"Loaded Keras model for {sensor_name}")
+            with profile_stage("model load"), span("model_load"):
+                if INFERENCE_BACKEND == "keras":
+                    from keras import models
+
+                    loaded_models[sensor_name] = models.load_model(model_path)
+                    print(f"Loaded Keras model for {sensor_name}")
+                elif SHARED_MEMORY_ENABLED:
+                    segment = load_shared_arrays(
+                        f"model-{sensor_name}",
+                        file_key(model_path),
+                        lambda: NumpyLSTMModel.shared_arrays_from_keras_file(model_path),
+                    )
+                    shared_model_segments[sensor_name] = segment
+                    loaded_models[sensor_name] = NumpyLSTMModel.from_shared_arrays(segment.arrays, segment.meta)
+                    print(f"{'Loaded' if segment.created else 'Attached'} shared NumPy LSTM model for "
+                          f"{sensor_name} ({segment.name})")
+                else:
+                    loaded_models[sensor_name] = NumpyLSTMModel.from_keras_file(model_path)
+                    print(f"Loaded NumPy LSTM model for {sensor_name}")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error loading model for '{sensor_name}': {str(e)}")
 
-    # Retrieve scaler (should be cached during startup)
-    if sensor_name not in loaded_scalers:
+    # Retrieve scaler (should be compiled during startup)
+    if sensor_name not in compiled_scalers:
         # This case should ideally be handled by startup, but as a fallback:
         scaler_path = os.path.join(MODEL_BASE_DIR, f"{sensor_name}_scaler.joblib")
         if not os.path.exists(scaler_path):
              raise HTTPException(status_code=500, detail=f"Scaler for sensor '{sensor_name}' not found (should have been loaded on startup).")
         try:
-            loaded_scalers[sensor_name] = joblib.load(scaler_path)
+            with profile_stage("scaler load"):
+                compiled_scalers.add(sensor_name, joblib.load(scaler_path))
             print(f"Loaded scaler for {sensor_name} on demand.")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error loading scaler for '{sensor_name}': {str(e)}")
 
 
-    return loaded_models[sensor_name], loaded_scalers[sensor_name]
+    return loaded_models[sensor_name], compiled_scalers
 
 
-@app.get("/api/v1/sensor/predict", response_model=PredictionResponse)
-async def predict_sensor_values(
-    sensorName: str = Query(..., example="ActivePower"),
-    startDate: datetime = Query(..., example="2025-02-17T01:00:00Z"),
-    endDate: datetime = Query(..., example="2025-02-17T02:00:00Z"),
-):
-    
-    sensor_name = sensorName
+def model_output_size(model) -> int:
+    """Minutes predicted per forward pass: 1 for one-step models, K for direct multi-step heads."""
+    if isinstance(model, NumpyLSTMModel):
+        return model.output_size
+    return int(model.output_shape[-1])
+
+
+def rollout_scaled_predictions(model, scaled_sequence: np.ndarray, steps: int) -> np.ndarray:
+    """Predicts `steps` scaled values following `scaled_sequence`, one minute per value."""
+    seed = np.array(scaled_sequence[-SEQUENCE_LENGTH:], dtype=np.float32)
+    if isinstance(model, NumpyLSTMModel):
+        return model.rollout(seed, steps)
+
+    # Keras fallback: re-feed the last SEQUENCE_LENGTH values, one pass per chunk of output_size minutes
+    window = list(seed)
+    while len(window) - SEQUENCE_LENGTH < steps:
+        input_for_model = np.reshape(np.array(window[-SEQUENCE_LENGTH:]), (1, SEQUENCE_LENGTH, 1))
+        window.extend(model.predict(input_for_model, verbose=0)[0])
+    return np.array(window[SEQUENCE_LENGTH:SEQUENCE_LENGTH + steps], dtype=np.float32)
+
+
+@app.get("/api/v1/startup-profile")
+async def get_startup_profile():
+    """Returns seconds spent in imports, data/artifact load, scaler load and model load."""
+    return startup_profile
+
+
+@app.post("/api/v1/sensor/observations", response_model=ObservationIngestResponse)
+async def ingest_observations(batch: ObservationBatch):
+    """
+    Appends the newest real observations of a sensor to its forecast context,
+    so following forecasts start from the latest real data.
+    """
+    sensor_name = batch.sensorName
+    if sensor_name not in context_buffers or sensor_name not in compiled_scalers:
+        raise HTTPException(status_code=404, detail=f"Sensor '{sensor_name}' has no forecast context.")
+
+    accepted = 0
+    if batch.data:
+        scaled_values = compiled_scalers.transform(sensor_name, [dp.value for dp in batch.data])
+        accepted = context_buffers.append(sensor_name, [dp.timestamp for dp in batch.data], scaled_values)
+
+    return ObservationIngestResponse(
+        sensorName=sensor_name,
+        accepted=accepted,
+        lastKnownTimestamp=context_buffers.last_timestamp(sensor_name),
+    )
+
+
+@app.get("/api/v1/sensor/context", response_model=ContextStatusResponse)
+async def get_context_status():
+    """
+    Returns the timestamp of the newest observation in every sensor's forecast
+    context. Without observations or CONTEXT_POLL_URL it stays at the end of the
+    seed data, and forecasts roll forward from there.
+    """
+    return ContextStatusResponse(lastKnownTimestamps=context_buffers.last_timestamps())
+
+
+def forecast_sensor_values(sensor_name: str, startDate: datetime, endDate: datetime) -> Tuple[datetime, np.ndarray]:
+    """
+    Rolls the sensor's model forward and returns the predictions inside [startDate, endDate].
+    Minutes up to the sensor's newest known observation are not predicted and left out.
 
+    Returns:
+        Tuple[datetime, np.ndarray]: Timestamp of the first prediction and one
+        prediction per minute from there on, in the sensor's original scale.
+    """
     # Validate sensor name
     if sensor_name not in AVAILABLE_SENSOR_COLUMNS:
         raise HTTPException(status_code=400, detail=f"Sensor '{sensor_name}' is not supported.")
-    if sensor_name not in initial_scaled_sequences or sensor_name not in last_known_timestamps:
+    if sensor_name not in context_buffers:
         raise HTTPException(status_code=503, detail=f"Initial data for sensor '{sensor_name}' not available. Check server logs.")
 
     # Ensure dates are UTC
@@ -180,79 +395,130 @@ async def predict_sensor_values(
     if start_date_utc >= end_date_utc:
         raise HTTPException(status_code=400, detail="Start date must be before end date.")
 
-    model, scaler = get_model_and_scaler(sensor_name)
+    model, scalers = get_model_and_scaler(sensor_name)
     
-    # Get the pre-calculated initial sequence and last known timestamp for this sensor
-    current_scaled_sequence = list(initial_scaled_sequences[sensor_name]) # Make a copy
-    current_timestamp = last_known_timestamps[sensor_name]
+    # Get the newest known sequence and its last timestamp for this sensor
+    current_scaled_sequence, current_timestamp = context_buffers.get(sensor_name)
 
-    # Predictions should start after the last known data point
+    # Predictions start after the last known data point; the earlier part of the range is left out
     min_prediction_start_time = current_timestamp + timedelta(minutes=1)
-    if start_date_utc < min_prediction_start_time:
+    if end_date_utc < min_prediction_start_time:
         raise HTTPException(
             status_code=400,
-            detail=f"Prediction start date ({start_date_utc.isoformat()}) "
+            detail=f"Prediction end date ({end_date_utc.isoformat()}) "
                    f"cannot be before the earliest possible prediction time "
                    f"({min_prediction_start_time.isoformat()})."
         )
 
-    predictions_output: List[DataPoint] = []
-    
     print(f"Starting prediction for {sensor_name} from {current_timestamp.isoformat()} up to {end_date_utc.isoformat()}")
     print(f"Client requested range: {start_date_utc.isoformat()} to {end_date_utc.isoformat()}")
-
-    # Iteratively predict minute by minute
-    # The loop continues as long as current_timestamp (timestamp of the *last* value in sequence)
-    # is less than the target endDate. The prediction will be for current_timestamp + 1 min.
-    while current_timestamp < end_date_utc:
-        if len(current_scaled_sequence) < SEQUENCE_LENGTH:
-            # This should not happen if initial_scaled_sequences is set up correctly
-            raise HTTPException(status_code=500, detail="Internal error: Insufficient data in sequence.")
-
-        # Prepare input for model (last SEQUENCE_LENGTH points)
-        input_for_model = np.reshape(
-            np.array(current_scaled_sequence[-SEQUENCE_LENGTH:]), (1, SEQUENCE_LENGTH, 1)
-        )
-        
-        # Predict scaled value for the next minute
-        scaled_pred = model.predict(input_for_model, verbose=0)[0, 0]
-        #print(f"Predicted scaled value: {scaled_pred} for timestamp: {current_timestamp.isoformat()}")
-        # Update current_timestamp for this new prediction
-        current_timestamp += timedelta(minutes=1)
-        
-        # Inverse transform to original scale
-        original_pred = scaler.inverse_transform(np.array([[scaled_pred]]))[0, 0]
-        
-        # Add to output list if it falls within the user's requested date range
-        if current_timestamp >= start_date_utc and current_timestamp <= end_date_utc:
-            predictions_output.append(
-                DataPoint(timestamp=current_timestamp, value=float(original_pred))
-            )
-            
-        # Update the sequence for the next iteration by appending the new scaled prediction
-        current_scaled_sequence.append(scaled_pred)
-        # No need to explicitly truncate current_scaled_sequence, as slicing [-SEQUENCE_LENGTH:] handles it.
-
-        # Safety break for extremely long requests (optional, adjust as needed)
-        # if len(predictions_output) > 7 * 24 * 60 * 2 : # Max 2 weeks of minute-by-minute data
-        #      print("Warning: Prediction limit reached for a single request.")
-        #      break
-    
-    if not predictions_output and start_date_utc <= end_date_utc :
+    start_date_utc = max(start_date_utc, min_prediction_start_time)
+
+    if len(current_scaled_sequence) < SEQUENCE_LENGTH:
+        # This should not happen if context_buffers is seeded correctly
+        raise HTTPException(status_code=500, detail="Internal error: Insufficient data in sequence.")
+
+    # One prediction per minute after the last known value, until endDate is reached
+    one_minute = timedelta(minutes=1)
+    steps = math.ceil((end_date_utc - current_timestamp) / one_minute)
+    with span("rollout"):
+        scaled_preds = rollout_scaled_predictions(model, current_scaled_sequence, steps)
+    record_count("rollout_steps", steps)
+    record_count("rollout_passes", math.ceil(steps / model_output_size(model)))
+
+    # Inverse transform the whole rollout to original scale in one affine op
+    original_preds = scalers.inverse_transform(sensor_name, scaled_preds)
+
+    # Step k is predicted for current_timestamp + k minutes; keep the steps inside the requested range
+    first_step = math.ceil((start_date_utc - current_timestamp) / one_minute)
+    last_step = math.floor((end_date_utc - current_timestamp) / one_minute)
+    values = np.asarray(original_preds[first_step - 1:last_step], dtype=np.float64)
+    record_count("points_returned", len(values))
+    return current_timestamp + first_step * one_minute, values
+
+
+def forecast_sensor(sensor_name: str, startDate: datetime, endDate: datetime) -> PredictionResponse:
+    """Rolls the sensor's model forward and returns the predictions inside [startDate, endDate]."""
+    first_timestamp, values = forecast_sensor_values(sensor_name, startDate, endDate)
+    predictions_output: List[DataPoint] = [
+        DataPoint(timestamp=first_timestamp + timedelta(minutes=i), value=value)
+        for i, value in enumerate(values.tolist())
+    ]
+
+    if not predictions_output:
         # This might happen if the requested range is valid but very short and falls
-        # between prediction steps, or if end_date_utc was just after current_timestamp
+        # between prediction steps, or if endDate was just after the last known timestamp
         # before the loop could make a relevant prediction.
         message = "No prediction data generated for the specified range. The range might be too short or outside effective prediction generation."
     else:
         message = "Prediction successful"
 
-
     return PredictionResponse(
         sensorName=sensor_name,
         data=predictions_output,
         message=message
     )
 
+
+@app.get(
+    "/api/v1/sensor/predict",
+    response_model=PredictionResponse,
+    responses={200: {"content": {SERIES_NPZ_MEDIA_TYPE: {}}}},
+)
+async def predict_sensor_values(
+    request: Request,
+    sensorName: str = Query(..., example="ActivePower"),
+    startDate: datetime = Query(..., example="2025-02-17T01:00:00Z"),
+    endDate: datetime = Query(..., example="2025-02-17T02:00:00Z"),
+):
+    """Send `Accept: application/x-npz` for the binary encoding described in `app.core.wire_format`."""
+    if accepts_series_npz(request.headers.get("accept")):
+        first_timestamp, values = forecast_sensor_values(sensorName, startDate, endDate)
+        return Response(
+            content=encode_series_npz([sensorName], epoch_minute(first_timestamp), 1, values[np.newaxis, :]),
+            media_type=SERIES_NPZ_MEDIA_TYPE,
+        )
+    return forecast_sensor(sensorName, startDate, endDate)
+
+
+@app.post(
+    "/api/v1/sensor/predict/batch",
+    response_model=BatchPredictionResponse,
+    responses={200: {"content": {SERIES_NPZ_MEDIA_TYPE: {}}}},
+)
+async def predict_sensor_values_batch(request: BatchPredictionRequest, http_request: Request):
+    """
+    Forecasts several sensors over the same range in one call. A failing sensor
+    does not fail the batch; its entry has no data and the error as message.
+
+    With `Accept: application/x-npz` all sensors share one minute grid starting
+    at the first whole minute at or after startDate, and failed sensors are NaN rows.
+    """
+    if accepts_series_npz(http_request.headers.get("accept")):
+        first_minute = math.ceil(epoch_minute(request.startDate, exact=True))
+        last_minute = math.floor(epoch_minute(request.endDate, exact=True))
+        values = np.full((len(request.sensorNames), max(last_minute - first_minute + 1, 0)), np.nan)
+        for row, sensor_name in enumerate(request.sensorNames):
+            try:
+                first_timestamp, sensor_values = forecast_sensor_values(sensor_name, request.startDate, request.endDate)
+            except HTTPException as e:
+                print(f"Batch prediction for {sensor_name} failed: {e.detail}")
+                continue
+            offset = epoch_minute(first_timestamp) - first_minute
+            values[row, offset:offset + len(sensor_values)] = sensor_values
+        return Response(
+            content=encode_series_npz(request.sensorNames, first_minute, 1, values),
+            media_type=SERIES_NPZ_MEDIA_TYPE,
+        )
+
+    predictions = []
+    for sensor_name in request.sensorNames:
+        try:
+            predictions.append(forecast_sensor(sensor_name, request.startDate, request.endDate))
+        except HTTPException as e:
+            predictions.append(PredictionResponse(sensorName=sensor_name, data=[], message=str(e.detail)))
+    return BatchPredictionResponse(predictions=predictions)
+
 if __name__ == "__main__":
     import uvicorn
     print("Starting Uvicorn server...")
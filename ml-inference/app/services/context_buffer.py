@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+
+def _to_utc_minute(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    else:
+        dt = dt.astimezone(timezone.utc)
+    return dt.replace(second=0, microsecond=0)
+
+
+class SensorContextBuffers:
+    """
+    Per-sensor rolling window of the newest SEQUENCE_LENGTH scaled observations
+    and the timestamp of the last one. Forecasts start from this window, so the
+    rollout length only depends on how far past the newest real observation the
+    requested range ends.
+    """
+
+    def __init__(self, sequence_length: int):
+        self.sequence_length = sequence_length
+        self._windows: Dict[str, np.ndarray] = {}
+        self._last_timestamps: Dict[str, datetime] = {}
+
+    def __contains__(self, sensor_name: str) -> bool:
+        return sensor_name in self._windows
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def seed(self, sensor_name: str, scaled_window: Iterable[float], last_timestamp: datetime) -> None:
+        """Replaces the window of a sensor, e.g. from the startup seed."""
+        window = np.asarray(list(scaled_window), dtype=np.float32)
+        if len(window) < self.sequence_length:
+            raise ValueError(
+                f"Seed for {sensor_name} needs {self.sequence_length} values, got {len(window)}."
+            )
+        self._windows[sensor_name] = window[-self.sequence_length:].copy()
+        self._last_timestamps[sensor_name] = _to_utc_minute(last_timestamp)
+
+    def get(self, sensor_name: str) -> Tuple[np.ndarray, datetime]:
+        """Returns a copy of the scaled window and the timestamp of its last value."""
+        return self._windows[sensor_name].copy(), self._last_timestamps[sensor_name]
+
+    def last_timestamp(self, sensor_name: str) -> datetime:
+        return self._last_timestamps[sensor_name]
+
+    def last_timestamps(self) -> Dict[str, datetime]:
+        """Returns the timestamp of the newest observation of every sensor."""
+        return dict(self._last_timestamps)
+
+    def append(self, sensor_name: str, timestamps: Iterable[datetime], scaled_values: Iterable[float]) -> int:
+        """
+        Appends newer observations to a sensor's window.
+
+        Points at or before the current last timestamp are ignored. Missing
+        minutes between observations are forward-filled with the previous value
+        so the window stays on the 1-minute grid the models were trained on.
+
+        Returns:
+            int: Number of observations accepted.
+        """
+        window = self._windows[sensor_name]
+        last_ts = self._last_timestamps[sensor_name]
+        one_minute = timedelta(minutes=1)
+
+        new_values = []
+        accepted = 0
+        previous_value = float(window[-1])
+        for ts, value in sorted(zip((_to_utc_minute(t) for t in timestamps), scaled_values)):
+            if ts <= last_ts:
+                continue
+            gap_minutes = int((ts - last_ts) / one_minute)
+            # Only the last sequence_length values matter, so never fill more than that
+            new_values.extend([previous_value] * min(gap_minutes - 1, self.sequence_length))
+            new_values.append(float(value))
+            previous_value = float(value)
+            last_ts = ts
+            accepted += 1
+
+        if accepted:
+            combined = np.concatenate([window, np.asarray(new_values, dtype=np.float32)])
+            self._windows[sensor_name] = combined[-self.sequence_length:]
+            self._last_timestamps[sensor_name] = last_ts
+        return accepted
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+from app.services.context_buffer import SensorContextBuffers
+from app.services.scaling import CompiledScalers
+
+
+def _format_datetime(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _fetch_observations(
+    url: str, sensor_name: str, start: datetime, end: datetime, timeout: float
+) -> Tuple[List[datetime], List[float]]:
+    query = urllib.parse.urlencode({
+        "sensorName": sensor_name,
+        "startDate": _format_datetime(start),
+        "endDate": _format_datetime(end),
+    })
+    with urllib.request.urlopen(f"{url}?{query}", timeout=timeout) as response:
+        payload = json.loads(response.read())
+    timestamps, values = [], []
+    for point in payload.get("data", []):
+        if point.get("value") is None:
+            continue
+        timestamps.append(datetime.fromisoformat(point["timestamp"].replace("Z", "+00:00")))
+        values.append(float(point["value"]))
+    return timestamps, values
+
+
+async def poll_context_source(
+    buffers: SensorContextBuffers,
+    scalers: CompiledScalers,
+    url: str,
+    interval_seconds: float,
+    timeout: float = 30.0,
+):
+    """
+    Keeps the context buffers fed with the newest real observations by polling
+    a sensor data API with the digital twin's query interface
+    (`sensorName`, `startDate`, `endDate` -> `{"data": [{"timestamp", "value"}]}`).
+
+    Only the minutes after each sensor's last known timestamp are requested, and
+    never more than the last SEQUENCE_LENGTH minutes, since older values would
+    fall out of the window anyway.
+    """
+    print(f"Context poller started: {url} every {interval_seconds}s")
+    while True:
+        now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        earliest_needed = now - timedelta(minutes=buffers.sequence_length - 1)
+        for sensor_name in scalers.sensor_names:
+            if sensor_name not in buffers:
+                continue
+            start = max(buffers.last_timestamp(sensor_name) + timedelta(minutes=1), earliest_needed)
+            if start >= now:
+                continue
+            try:
+                timestamps, values = await asyncio.to_thread(
+                    _fetch_observations, url, sensor_name, start, now, timeout
+                )
+            except Exception as e:
+                print(f"Context poller: failed to fetch {sensor_name}: {e}")
+                continue
+            if timestamps:
+                buffers.append(sensor_name, timestamps, scalers.transform(sensor_name, values))
+        await asyncio.sleep(interval_seconds)
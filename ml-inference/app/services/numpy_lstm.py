@@ -0,0 +1,247 @@
+import json
+import zipfile
+from typing import Dict, List, Optional, Tuple
+
+import h5py
+import numpy as np
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0.0)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _hard_sigmoid(x: np.ndarray) -> np.ndarray:
+    return np.clip(x / 6.0 + 0.5, 0.0, 1.0)
+
+
+def _linear(x: np.ndarray) -> np.ndarray:
+    return x
+
+
+ACTIVATIONS = {
+    "relu": _relu,
+    "sigmoid": _sigmoid,
+    "hard_sigmoid": _hard_sigmoid,
+    "tanh": np.tanh,
+    "linear": _linear,
+    None: _linear,
+}
+
+
+def _get_activation(name: Optional[str]):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation '{name}' in Keras model.")
+    return ACTIVATIONS[name]
+
+
+class LSTMLayer:
+    """Keras LSTM layer (gate order i, f, c, o) evaluated with NumPy."""
+
+    def __init__(self, config: Dict, weights: List[np.ndarray]):
+        self.units = int(config["units"])
+        self.activation = _get_activation(config.get("activation", "tanh"))
+        self.recurrent_activation = _get_activation(
+            config.get("recurrent_activation", "sigmoid")
+        )
+        self.return_sequences = bool(config.get("return_sequences", False))
+        self.kernel = np.asarray(weights[0], dtype=np.float32)
+        self.recurrent_kernel = np.asarray(weights[1], dtype=np.float32)
+        if len(weights) > 2:
+            self.bias = np.asarray(weights[2], dtype=np.float32)
+        else:
+            self.bias = np.zeros(4 * self.units, dtype=np.float32)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        """x: (batch, timesteps, features) -> (batch, units) or (batch, timesteps, units)."""
+        batch, timesteps, _ = x.shape
+        units = self.units
+        # Input projection for every timestep in one matmul; only the
+        # recurrent part has to be evaluated step by step.
+        x_proj = x @ self.kernel + self.bias
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((batch, timesteps, units), dtype=np.float32) if self.return_sequences else None
+        for t in range(timesteps):
+            z = x_proj[:, t, :] + h @ self.recurrent_kernel
+            i = self.recurrent_activation(z[:, :units])
+            f = self.recurrent_activation(z[:, units:2 * units])
+            g = self.activation(z[:, 2 * units:3 * units])
+            o = self.recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * self.activation(c)
+            if outputs is not None:
+                outputs[:, t, :] = h
+        return outputs if outputs is not None else h
+
+
+class DenseLayer:
+    """Keras Dense layer evaluated with NumPy."""
+
+    def __init__(self, config: Dict, weights: List[np.ndarray]):
+        self.activation = _get_activation(config.get("activation", "linear"))
+        self.kernel = np.asarray(weights[0], dtype=np.float32)
+        if len(weights) > 1:
+            self.bias = np.asarray(weights[1], dtype=np.float32)
+        else:
+            self.bias = np.zeros(self.kernel.shape[1], dtype=np.float32)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        return self.activation(x @ self.kernel + self.bias)
+
+
+LAYER_TYPES = {
+    "LSTM": LSTMLayer,
+    "Dense": DenseLayer,
+}
+
+
+def _sorted_datasets(group: h5py.Group) -> List[np.ndarray]:
+    """Returns every dataset below `group`, ordered the way Keras saved them (vars/0, vars/1, ...)."""
+    found = []
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset):
+            # Zero-pad path parts so "vars/10" sorts after "vars/9".
+            key = tuple(part.zfill(8) for part in name.split("/"))
+            found.append((key, obj[()]))
+
+    group.visititems(visit)
+    found.sort(key=lambda item: item[0])
+    return [value for _, value in found]
+
+
+# (Keras class name, layer config, weights in saved order) of one supported layer
+LayerSpec = Tuple[str, Dict, List[np.ndarray]]
+
+
+def read_layer_specs(model_path: str) -> List[LayerSpec]:
+    """Reads the supported layers of a Keras 3 `.keras` archive (config.json + model.weights.h5)."""
+    with zipfile.ZipFile(model_path) as archive:
+        config = json.loads(archive.read("config.json"))
+        with archive.open("model.weights.h5") as weights_file:
+            with h5py.File(weights_file, "r") as h5:
+                return _layer_specs(config, h5)
+
+
+def _layer_specs(config: Dict, h5: h5py.File) -> List[LayerSpec]:
+    if config.get("class_name") != "Sequential":
+        raise ValueError(f"Only Sequential models are supported, got '{config.get('class_name')}'.")
+
+    specs = []
+    for layer_config in config["config"]["layers"]:
+        class_name = layer_config["class_name"]
+        if class_name == "InputLayer":
+            continue
+        if class_name not in LAYER_TYPES:
+            raise ValueError(f"Unsupported layer type '{class_name}' in Keras model.")
+        name = layer_config["config"]["name"]
+        group_path = f"layers/{name}"
+        if group_path not in h5:
+            raise ValueError(f"Weights for layer '{name}' not found in model archive.")
+        specs.append((class_name, layer_config["config"], _sorted_datasets(h5[group_path])))
+    return specs
+
+
+class NumpyLSTMModel:
+    """
+    Lightweight inference engine for the Sequential LSTM/Dense models written by
+    ml/train_models.py. Weights are read straight from the `.keras` archive, so
+    TensorFlow is never imported.
+    """
+
+    def __init__(self, layers: List):
+        if not layers:
+            raise ValueError("Model has no supported layers.")
+        self.layers = layers
+
+    @classmethod
+    def from_keras_file(cls, model_path: str) -> "NumpyLSTMModel":
+        """Loads a Keras 3 `.keras` archive (config.json + model.weights.h5)."""
+        return cls.from_layer_specs(read_layer_specs(model_path))
+
+    @classmethod
+    def from_layer_specs(cls, specs: List[LayerSpec]) -> "NumpyLSTMModel":
+        return cls([LAYER_TYPES[class_name](config, weights) for class_name, config, weights in specs])
+
+    @staticmethod
+    def shared_arrays_from_keras_file(model_path: str) -> Tuple[Dict[str, np.ndarray], dict]:
+        """Reads a `.keras` archive as (float32 weight arrays, layer metadata) for `app.core.shared_arrays`."""
+        arrays: Dict[str, np.ndarray] = {}
+        layers = []
+        for index, (class_name, config, weights) in enumerate(read_layer_specs(model_path)):
+            names = [f"{index}/{w}" for w in range(len(weights))]
+            arrays.update({name: np.asarray(weight, dtype=np.float32) for name, weight in zip(names, weights)})
+            layers.append({"class_name": class_name, "config": config, "weights": names})
+        return arrays, {"layers": layers}
+
+    @classmethod
+    def from_shared_arrays(cls, arrays: Dict[str, np.ndarray], meta: dict) -> "NumpyLSTMModel":
+        """Builds the model around float32 arrays from `shared_arrays_from_keras_file` without copying them."""
+        return cls.from_layer_specs([
+            (layer["class_name"], layer["config"], [arrays[name] for name in layer["weights"]])
+            for layer in meta["layers"]
+        ])
+
+    @property
+    def output_size(self) -> int:
+        return self.layers[-1].kernel.shape[1]
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        """
+        Runs a forward pass for a batch of scaled windows.
+
+        Args:
+            x (np.ndarray): Shape (batch, timesteps) or (batch, timesteps, 1).
+
+        Returns:
+            np.ndarray: Shape (batch, output_size).
+        """
+        out = np.asarray(x, dtype=np.float32)
+        if out.ndim == 2:
+            out = out[:, :, np.newaxis]
+        for layer in self.layers:
+            out = layer(out)
+        return out
+
+    def rollout(self, window: np.ndarray, steps: int) -> np.ndarray:
+        """
+        Autoregressively forecasts `steps` values after each window in the batch.
+
+        The trained models start every window from a zero hidden/cell state, so
+        carrying state across steps would not reproduce them. Each step instead
+        re-evaluates the sliding window for the whole batch with vectorized
+        matmuls, which is what makes this cheap compared to `model.predict`.
+        Models with a direct multi-step head (`output_size` K > 1) append K
+        values per forward pass, so only ceil(steps / K) passes are needed.
+
+        Args:
+            window (np.ndarray): Scaled seed values, shape (batch, timesteps) or (timesteps,).
+            steps (int): Number of future values to produce.
+
+        Returns:
+            np.ndarray: Scaled predictions with shape (batch, steps), or (steps,)
+            for a 1-D seed.
+        """
+        window = np.asarray(window, dtype=np.float32)
+        squeeze = window.ndim == 1
+        if squeeze:
+            window = window[np.newaxis, :]
+        batch, seq_length = window.shape
+        output_size = self.output_size
+
+        # Sliding buffer: seed followed by room for all predictions.
+        buffer = np.empty((batch, seq_length + steps + output_size), dtype=np.float32)
+        buffer[:, :seq_length] = window
+        produced = 0
+        while produced < steps:
+            current = buffer[:, produced:produced + seq_length]
+            preds = self.predict(current)
+            buffer[:, seq_length + produced:seq_length + produced + output_size] = preds
+            produced += output_size
+
+        predictions = buffer[:, seq_length:seq_length + steps]
+        return predictions[0] if squeeze else predictions
@@ -0,0 +1,94 @@
+import os
+from typing import Dict, Iterable, List, Sequence
+
+import joblib
+import numpy as np
+
+
+class CompiledScalers:
+    """
+    Per-sensor sklearn MinMaxScalers compiled into plain `scale_`/`min_`
+    coefficient arrays. Scaling is `x * scale_ + min_` and inverse scaling is
+    `(x - min_) / scale_`, for one sensor or a batch of sensors at once,
+    without sklearn's per-call input validation.
+
+    The `model/*_scaler.joblib` files stay the source of truth; they are only
+    unpickled once, when compiling.
+    """
+
+    def __init__(self, sensor_names: Sequence[str], scale: Sequence[float], min_: Sequence[float]):
+        if not (len(sensor_names) == len(scale) == len(min_)):
+            raise ValueError("sensor_names, scale and min_ must have the same length.")
+        self.sensor_index: Dict[str, int] = {name: i for i, name in enumerate(sensor_names)}
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+        self.min_ = np.asarray(min_, dtype=np.float64)
+
+    @classmethod
+    def from_sklearn(cls, scalers: Dict[str, object]) -> "CompiledScalers":
+        """Compiles a mapping of sensor name -> fitted single-feature MinMaxScaler."""
+        names = list(scalers)
+        return cls(
+            names,
+            [float(scalers[name].scale_[0]) for name in names],
+            [float(scalers[name].min_[0]) for name in names],
+        )
+
+    @classmethod
+    def from_joblib_dir(cls, model_dir: str, sensor_names: Iterable[str]) -> "CompiledScalers":
+        """Loads `{sensor}_scaler.joblib` for every sensor that has one and compiles them."""
+        scalers = {}
+        for sensor_name in sensor_names:
+            scaler_path = os.path.join(model_dir, f"{sensor_name}_scaler.joblib")
+            if not os.path.exists(scaler_path):
+                print(f"Warning: Scaler for {sensor_name} not found at {scaler_path}.")
+                continue
+            try:
+                scalers[sensor_name] = joblib.load(scaler_path)
+            except Exception as e:
+                print(f"Warning: Failed to load scaler for {sensor_name}: {e}")
+        return cls.from_sklearn(scalers)
+
+    def __contains__(self, sensor_name: str) -> bool:
+        return sensor_name in self.sensor_index
+
+    def __len__(self) -> int:
+        return len(self.sensor_index)
+
+    @property
+    def sensor_names(self) -> List[str]:
+        return list(self.sensor_index)
+
+    def add(self, sensor_name: str, scaler) -> None:
+        """Adds or replaces the coefficients of one sensor from a fitted MinMaxScaler."""
+        if sensor_name in self.sensor_index:
+            i = self.sensor_index[sensor_name]
+            self.scale_[i] = float(scaler.scale_[0])
+            self.min_[i] = float(scaler.min_[0])
+            return
+        self.sensor_index[sensor_name] = len(self.sensor_index)
+        self.scale_ = np.append(self.scale_, float(scaler.scale_[0]))
+        self.min_ = np.append(self.min_, float(scaler.min_[0]))
+
+    def _coefficients(self, sensor_names):
+        """Returns (scale, min) for one sensor name, or column vectors for a list of names."""
+        if isinstance(sensor_names, str):
+            i = self.sensor_index[sensor_names]
+            return self.scale_[i], self.min_[i]
+        idx = np.fromiter((self.sensor_index[name] for name in sensor_names), dtype=np.intp)
+        return self.scale_[idx, np.newaxis], self.min_[idx, np.newaxis]
+
+    def transform(self, sensor_names, values) -> np.ndarray:
+        """
+        Scales raw values.
+
+        Args:
+            sensor_names: A sensor name, or a list of N sensor names.
+            values: Any shape for a single sensor, shape (N, T) for a list.
+        """
+        scale, min_ = self._coefficients(sensor_names)
+        return np.asarray(values, dtype=np.float64) * scale + min_
+
+    def inverse_transform(self, sensor_names, values) -> np.ndarray:
+        """Inverse of `transform`, mapping scaled model outputs back to sensor units."""
+        scale, min_ = self._coefficients(sensor_names)
+        return (np.asarray(values, dtype=np.float64) - min_) / scale
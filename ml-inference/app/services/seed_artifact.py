@@ -0,0 +1,97 @@
+"""
+Small precomputed artifact holding everything ml-inference needs at startup:
+the last SEQUENCE_LENGTH raw values, the last known timestamp and the scaler
+coefficients of every sensor. Loading it replaces reading the whole dataset CSV
+and unpickling every scaler.
+
+Build it after training with:
+
+    python -m app.services.seed_artifact [dataset.csv] [model_dir]
+"""
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from app.services.scaling import CompiledScalers
+
+SEED_ARTIFACT_FILENAME = "inference_seed.npz"
+
+
+def build_seed_artifact(
+    csv_path: str,
+    model_dir: str,
+    sensor_names: List[str],
+    sequence_length: int,
+    datetime_col: str = "Datetime",
+) -> str:
+    """
+    Computes per-sensor seeds from the dataset and scalers and writes them to
+    `model_dir/inference_seed.npz`.
+
+    Returns:
+        str: Path of the written artifact.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    df[datetime_col] = pd.to_datetime(df[datetime_col], utc=True)
+    df = df.set_index(datetime_col).sort_index()
+
+    scalers = CompiledScalers.from_joblib_dir(
+        model_dir, [name for name in sensor_names if name in df.columns]
+    )
+    names, raw_sequences, last_timestamps = [], [], []
+    for sensor_name in sensor_names:
+        if sensor_name not in scalers:
+            print(f"Warning: Skipping {sensor_name}, data column or scaler missing.")
+            continue
+        sensor_series = df[sensor_name].dropna()
+        if len(sensor_series) < sequence_length:
+            print(f"Warning: Not enough data points for {sensor_name} (need {sequence_length}, got {len(sensor_series)}).")
+            continue
+
+        names.append(sensor_name)
+        raw_sequences.append(sensor_series.iloc[-sequence_length:].to_numpy(dtype=np.float64))
+        last_timestamps.append(sensor_series.index[-1].isoformat())
+
+    artifact_path = os.path.join(model_dir, SEED_ARTIFACT_FILENAME)
+    np.savez(
+        artifact_path,
+        sensor_names=np.array(names),
+        raw_sequences=np.array(raw_sequences, dtype=np.float64).reshape(len(names), sequence_length),
+        last_timestamps=np.array(last_timestamps),
+        scale=np.array([scalers.scale_[scalers.sensor_index[name]] for name in names], dtype=np.float64),
+        min=np.array([scalers.min_[scalers.sensor_index[name]] for name in names], dtype=np.float64),
+    )
+    print(f"Saved seed artifact for {len(names)} sensors to {artifact_path}")
+    return artifact_path
+
+
+def load_seed_artifact(artifact_path: str) -> Dict[str, dict]:
+    """
+    Loads the seed artifact.
+
+    Returns:
+        Dict[str, dict]: sensor name -> {"raw_sequence", "last_timestamp", "scale", "min"}.
+    """
+    with np.load(artifact_path, allow_pickle=False) as artifact:
+        return {
+            str(name): {
+                "raw_sequence": artifact["raw_sequences"][i],
+                "last_timestamp": datetime.fromisoformat(str(artifact["last_timestamps"][i])),
+                "scale": float(artifact["scale"][i]),
+                "min": float(artifact["min"][i]),
+            }
+            for i, name in enumerate(artifact["sensor_names"])
+        }
+
+
+if __name__ == "__main__":
+    from app.main import AVAILABLE_SENSOR_COLUMNS, MODEL_BASE_DIR, SEQUENCE_LENGTH, TEST_FILE_PATH
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else TEST_FILE_PATH
+    model_dir = sys.argv[2] if len(sys.argv) > 2 else MODEL_BASE_DIR
+    build_seed_artifact(csv_path, model_dir, AVAILABLE_SENSOR_COLUMNS, SEQUENCE_LENGTH)
@@ -0,0 +1,194 @@
+"""
+Vectorized backtesting of recursive multi-step forecasts.
+
+`model.evaluate` on the test set only measures the error one step (or one
+head of K steps) ahead. Users see forecasts that are rolled forward for hours,
+feeding each prediction back in. This module measures exactly that: it takes a
+starting window at every `stride`-th minute of the test set, stacks them into
+one batch and advances all of them in lockstep, one forward pass per chunk of
+`output_size` minutes. A single rollout of `max_horizon` steps therefore yields
+the error at every horizon from 1 minute to `max_horizon` for all start points.
+
+train_models.py runs it for every model it trains. To backtest the models
+already exported to ../model/ without retraining:
+
+    python backtest.py --horizon 1440 --stride 60
+"""
+import argparse
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+BACKTEST_MAX_HORIZON = 24 * 60  # Minutes each rollout is advanced
+BACKTEST_STRIDE = 60  # Minutes between start points in the test set
+SUMMARY_HORIZONS = [1, 15, 60, 240, 24 * 60]  # Horizons reported in the metrics summary
+
+
+def recursive_forecast(model, windows, steps):
+    """
+    Forecasts `steps` values after each window by feeding the model's own
+    predictions back in, one forward pass per `output_size` values, the way
+    ml-inference rolls a model forward. All windows advance in lockstep.
+
+    Args:
+        model: Trained model; its last layer sets how many values one pass adds.
+        windows (np.ndarray): Scaled windows, shape (batch, seq_length, 1).
+        steps (int): Number of values to forecast per window.
+
+    Returns:
+        np.ndarray: Scaled forecasts, shape (batch, steps).
+    """
+    batch, seq_length = windows.shape[0], windows.shape[1]
+    output_size = model.output_shape[-1]
+    buffer = np.empty((batch, seq_length + steps + output_size), dtype=np.float32)
+    buffer[:, :seq_length] = windows[:, :, 0]
+    produced = 0
+    while produced < steps:
+        current = buffer[:, produced : produced + seq_length, np.newaxis]
+        # One call for the whole batch; `predict` would re-create its data pipeline every step
+        preds = model.predict_on_batch(current)
+        buffer[:, seq_length + produced : seq_length + produced + output_size] = preds
+        produced += output_size
+    return buffer[:, seq_length : seq_length + steps]
+
+
+def backtest_windows(scaled_series, seq_length, max_horizon, stride=1):
+    """
+    Cuts a scaled series into starting windows and the values that follow them.
+
+    Args:
+        scaled_series (np.ndarray): Shape (n,) or (n, 1).
+        seq_length (int): Window length fed to the model.
+        max_horizon (int): Number of following values kept as targets.
+        stride (int): Minutes between consecutive start points.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Windows (starts, seq_length, 1) and
+        targets (starts, max_horizon); empty if the series is too short.
+    """
+    values = np.asarray(scaled_series, dtype=np.float32).reshape(-1)
+    if len(values) < seq_length + max_horizon:
+        return np.empty((0, seq_length, 1), dtype=np.float32), np.empty((0, max_horizon), dtype=np.float32)
+    spans = np.lib.stride_tricks.sliding_window_view(values, seq_length + max_horizon)[::stride]
+    return np.ascontiguousarray(spans[:, :seq_length, np.newaxis]), np.ascontiguousarray(spans[:, seq_length:])
+
+
+def backtest_model(model, scaled_series, seq_length, max_horizon=BACKTEST_MAX_HORIZON, stride=BACKTEST_STRIDE):
+    """
+    Rolls the model forward from every `stride`-th start point of the series at
+    once and measures the error at each horizon.
+
+    The horizon is shortened to fit the series if needed.
+
+    Returns:
+        Optional[pd.DataFrame]: One row per horizon (1..max_horizon minutes) with
+        scaled `mse` and `mae` and the number of `start_points`, or None if the
+        series is too short for a single start point.
+    """
+    max_horizon = min(max_horizon, len(scaled_series) - seq_length)
+    if max_horizon < 1:
+        return None
+    windows, targets = backtest_windows(scaled_series, seq_length, max_horizon, stride)
+    if windows.shape[0] == 0:
+        return None
+    errors = recursive_forecast(model, windows, max_horizon) - targets
+    return pd.DataFrame({
+        "horizon_minutes": np.arange(1, max_horizon + 1),
+        "mse": np.mean(errors ** 2, axis=0),
+        "mae": np.mean(np.abs(errors), axis=0),
+        "start_points": windows.shape[0],
+    })
+
+
+def summary_columns(curve, horizons=SUMMARY_HORIZONS):
+    """Picks the MSE at the summary horizons from a curve, as metrics summary columns."""
+    mse = curve.set_index("horizon_minutes")["mse"]
+    return {f"Backtest MSE @{h}m": float(mse[h]) for h in horizons if h in mse.index}
+
+
+def save_curves(curves, save_dir):
+    """Writes all curves to backtest_curves.csv and plots MSE against horizon per feature."""
+    if not curves:
+        print("No backtest curves to save.")
+        return
+    curves_df = pd.concat(
+        [curve.assign(feature=feature) for feature, curve in curves.items()], ignore_index=True
+    )[["feature", "horizon_minutes", "mse", "mae", "start_points"]]
+    csv_path = os.path.join(save_dir, "backtest_curves.csv")
+    curves_df.to_csv(csv_path, index=False)
+    print(f"Saved backtest curves to {csv_path}")
+
+    plt.figure(figsize=(12, 7))
+    for feature, curve in curves.items():
+        plt.plot(curve["horizon_minutes"], curve["mse"], label=feature)
+    plt.xlabel("Horizon (minutes)")
+    plt.ylabel("MSE (scaled)")
+    plt.yscale("log")
+    plt.title("Recursive Forecast Error by Horizon")
+    plt.legend(fontsize="small", ncol=2)
+    plt.grid(True, which="both", linestyle="--")
+    plt.tight_layout()
+    plot_path = os.path.join(save_dir, "backtest_horizon_mse.png")
+    plt.savefig(plot_path)
+    plt.close()
+    print(f"Saved backtest plot to {plot_path}")
+
+
+def main():
+    # Deferred so train_models can import this module without a cycle
+    import joblib
+    from keras import models
+
+    from train_models import (
+        DATETIME_COLUMN, MODEL_EXPORT_BASE_DIR, SENSOR_COLUMNS, SEQUENCE_LENGTH, TEST_FILE_PATH, load_data,
+    )
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--horizon", type=int, default=BACKTEST_MAX_HORIZON, help="Minutes each rollout is advanced")
+    parser.add_argument("--stride", type=int, default=BACKTEST_STRIDE, help="Minutes between start points")
+    args = parser.parse_args()
+
+    df_test = load_data(TEST_FILE_PATH, DATETIME_COLUMN)
+    if df_test is None:
+        return
+
+    curves = {}
+    for feature_name in SENSOR_COLUMNS:
+        model_path = os.path.join(MODEL_EXPORT_BASE_DIR, f"{feature_name}.keras")
+        scaler_path = os.path.join(MODEL_EXPORT_BASE_DIR, f"{feature_name}_scaler.joblib")
+        if not os.path.exists(model_path) or not os.path.exists(scaler_path):
+            print(f"Warning: No model or scaler for '{feature_name}'. Skipping.")
+            continue
+        if feature_name not in df_test.columns:
+            print(f"Warning: Feature '{feature_name}' not in test data. Skipping.")
+            continue
+        series_test = df_test[feature_name].dropna()
+        scaler = joblib.load(scaler_path)
+        scaled_test = scaler.transform(series_test.values.reshape(-1, 1))
+        curve = backtest_model(models.load_model(model_path), scaled_test, SEQUENCE_LENGTH, args.horizon, args.stride)
+        if curve is None:
+            print(f"Warning: Not enough test data to backtest '{feature_name}'. Skipping.")
+            continue
+        curves[feature_name] = curve
+        print(f"Backtested {feature_name} from {curve['start_points'].iloc[0]} start points: "
+              + ", ".join(f"{k}={v:.4f}" for k, v in summary_columns(curve).items()))
+
+    save_curves(curves, MODEL_EXPORT_BASE_DIR)
+
+    # Replace the backtest columns of an existing metrics summary, keeping the training metrics
+    summary_csv_path = os.path.join(MODEL_EXPORT_BASE_DIR, "model_metrics_summary.csv")
+    backtest_df = pd.DataFrame({feature: summary_columns(curve) for feature, curve in curves.items()}).T
+    if os.path.exists(summary_csv_path):
+        summary_df = pd.read_csv(summary_csv_path, index_col=0)
+        summary_df = summary_df.drop(columns=[c for c in summary_df.columns if c.startswith("Backtest MSE")])
+        summary_df = summary_df.join(backtest_df, how="outer")
+    else:
+        summary_df = backtest_df
+    summary_df.to_csv(summary_csv_path)
+    print(f"Saved summary metrics to {summary_csv_path}")
+
+
+if __name__ == "__main__":
+    main()
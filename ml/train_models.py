@@ -1,11 +1,14 @@
+import argparse
 import os
 import pandas as pd
 import numpy as np
-from keras import models, layers, callbacks
+from keras import models, layers, callbacks, optimizers
 from sklearn.preprocessing import MinMaxScaler
 import matplotlib.pyplot as plt
 import joblib
 
+from backtest import BACKTEST_MAX_HORIZON, BACKTEST_STRIDE, backtest_model, recursive_forecast, save_curves, summary_columns
+
 # Configuration
 SENSOR_COLUMNS = [
     'ActivePower', 'ReactivePower',
@@ -37,6 +40,16 @@ VALIDATION_SPLIT_RATIO = 0.2  # 20% of training data for validation
 EPOCHS = 100  # Max epochs; early stopping will likely stop it sooner
 BATCH_SIZE = 32
 PATIENCE_EARLY_STOPPING = 10  # Patience for early stopping
+FORECAST_HORIZON = 1  # Minutes predicted per forward pass; > 1 trains a direct multi-step head
+MINUTES_PER_DAY = 24 * 60
+
+# Incremental (warm-start) retraining of exported models
+INCREMENTAL_NEW_DAYS = 7  # Days of newest training data to fine-tune on
+INCREMENTAL_EPOCHS = 5  # Short schedule; the model already fits the older history
+INCREMENTAL_PATIENCE = 2
+INCREMENTAL_LEARNING_RATE = 1e-4  # A tenth of Adam's default, so fine-tuning does not undo the old fit
+INCREMENTAL_TOLERANCE = 0.02  # Relative increase in holdout loss still accepted when swapping models
+INCREMENTAL_HOLDOUT_RATIO = 0.2  # Newest share of the window, kept out of fine-tuning to decide the swap
 
 # --- Helper Functions ---
 
@@ -56,28 +69,34 @@ def load_data(file_path, datetime_col):
         return None
 
 
-def create_sequences(data, seq_length):
-    """Creates sequences and corresponding labels for LSTM."""
+def create_sequences(data, seq_length, horizon=1):
+    """Creates sequences and, as labels, the `horizon` values following each of them."""
     xs, ys = [], []
-    for i in range(len(data) - seq_length):
+    for i in range(len(data) - seq_length - horizon + 1):
         x = data[i : (i + seq_length)]
-        y = data[i + seq_length]
+        y = data[(i + seq_length) : (i + seq_length + horizon), 0]
         xs.append(x)
         ys.append(y)
     if not xs: # Handle case where data is too short for any sequences
-        return np.array([]).reshape((0, seq_length, 1)), np.array([]).reshape((0, 1))
+        return np.array([]).reshape((0, seq_length, 1)), np.array([]).reshape((0, horizon))
     return np.array(xs), np.array(ys)
 
 
-def build_lstm_model(input_shape):
-    """Builds and compiles a simple LSTM model."""
+def build_lstm_model(input_shape, output_size=1):
+    """
+    Builds and compiles a simple LSTM model.
+
+    With `output_size` K > 1 the last layer is a direct multi-step head that
+    predicts the next K minutes in one forward pass, so a rollout needs about
+    1/K as many passes as with the one-step model.
+    """
     model = models.Sequential(
         [
             layers.LSTM(
                 50, activation="relu", input_shape=input_shape
             ),
             layers.Dense(25, activation="relu"),
-            layers.Dense(1),
+            layers.Dense(output_size),
         ]
     )
     model.compile(
@@ -86,6 +105,67 @@ def build_lstm_model(input_shape):
     return model
 
 
+def train_model(X_train, y_train, X_val, y_val):
+    """Builds a model with one output per label column and trains it with early stopping."""
+    model = build_lstm_model(
+        input_shape=(X_train.shape[1], 1), output_size=y_train.shape[1]
+    )
+    model.summary()
+
+    early_stopping = callbacks.EarlyStopping(
+        monitor="val_loss",
+        patience=PATIENCE_EARLY_STOPPING,
+        restore_best_weights=True,
+        verbose=1
+    )
+    history = model.fit(
+        X_train,
+        y_train,
+        epochs=EPOCHS,
+        batch_size=BATCH_SIZE,
+        validation_data=(X_val, y_val),
+        callbacks=[early_stopping],
+        verbose=1,
+    )
+    return model, history
+
+
+def fine_tune_model(model, X_train, y_train, X_val, y_val):
+    """Continues training an exported model on new data with a short, low learning rate schedule."""
+    model.compile(
+        optimizer=optimizers.Adam(learning_rate=INCREMENTAL_LEARNING_RATE), loss="mean_squared_error"
+    )
+    early_stopping = callbacks.EarlyStopping(
+        monitor="val_loss",
+        patience=INCREMENTAL_PATIENCE,
+        restore_best_weights=True,
+        verbose=1
+    )
+    return model.fit(
+        X_train,
+        y_train,
+        epochs=INCREMENTAL_EPOCHS,
+        batch_size=BATCH_SIZE,
+        validation_data=(X_val, y_val),
+        callbacks=[early_stopping],
+        verbose=1,
+    )
+
+
+def newest_window(series, days, seq_length):
+    """The last `days` of `series`, plus the `seq_length` values before them as context for the first window."""
+    cutoff = series.index[-1] - pd.Timedelta(days=days)
+    start = max(series.index.searchsorted(cutoff, side="right") - seq_length, 0)
+    return series.iloc[start:]
+
+
+def export_model(model, export_path):
+    """Saves the model next to `export_path` and renames it, so readers never see a partly written file."""
+    incoming_path = os.path.join(os.path.dirname(export_path), f".incoming-{os.path.basename(export_path)}")
+    model.save(incoming_path)
+    os.replace(incoming_path, export_path)
+
+
 def plot_training_history(history, feature_name, save_dir):
     """Plots training & validation loss and saves the plot."""
     plt.figure(figsize=(10, 6))
@@ -133,211 +213,343 @@ def plot_comparison_metric(
 
 # --- Script Execution ---
 
-if not SENSOR_COLUMNS:
-    print(
-        "Error: SENSOR_COLUMNS list is empty. "
-        "Please define the features to model in the script."
+def parse_args():
+    parser = argparse.ArgumentParser(description="Trains one LSTM model per sensor column.")
+    parser.add_argument(
+        "--horizon", type=int, default=FORECAST_HORIZON,
+        help="Minutes predicted per forward pass, e.g. 15 or 60 for a direct multi-step head (default: %(default)s)",
     )
-    exit()
-
-# Create base directories if they don't exist
-os.makedirs(MODEL_EXPORT_BASE_DIR, exist_ok=True)
-if not os.path.isdir("../data"):
-    print("Error: ../data directory not found. Please create it and place your datasets there.")
-    exit()
-
-
-# Load data
-print("Loading training data...")
-df_train_val_full = load_data(
-    TRAIN_FILE_PATH, DATETIME_COLUMN
-)
-if df_train_val_full is None:
-    exit()
-
-print("\nLoading test data...")
-df_test_full = load_data(TEST_FILE_PATH, DATETIME_COLUMN)
-if df_test_full is None:
-    exit()
-
-all_best_train_losses = {}
-all_best_val_losses = {}
-all_test_mses = {}
-
-for feature_name in SENSOR_COLUMNS:
-    print(f"\n--- Processing feature: {feature_name} ---")
-
-    # Directory for plots specific to this feature will be MODEL_EXPORT_BASE_DIR
-    # Model file will be directly in MODEL_EXPORT_BASE_DIR named {feature_name}.keras
-
-    # 1. Prepare data for the current feature
-    if feature_name not in df_train_val_full.columns:
-        print(
-            f"Warning: Feature '{feature_name}' not found in training data ({TRAIN_FILE_PATH}). Skipping."
-        )
-        continue
-    if feature_name not in df_test_full.columns:
-        print(
-            f"Warning: Feature '{feature_name}' not found in test data ({TEST_FILE_PATH}). Skipping evaluation for this feature."
-        )
-
-    series_train_val = df_train_val_full[feature_name].copy().dropna()
-    if series_train_val.empty:
-        print(f"Warning: No data for feature '{feature_name}' in training set after dropna. Skipping.")
-        continue
-
-    split_index = int(
-        len(series_train_val) * (1 - VALIDATION_SPLIT_RATIO)
+    parser.add_argument(
+        "--compare-recursive", action="store_true",
+        help="Also train a one-step model per feature and report its recursive forecast error over the same horizon",
     )
-    series_train = series_train_val.iloc[:split_index]
-    series_val = series_train_val.iloc[split_index:]
-
-    if series_train.empty or series_val.empty:
-        print(f"Warning: Not enough data to split train/val for '{feature_name}'. Skipping.")
-        continue
-
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_train = scaler.fit_transform(
-        series_train.values.reshape(-1, 1)
+    parser.add_argument(
+        "--backtest-horizon", type=int, default=BACKTEST_MAX_HORIZON,
+        help="Minutes the recursive backtest rolls each test window forward (default: %(default)s)",
     )
-    scaled_val = scaler.transform(
-        series_val.values.reshape(-1, 1)
+    parser.add_argument(
+        "--backtest-stride", type=int, default=BACKTEST_STRIDE,
+        help="Minutes between backtest start points in the test set; 0 disables the backtest (default: %(default)s)",
     )
-
-    X_train, y_train = create_sequences(
-        scaled_train, SEQUENCE_LENGTH
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Fine-tune the exported model and scaler of each feature on the newest data instead of training "
+             "from scratch; the new model replaces the old one only if its holdout loss holds",
+    )
+    parser.add_argument(
+        "--new-days", type=float, default=INCREMENTAL_NEW_DAYS,
+        help="Days of newest training data to fine-tune on with --incremental (default: %(default)s)",
     )
-    X_val, y_val = create_sequences(
-        scaled_val, SEQUENCE_LENGTH
+    parser.add_argument(
+        "--tolerance", type=float, default=INCREMENTAL_TOLERANCE,
+        help="Relative holdout loss increase still accepted with --incremental (default: %(default)s)",
     )
+    args = parser.parse_args()
+    if args.new_days <= 0:
+        parser.error("--new-days must be positive")
+    if args.horizon < 1:
+        parser.error("--horizon must be at least 1")
+    if args.backtest_horizon < 1 or args.backtest_stride < 0:
+        parser.error("--backtest-horizon must be at least 1 and --backtest-stride at least 0")
+    return args
+
+
+def main():
+    args = parse_args()
+    if not SENSOR_COLUMNS:
+        print(
+            "Error: SENSOR_COLUMNS list is empty. "
+            "Please define the features to model in the script."
+        )
+        return
 
-    if X_train.shape[0] == 0 or X_val.shape[0] == 0:
-        print(f"Warning: Not enough data to create sequences for training/validation for '{feature_name}'. Skipping.")
-        continue
-    
-    print(f"Training data shape (X, y): {X_train.shape}, {y_train.shape}")
-    print(f"Validation data shape (X, y): {X_val.shape}, {y_val.shape}")
+    # Create base directories if they don't exist
+    os.makedirs(MODEL_EXPORT_BASE_DIR, exist_ok=True)
+    if not os.path.isdir("../data"):
+        print("Error: ../data directory not found. Please create it and place your datasets there.")
+        return
 
-    scaler_filename = f"{feature_name}_scaler.joblib"
-    scaler_path = os.path.join(MODEL_EXPORT_BASE_DIR, scaler_filename)
-    try:
-        joblib.dump(scaler, scaler_path)
-        print(f"Scaler for {feature_name} saved to {scaler_path}")
-    except Exception as e:
-        print(f"Error saving scaler for {feature_name}: {e}")
 
-    # 2. Build LSTM model
-    model = build_lstm_model(
-        input_shape=(SEQUENCE_LENGTH, 1)
+    # Load data
+    print("Loading training data...")
+    df_train_val_full = load_data(
+        TRAIN_FILE_PATH, DATETIME_COLUMN
     )
-    model.summary()
+    if df_train_val_full is None:
+        return
 
-    # 3. Train model
-    early_stopping = callbacks.EarlyStopping(
-        monitor="val_loss",
-        patience=PATIENCE_EARLY_STOPPING,
-        restore_best_weights=True,
-        verbose=1
-    )
+    print("\nLoading test data...")
+    df_test_full = load_data(TEST_FILE_PATH, DATETIME_COLUMN)
+    if df_test_full is None:
+        return
 
-    print(f"Training model for {feature_name}...")
-    history = model.fit(
-        X_train,
-        y_train,
-        epochs=EPOCHS,
-        batch_size=BATCH_SIZE,
-        validation_data=(X_val, y_val),
-        callbacks=[early_stopping],
-        verbose=1,
-    )
+    all_best_train_losses = {}
+    all_best_val_losses = {}
+    all_test_mses = {}
+    all_recursive_mses = {}
+    all_backtest_metrics = {}
+    backtest_curves = {}
+    all_previous_val_losses = {}
+    all_models_updated = {}
+    all_horizons = {}
+
+    passes_per_day = -(-MINUTES_PER_DAY // args.horizon)
+    print(f"\nForecast horizon: {args.horizon} minute(s) per forward pass, "
+          f"{passes_per_day} passes per day-long forecast.")
+    if args.compare_recursive and args.horizon == 1:
+        print("Warning: --compare-recursive needs --horizon > 1; the one-step model is the baseline. Ignoring it.")
+        args.compare_recursive = False
+
+    for feature_name in SENSOR_COLUMNS:
+        print(f"\n--- Processing feature: {feature_name} ---")
+
+        # Directory for plots specific to this feature will be MODEL_EXPORT_BASE_DIR
+        # Model file will be directly in MODEL_EXPORT_BASE_DIR named {feature_name}.keras
+
+        # 1. Prepare data for the current feature
+        if feature_name not in df_train_val_full.columns:
+            print(
+                f"Warning: Feature '{feature_name}' not found in training data ({TRAIN_FILE_PATH}). Skipping."
+            )
+            continue
+        if feature_name not in df_test_full.columns:
+            print(
+                f"Warning: Feature '{feature_name}' not found in test data ({TEST_FILE_PATH}). Skipping evaluation for this feature."
+            )
 
-    best_val_loss_epoch = np.argmin(history.history["val_loss"])
-    all_best_train_losses[feature_name] = history.history["loss"][best_val_loss_epoch]
-    all_best_val_losses[feature_name] = history.history["val_loss"][best_val_loss_epoch]
+        series_train_val = df_train_val_full[feature_name].copy().dropna()
+        if series_train_val.empty:
+            print(f"Warning: No data for feature '{feature_name}' in training set after dropna. Skipping.")
+            continue
 
-    # Save training history plot in the base model directory
-    plot_training_history(
-        history, feature_name, MODEL_EXPORT_BASE_DIR
-    )
+        export_path = os.path.join(
+            MODEL_EXPORT_BASE_DIR, f"{feature_name}.keras"
+        )
+        scaler_path = os.path.join(MODEL_EXPORT_BASE_DIR, f"{feature_name}_scaler.joblib")
+        horizon = args.horizon
+        previous_model = None
+        series_holdout = None
+        if args.incremental:
+            if os.path.exists(export_path) and os.path.exists(scaler_path):
+                # Keep the exported scaler: the model was fitted to its scale
+                previous_model = models.load_model(export_path)
+                scaler = joblib.load(scaler_path)
+                horizon = previous_model.output_shape[-1]
+                series_train_val = newest_window(series_train_val, args.new_days, SEQUENCE_LENGTH)
+                # Fine-tuning (incl. early stopping) never sees the holdout's targets; only the
+                # last SEQUENCE_LENGTH values before it are shared, as input of its first window
+                holdout_index = int(len(series_train_val) * (1 - INCREMENTAL_HOLDOUT_RATIO))
+                series_holdout = series_train_val.iloc[max(holdout_index - SEQUENCE_LENGTH, 0):]
+                series_train_val = series_train_val.iloc[:holdout_index]
+                print(f"Fine-tuning the exported model for {feature_name} on data since "
+                      f"{series_train_val.index[0]}, holding out the newest {INCREMENTAL_HOLDOUT_RATIO:.0%} "
+                      f"(horizon {horizon}).")
+            else:
+                print(f"No exported model and scaler for {feature_name}; training from scratch.")
+
+        split_index = int(
+            len(series_train_val) * (1 - VALIDATION_SPLIT_RATIO)
+        )
+        series_train = series_train_val.iloc[:split_index]
+        series_val = series_train_val.iloc[split_index:]
+
+        if series_train.empty or series_val.empty:
+            print(f"Warning: Not enough data to split train/val for '{feature_name}'. Skipping.")
+            continue
+
+        if previous_model is None:
+            scaler = MinMaxScaler(feature_range=(0, 1))
+            scaler.fit(series_train.values.reshape(-1, 1))
+        scaled_train = scaler.transform(
+            series_train.values.reshape(-1, 1)
+        )
+        scaled_val = scaler.transform(
+            series_val.values.reshape(-1, 1)
+        )
 
-    # 4. Evaluate model on test data
-    if feature_name in df_test_full.columns:
-        series_test = df_test_full[feature_name].copy().dropna()
-        if not series_test.empty:
-            scaled_test = scaler.transform(
-                series_test.values.reshape(-1, 1)
+        X_train, y_train = create_sequences(
+            scaled_train, SEQUENCE_LENGTH, horizon
+        )
+        X_val, y_val = create_sequences(
+            scaled_val, SEQUENCE_LENGTH, horizon
+        )
+
+        if X_train.shape[0] == 0 or X_val.shape[0] == 0:
+            print(f"Warning: Not enough data to create sequences for training/validation for '{feature_name}'. Skipping.")
+            continue
+
+        if series_holdout is not None:
+            X_holdout, y_holdout = create_sequences(
+                scaler.transform(series_holdout.values.reshape(-1, 1)), SEQUENCE_LENGTH, horizon
             )
-            X_test, y_test = create_sequences(
-                scaled_test, SEQUENCE_LENGTH
+            if X_holdout.shape[0] == 0:
+                print(f"Warning: Not enough new data for a holdout for '{feature_name}'. Keeping the previous model.")
+                continue
+            print(f"Holdout data shape (X, y): {X_holdout.shape}, {y_holdout.shape}")
+
+        print(f"Training data shape (X, y): {X_train.shape}, {y_train.shape}")
+        print(f"Validation data shape (X, y): {X_val.shape}, {y_val.shape}")
+
+        if previous_model is None:
+            try:
+                joblib.dump(scaler, scaler_path)
+                print(f"Scaler for {feature_name} saved to {scaler_path}")
+            except Exception as e:
+                print(f"Error saving scaler for {feature_name}: {e}")
+
+        # 2. Build and train LSTM model, or fine-tune the exported one
+        model_updated = True
+        all_horizons[feature_name] = horizon
+        if previous_model is None:
+            print(f"Training model for {feature_name}...")
+            model, history = train_model(X_train, y_train, X_val, y_val)
+        else:
+            # Both models are scored on the holdout, which fine-tuning and its early stopping never saw
+            previous_val_loss = previous_model.evaluate(X_holdout, y_holdout, verbose=0)
+            model = previous_model
+            history = fine_tune_model(model, X_train, y_train, X_val, y_val)
+            new_val_loss = model.evaluate(X_holdout, y_holdout, verbose=0)
+            model_updated = new_val_loss <= previous_val_loss * (1 + args.tolerance)
+            all_previous_val_losses[feature_name] = previous_val_loss
+            all_models_updated[feature_name] = model_updated
+            print(f"Holdout loss for {feature_name}: previous {previous_val_loss:.6f}, fine-tuned {new_val_loss:.6f}; "
+                  + ("swapping in the fine-tuned model." if model_updated else "keeping the previous model."))
+            if not model_updated:
+                model = models.load_model(export_path)
+
+        if model_updated:
+            best_val_loss_epoch = np.argmin(history.history["val_loss"])
+            all_best_train_losses[feature_name] = history.history["loss"][best_val_loss_epoch]
+            all_best_val_losses[feature_name] = history.history["val_loss"][best_val_loss_epoch]
+
+            # Save training history plot in the base model directory
+            plot_training_history(
+                history, feature_name, MODEL_EXPORT_BASE_DIR
             )
-
-            if X_test.shape[0] > 0:
-                print(f"Test data shape (X, y): {X_test.shape}, {y_test.shape}")
-                test_mse = model.evaluate(
-                    X_test, y_test, verbose=0
+        else:
+            # The rejected run's losses and curves describe a model that is not exported
+            all_best_train_losses[feature_name] = np.nan
+            all_best_val_losses[feature_name] = np.nan
+
+        # 3. Optionally train the one-step model it replaces, for the accuracy comparison
+        baseline_model = None
+        if args.compare_recursive and previous_model is None:
+            print(f"Training one-step baseline model for {feature_name}...")
+            X_train_one, y_train_one = create_sequences(scaled_train, SEQUENCE_LENGTH)
+            X_val_one, y_val_one = create_sequences(scaled_val, SEQUENCE_LENGTH)
+            baseline_model, _ = train_model(X_train_one, y_train_one, X_val_one, y_val_one)
+
+        # 4. Evaluate model on test data
+        if feature_name in df_test_full.columns:
+            series_test = df_test_full[feature_name].copy().dropna()
+            if not series_test.empty:
+                scaled_test = scaler.transform(
+                    series_test.values.reshape(-1, 1)
+                )
+                X_test, y_test = create_sequences(
+                    scaled_test, SEQUENCE_LENGTH, horizon
                 )
-                all_test_mses[feature_name] = test_mse
-                print(f"Test MSE for {feature_name}: {test_mse:.4f}")
+
+                if X_test.shape[0] > 0:
+                    print(f"Test data shape (X, y): {X_test.shape}, {y_test.shape}")
+                    test_mse = model.evaluate(
+                        X_test, y_test, verbose=0
+                    )
+                    all_test_mses[feature_name] = test_mse
+                    print(f"Test MSE for {feature_name}: {test_mse:.4f}")
+                    if baseline_model is not None:
+                        # Same windows and targets, forecast by feeding the one-step model's predictions back
+                        recursive_preds = recursive_forecast(baseline_model, X_test, horizon)
+                        recursive_mse = float(np.mean((recursive_preds - y_test) ** 2))
+                        all_recursive_mses[feature_name] = recursive_mse
+                        print(f"Recursive one-step Test MSE for {feature_name} over {horizon} minutes: "
+                              f"{recursive_mse:.4f} (direct: {test_mse:.4f})")
+                else:
+                    print(f"Warning: Not enough test data to create sequences for '{feature_name}'. Skipping evaluation.")
+                    all_test_mses[feature_name] = np.nan
+
+                if args.backtest_stride > 0:
+                    # Error of the rolled-forward forecast at every horizon, all start points in one batch
+                    curve = backtest_model(
+                        model, scaled_test, SEQUENCE_LENGTH, args.backtest_horizon, args.backtest_stride
+                    )
+                    if curve is not None:
+                        backtest_curves[feature_name] = curve
+                        all_backtest_metrics[feature_name] = summary_columns(curve)
+                        print(f"Backtest MSE for {feature_name}: "
+                              + ", ".join(f"{k}={v:.4f}" for k, v in all_backtest_metrics[feature_name].items()))
+                    else:
+                        print(f"Warning: Not enough test data to backtest '{feature_name}'.")
             else:
-                print(f"Warning: Not enough test data to create sequences for '{feature_name}'. Skipping evaluation.")
+                print(f"Warning: No test data for '{feature_name}' after dropna. Skipping evaluation.")
                 all_test_mses[feature_name] = np.nan
         else:
-            print(f"Warning: No test data for '{feature_name}' after dropna. Skipping evaluation.")
+            print(f"Warning: Feature '{feature_name}' not in test data. Test MSE will be NaN.")
             all_test_mses[feature_name] = np.nan
-    else:
-        print(f"Warning: Feature '{feature_name}' not in test data. Test MSE will be NaN.")
-        all_test_mses[feature_name] = np.nan
 
-    # 5. Export model in .keras format
-    # Model file will be named {featureName}.keras and saved in MODEL_EXPORT_BASE_DIR
-    export_path = os.path.join(
-        MODEL_EXPORT_BASE_DIR, f"{feature_name}.keras"
-    )
-    try:
-        model.save(export_path)
-        print(f"Model for {feature_name} saved to {export_path}")
-    except Exception as e:
-        print(f"Error saving model for {feature_name} to .keras format: {e}")
-
-
-# --- Statistics Visualization ---
-print("\n--- Overall Model Performance ---")
-if all_test_mses:
-    plot_mses = {k: v for k, v in all_test_mses.items() if not np.isnan(v)}
-    if plot_mses:
-        plot_comparison_metric(
-            plot_mses,
-            "Test MSE",
-            "Comparison of Test MSE Across Models",
-            os.path.join(MODEL_EXPORT_BASE_DIR, "comparison_test_mse.png"),
-        )
-    else:
-        print("No valid Test MSEs to plot.")
-else:
-    print("No Test MSEs recorded.")
-
-if all_best_val_losses:
-    plot_val_losses = {k: v for k, v in all_best_val_losses.items() if not np.isnan(v)}
-    if plot_val_losses:
-        plot_comparison_metric(
-            plot_val_losses,
-            "Best Validation Loss",
-            "Comparison of Best Validation Loss Across Models",
-            os.path.join(MODEL_EXPORT_BASE_DIR, "comparison_validation_loss.png"),
-        )
+        # 5. Export model in .keras format
+        # Model file will be named {featureName}.keras and saved in MODEL_EXPORT_BASE_DIR
+        if not model_updated:
+            continue
+        try:
+            export_model(model, export_path)
+            print(f"Model for {feature_name} saved to {export_path}")
+        except Exception as e:
+            print(f"Error saving model for {feature_name} to .keras format: {e}")
+
+
+    # --- Statistics Visualization ---
+    print("\n--- Overall Model Performance ---")
+    if all_test_mses:
+        plot_mses = {k: v for k, v in all_test_mses.items() if not np.isnan(v)}
+        if plot_mses:
+            plot_comparison_metric(
+                plot_mses,
+                "Test MSE",
+                "Comparison of Test MSE Across Models",
+                os.path.join(MODEL_EXPORT_BASE_DIR, "comparison_test_mse.png"),
+            )
+        else:
+            print("No valid Test MSEs to plot.")
     else:
-        print("No valid Validation Losses to plot.")
-
-print("\nSummary of Metrics:")
-summary_df = pd.DataFrame({
-    "Best Train Loss": pd.Series(all_best_train_losses),
-    "Best Validation Loss": pd.Series(all_best_val_losses),
-    "Test MSE": pd.Series(all_test_mses)
-})
-print(summary_df.to_string())
-
-summary_csv_path = os.path.join(MODEL_EXPORT_BASE_DIR, "model_metrics_summary.csv")
-summary_df.to_csv(summary_csv_path)
-print(f"Saved summary metrics to {summary_csv_path}")
-
-print("\nScript finished.")
+        print("No Test MSEs recorded.")
+
+    if all_best_val_losses:
+        plot_val_losses = {k: v for k, v in all_best_val_losses.items() if not np.isnan(v)}
+        if plot_val_losses:
+            plot_comparison_metric(
+                plot_val_losses,
+                "Best Validation Loss",
+                "Comparison of Best Validation Loss Across Models",
+                os.path.join(MODEL_EXPORT_BASE_DIR, "comparison_validation_loss.png"),
+            )
+        else:
+            print("No valid Validation Losses to plot.")
+
+    print("\nSummary of Metrics:")
+    summary_df = pd.DataFrame({
+        "Best Train Loss": pd.Series(all_best_train_losses),
+        "Best Validation Loss": pd.Series(all_best_val_losses),
+        "Test MSE": pd.Series(all_test_mses)
+    })
+    # With a multi-step head, losses and Test MSE average over all `horizon` predicted minutes
+    summary_df["Forecast Horizon"] = pd.Series(all_horizons)
+    if args.compare_recursive:
+        summary_df["Recursive Test MSE"] = pd.Series(all_recursive_mses)
+    if args.incremental:
+        summary_df["Previous Holdout Loss"] = pd.Series(all_previous_val_losses)
+        summary_df["Model Updated"] = pd.Series(all_models_updated)
+    if all_backtest_metrics:
+        summary_df = summary_df.join(pd.DataFrame(all_backtest_metrics).T)
+        save_curves(backtest_curves, MODEL_EXPORT_BASE_DIR)
+    print(summary_df.to_string())
+
+    summary_csv_path = os.path.join(MODEL_EXPORT_BASE_DIR, "model_metrics_summary.csv")
+    summary_df.to_csv(summary_csv_path)
+    print(f"Saved summary metrics to {summary_csv_path}")
+
+    print("\nScript finished.")
+
+
+if __name__ == "__main__":
+    main()
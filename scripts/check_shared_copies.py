@@ -0,0 +1,75 @@
+"""
+Checks that the modules copied into several services are still identical.
+
+Every service is built from its own directory (see docker-compose.yml), so
+modules used by more than one service are copied into each of them instead of
+being imported from a shared package. Change all copies together; this check
+fails with a diff when they drift apart. Lines matching a module's
+`service_specific` pattern may differ between the copies.
+
+    python scripts/check_shared_copies.py
+"""
+import difflib
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module path inside each service -> services holding a copy and the lines allowed to differ
+SHARED_MODULES: Dict[str, dict] = {
+    "app/core/shared_arrays.py": {
+        "services": ["digital-twin", "ml-inference"],
+        "service_specific": None,
+    },
+    "app/core/metrics.py": {
+        "services": ["backend", "digital-twin", "ml-inference"],
+        "service_specific": r"METRICS_NAMESPACE = ",
+    },
+    "app/core/profiling.py": {
+        "services": ["backend", "digital-twin", "ml-inference"],
+        "service_specific": None,
+    },
+    "app/core/wire_format.py": {
+        "services": ["backend", "digital-twin", "ml-inference"],
+        "service_specific": None,
+    },
+}
+
+
+def normalized_lines(path: str, service_specific: Optional[str]) -> List[str]:
+    """The file's lines, with the lines allowed to differ replaced by a placeholder."""
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines(keepends=True)
+    if service_specific is None:
+        return lines
+    pattern = re.compile(service_specific)
+    return ["<service specific>\n" if pattern.match(line) else line for line in lines]
+
+
+def main() -> int:
+    drifted = 0
+    for module, spec in SHARED_MODULES.items():
+        reference_service, *other_services = spec["services"]
+        reference_path = os.path.join(REPO_ROOT, reference_service, module)
+        reference = normalized_lines(reference_path, spec["service_specific"])
+        for service in other_services:
+            path = os.path.join(REPO_ROOT, service, module)
+            copy = normalized_lines(path, spec["service_specific"])
+            if copy == reference:
+                continue
+            drifted += 1
+            print(f"{service}/{module} differs from {reference_service}/{module}:")
+            sys.stdout.writelines(difflib.unified_diff(
+                reference, copy, f"{reference_service}/{module}", f"{service}/{module}"
+            ))
+    if drifted:
+        print(f"{drifted} shared module copies differ. Apply the change to every copy.")
+        return 1
+    print(f"All copies of {len(SHARED_MODULES)} shared modules are identical.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())